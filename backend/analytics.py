@@ -0,0 +1,164 @@
+# backend/analytics.py
+
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import text
+
+import crud
+from database import AsyncSessionLocal, engine
+from jobs import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Waste types that mean the household did not separate its waste. Every other
+# classified type (plastic, paper, glass, ...) counts as correctly segregated.
+UNSEGREGATED_WASTE_TYPES = frozenset(
+    crud.waste_type_key(t)
+    for t in os.getenv("UNSEGREGATED_WASTE_TYPES", "trash,mixed,unsorted,unknown").split(",")
+    if t.strip()
+)
+# Seconds between reconciler runs; 0 disables the background task.
+ANALYTICS_RECONCILE_SECONDS = float(os.getenv("ANALYTICS_RECONCILE_SECONDS", "3600"))
+# Days of daily rollups recomputed by a regular run.
+ANALYTICS_RECONCILE_DAYS = int(os.getenv("ANALYTICS_RECONCILE_DAYS", "2"))
+# Every Nth run (and the first one after startup) recomputes all history.
+ANALYTICS_FULL_RECONCILE_EVERY = int(os.getenv("ANALYTICS_FULL_RECONCILE_EVERY", "24"))
+# Longest date range accepted by the time-bucketed analytics endpoints.
+ANALYTICS_MAX_RANGE_DAYS = int(os.getenv("ANALYTICS_MAX_RANGE_DAYS", "731"))
+# Postgres only: seconds between refreshes of the per-household daily
+# materialized view used by household analytics; 0 disables it.
+ANALYTICS_MATVIEW_REFRESH_SECONDS = float(os.getenv("ANALYTICS_MATVIEW_REFRESH_SECONDS", "0"))
+
+def segregation_accuracy(type_totals: Iterable) -> float:
+    """Percentage of logged waste weight that was sorted into a specific waste type."""
+    total = 0.0
+    segregated = 0.0
+    for row in type_totals:
+        total += row.total_weight
+        if row.waste_type not in UNSEGREGATED_WASTE_TYPES:
+            segregated += row.total_weight
+    return round(segregated / total * 100, 2) if total > 0 else 0.0
+
+class RollupReconciler(PeriodicJob):
+    """
+    Periodically recomputes the analytics rollups from waste_logs and
+    overwrites any rows that drifted. A run locks the rollup tables, so the
+    outbox consumer's increments wait until it commits instead of being
+    overwritten. Scheduled runs in several workers do not queue up: on
+    Postgres a run is skipped while another worker's run holds the lock
+    (so workers started together do one startup backfill, not one each).
+    """
+
+    name = "rollup reconciliation"
+
+    def __init__(self, interval: float, window_days: int, full_every: int):
+        super().__init__(interval)
+        self.window_days = window_days
+        self.full_every = max(1, full_every)
+        self.rows_corrected = 0
+        self.skipped = 0
+        self.last_corrected: Dict[str, int] = {}
+
+    def _next_run_kwargs(self, run: int) -> dict:
+        return {"full": run % self.full_every == 0}
+
+    async def run_once(self, full: bool = False, wait: bool = False) -> Dict[str, int]:
+        since = None
+        if not full:
+            since = (datetime.now(timezone.utc) - timedelta(days=self.window_days)).date()
+        async with AsyncSessionLocal() as db:
+            corrected = await crud.reconcile_waste_rollups(db, since=since, wait=wait)
+        if corrected is None:
+            self.skipped += 1
+            logger.info("Skipped %s: another worker is running it", self.name)
+            return {}
+        self.rows_corrected += sum(corrected.values())
+        self.last_corrected = corrected
+        if any(corrected.values()):
+            logger.warning("Analytics rollups drifted; corrected %s", corrected)
+        return corrected
+
+    async def reconcile(self, full: bool = False) -> Dict[str, int]:
+        return await self._timed_run(full=full, wait=True)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "window_days": self.window_days,
+            "rows_corrected": self.rows_corrected,
+            "skipped": self.skipped,
+            "last_corrected": self.last_corrected,
+        }
+
+class MatviewRefresher(PeriodicJob):
+    """
+    Postgres only: keeps a (user_id, day, waste_type) materialized view of
+    waste_logs for household analytics. Days before the last refresh are
+    read from the view and the rest from waste_logs (see `covered_until`).
+    """
+
+    name = "materialized view refresh"
+
+    def __init__(self, interval: float):
+        super().__init__(interval)
+        # UTC day of the last refresh start: the view is complete for every earlier day.
+        self.covered_until = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0 and engine.dialect.name == "postgresql"
+
+    async def run_once(self) -> None:
+        refresh_started = datetime.now(timezone.utc).date()
+        view = crud.WASTE_HOUSEHOLD_DAILY_MV
+        async with engine.begin() as conn:
+            exists = (await conn.execute(text("SELECT to_regclass(:view)"), {"view": view})).scalar()
+            if not exists:
+                await conn.execute(text(f"""
+                    CREATE MATERIALIZED VIEW {view} AS
+                    SELECT user_id,
+                           date(timezone('UTC', timestamp)) AS day,
+                           coalesce(nullif(lower(trim(waste_type)), ''), 'unknown') AS waste_type,
+                           count(*) AS log_count,
+                           coalesce(sum(weight), 0) AS total_weight,
+                           coalesce(sum(points), 0) AS total_points
+                    FROM waste_logs
+                    WHERE user_id IS NOT NULL
+                    GROUP BY 1, 2, 3
+                """))
+                # REFRESH ... CONCURRENTLY needs a unique index.
+                await conn.execute(text(f"CREATE UNIQUE INDEX ux_{view} ON {view} (user_id, day, waste_type)"))
+        if exists:
+            # CONCURRENTLY keeps the view readable during the refresh; it cannot run in a transaction block.
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+        self.covered_until = refresh_started
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "covered_until": self.covered_until.isoformat() if self.covered_until else None,
+        }
+
+reconciler = RollupReconciler(ANALYTICS_RECONCILE_SECONDS, ANALYTICS_RECONCILE_DAYS, ANALYTICS_FULL_RECONCILE_EVERY)
+matview_refresher = MatviewRefresher(ANALYTICS_MATVIEW_REFRESH_SECONDS)
+
+async def household_series(db, *, user_id: int, start, end, bucket: Optional[str], by_type: bool):
+    """Household totals, from the materialized view where it is complete and waste_logs after that."""
+    covered_until = matview_refresher.covered_until if matview_refresher.enabled else None
+    if covered_until is None or start >= covered_until:
+        return "logs", await crud.get_waste_log_series(
+            db, start=start, end=end, bucket=bucket, user_id=user_id, by_type=by_type)
+
+    mv_end = min(end, covered_until - timedelta(days=1))
+    series = [await crud.get_household_mv_series(
+        db, user_id=user_id, start=start, end=mv_end, bucket=bucket, by_type=by_type)]
+    if end >= covered_until:
+        series.append(await crud.get_waste_log_series(
+            db, start=covered_until, end=end, bucket=bucket, user_id=user_id, by_type=by_type))
+    return "materialized_view", crud.merge_series(*series)
@@ -0,0 +1,282 @@
+# backend/assignment.py
+
+import os
+import re
+import heapq
+import time
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import crud
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Keep a zone's pickups with the worker already serving it (shorter routes),
+# as long as that worker has at most PICKUP_ZONE_SLACK more open pickups
+# than the least loaded worker.
+PICKUP_ROUTE_BATCHING = os.getenv("PICKUP_ROUTE_BATCHING", "false").lower() in ("1", "true", "yes")
+PICKUP_ZONE_SLACK = int(os.getenv("PICKUP_ZONE_SLACK", "3"))
+# The index is rebuilt from the database this often, which picks up new
+# workers and pickups opened or collected through other worker processes.
+PICKUP_INDEX_REFRESH_SECONDS = float(os.getenv("PICKUP_INDEX_REFRESH_SECONDS", "300"))
+
+_PIN_CODE = re.compile(r"\b\d{6}\b")
+
+def address_zone(address: Optional[str]) -> Optional[str]:
+    """
+    Route zone of a free-form address: its 6-digit PIN code when present,
+    otherwise its last comma-separated part (locality/city), normalised.
+    """
+    if not address:
+        return None
+    pin = _PIN_CODE.findall(address)
+    if pin:
+        return pin[-1]
+    parts = [" ".join(part.lower().split()) for part in address.split(",")]
+    parts = [part for part in parts if part]
+    return parts[-1] if len(parts) > 1 else None
+
+class PickupAssigner:
+    """
+    Assigns pickups to workers from an in-memory index of the open pickups
+    per worker. A household with an open pickup is not assigned another one
+    (coalescing); new pickups go to the least loaded worker, or with route
+    batching to the worker already serving the household's zone.
+
+    The index is per process and only a guide to the load: which households
+    have an open pickup is read from the database on every batch (pickups
+    may be opened or collected through other processes), and the partial
+    unique index on pickups keeps coalescing exact. The periodic refresh
+    corrects any drift in the load counts. New pickups enter the index only
+    once the transaction that opened them commits.
+    """
+
+    def __init__(self, *, route_batching: bool, zone_slack: int, refresh_seconds: float):
+        self.route_batching = route_batching
+        self.zone_slack = zone_slack
+        self.refresh_seconds = refresh_seconds
+        self._load: Dict[int, int] = {}
+        self._heap: List[Tuple[int, int]] = []
+        self._open: Dict[int, Tuple[int, Optional[str]]] = {}
+        self._zone_workers: Dict[str, Counter] = defaultdict(Counter)
+        self._zones: Dict[int, Optional[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self.assigned = 0
+        self.coalesced = 0
+        self.zone_hits = 0
+        self.refreshes = 0
+
+    # --- In-memory index ---
+    def reset(self, worker_ids: Iterable[int], open_pickups: Iterable[Tuple[int, int, Optional[str]]] = ()) -> None:
+        """Rebuilds the index from the workers and (worker_id, household_id, zone) of the open pickups."""
+        self._load = {worker_id: 0 for worker_id in worker_ids}
+        self._open.clear()
+        self._zone_workers.clear()
+        for worker_id, household_id, zone in open_pickups:
+            self._open[household_id] = (worker_id, zone)
+            if worker_id in self._load:
+                self._load[worker_id] += 1
+            if zone:
+                self._zone_workers[zone][worker_id] += 1
+        self._heap = [(load, worker_id) for worker_id, load in self._load.items()]
+        heapq.heapify(self._heap)
+        self._loaded_at = time.monotonic()
+
+    def _least_loaded(self) -> Optional[Tuple[int, int]]:
+        # Lazy deletion: entries whose load is out of date are dropped here.
+        while self._heap:
+            load, worker_id = self._heap[0]
+            if self._load.get(worker_id) == load:
+                return load, worker_id
+            heapq.heappop(self._heap)
+        return None
+
+    def _set_load(self, worker_id: int, load: int) -> None:
+        self._load[worker_id] = load
+        heapq.heappush(self._heap, (load, worker_id))
+        if len(self._heap) > 4 * len(self._load) + 64:
+            self._heap = [(load, worker_id) for worker_id, load in self._load.items()]
+            heapq.heapify(self._heap)
+
+    def choose(self, zone: Optional[str] = None) -> Optional[int]:
+        """The worker for a new pickup in `zone`, or None when there are no workers."""
+        least = self._least_loaded()
+        if least is None:
+            return None
+        least_load, least_worker = least
+        if self.route_batching and zone:
+            serving = self._zone_workers.get(zone)
+            if serving:
+                preferred = max(serving, key=lambda worker_id: (serving[worker_id], -worker_id))
+                if preferred in self._load and self._load[preferred] <= least_load + self.zone_slack:
+                    self.zone_hits += 1
+                    return preferred
+        return least_worker
+
+    def record(self, worker_id: int, household_id: int, zone: Optional[str] = None) -> None:
+        """Counts an open pickup of `household_id` against `worker_id`."""
+        if household_id in self._open:
+            return
+        self._open[household_id] = (worker_id, zone)
+        if worker_id in self._load:
+            self._set_load(worker_id, self._load[worker_id] + 1)
+        if zone:
+            self._zone_workers[zone][worker_id] += 1
+
+    def release(self, household_id: int) -> None:
+        """Forgets the open pickup of `household_id` (collected or never created)."""
+        entry = self._open.pop(household_id, None)
+        if entry is None:
+            return
+        worker_id, zone = entry
+        if self._load.get(worker_id, 0) > 0:
+            self._set_load(worker_id, self._load[worker_id] - 1)
+        if zone:
+            serving = self._zone_workers[zone]
+            serving[worker_id] -= 1
+            if serving[worker_id] <= 0:
+                del serving[worker_id]
+            if not serving:
+                del self._zone_workers[zone]
+
+    def has_open_pickup(self, household_id: int) -> bool:
+        return household_id in self._open
+
+    # --- Database ---
+    def _stale(self) -> bool:
+        if self._loaded_at is None or not self._load:
+            return True
+        return time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    async def refresh(self, db: AsyncSession) -> None:
+        workers = await crud.get_worker_ids(db)
+        open_pickups = await crud.get_open_pickups(db, with_address=self.route_batching)
+        self._zones.clear()
+        self.reset(workers, (
+            (worker_id, household_id, self._zone(household_id, address))
+            for worker_id, household_id, address in open_pickups
+        ))
+        self.refreshes += 1
+
+    def _zone(self, household_id: int, address: Optional[str]) -> Optional[str]:
+        zone = address_zone(address)
+        self._zones[household_id] = zone
+        return zone
+
+    async def assign(self, db: AsyncSession, household_ids: Iterable[int]) -> Dict[int, int]:
+        """
+        Opens a pickup for each household without one, inside the caller's
+        transaction. Returns household_id -> worker_id of the new pickups.
+        They are added to the index when that transaction commits.
+        """
+        if self._stale():
+            await self.refresh(db)
+        household_ids = sorted(set(household_ids))
+        if not household_ids or not self._load:
+            return {}
+
+        if self.route_batching:
+            missing = [h for h in household_ids if h not in self._zones]
+            if missing:
+                for household_id, address in (await crud.get_user_addresses(db, missing)).items():
+                    self._zone(household_id, address)
+
+        # The database, not the index, says which households have an open
+        # pickup: another process may have opened or collected one since the
+        # last refresh. The index is brought in line for the load counts.
+        pending = await crud.get_pending_pickup_workers(db, household_ids)
+        for household_id in household_ids:
+            worker_id = pending.get(household_id)
+            if self._open.get(household_id, (None,))[0] != worker_id:
+                self.release(household_id)
+                if worker_id is not None:
+                    self.record(worker_id, household_id, self._zones.get(household_id))
+        candidates = [h for h in household_ids if h not in pending]
+        self.coalesced += len(pending)
+
+        # Each choice is recorded so the rest of the batch sees it, and taken
+        # back afterwards: the transaction may still roll back.
+        assignments = {}
+        try:
+            for household_id in candidates:
+                zone = self._zones.get(household_id)
+                worker_id = self.choose(zone)
+                assignments[household_id] = worker_id
+                self.record(worker_id, household_id, zone)
+            created = await crud.create_pending_pickups(db, assignments)
+        finally:
+            for household_id in assignments:
+                self.release(household_id)
+
+        self.coalesced += len(assignments) - len(created)
+        db.info.setdefault(_PENDING, []).extend(
+            (self, assignments[household_id], household_id, self._zones.get(household_id))
+            for household_id in created
+        )
+        return {household_id: assignments[household_id] for household_id in created}
+
+    def load_summary(self) -> dict:
+        loads = list(self._load.values())
+        if not loads:
+            return {"workers": 0}
+        mean = sum(loads) / len(loads)
+        return {
+            "workers": len(loads),
+            "open_pickups": sum(loads),
+            "min": min(loads),
+            "max": max(loads),
+            "mean": round(mean, 3),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "route_batching": self.route_batching,
+            "assigned": self.assigned,
+            "coalesced": self.coalesced,
+            "zone_hits": self.zone_hits,
+            "refreshes": self.refreshes,
+            "zones": len(self._zone_workers),
+            **self.load_summary(),
+        }
+
+def coalesce_pending_pickups(sync_conn) -> None:
+    """
+    Before uq_pickups_household_pending exists, keeps only the oldest pending
+    pickup of each household so that the unique index can be created.
+    """
+    indexes = {index["name"] for index in inspect(sync_conn).get_indexes("pickups")}
+    if "uq_pickups_household_pending" in indexes:
+        return
+    result = sync_conn.execute(text(
+        "DELETE FROM pickups WHERE status = 'pending' AND id NOT IN "
+        "(SELECT MIN(id) FROM pickups WHERE status = 'pending' GROUP BY household_id)"
+    ))
+    if result.rowcount:
+        logger.warning("Merged %s duplicate pending pickups", result.rowcount)
+
+pickup_assigner = PickupAssigner(
+    route_batching=PICKUP_ROUTE_BATCHING,
+    zone_slack=PICKUP_ZONE_SLACK,
+    refresh_seconds=PICKUP_INDEX_REFRESH_SECONDS,
+)
+
+# --- Index updates on commit ---
+# Pickups opened by assign() are queued on the session and recorded only
+# once its transaction commits; on rollback the index never saw them.
+_PENDING = "pickup_assignments"
+
+@event.listens_for(Session, "after_commit")
+def _record_assignments(session):
+    for assigner, worker_id, household_id, zone in session.info.pop(_PENDING, ()):
+        assigner.record(worker_id, household_id, zone)
+        assigner.assigned += 1
+
+@event.listens_for(Session, "after_rollback")
+def _discard_assignments(session):
+    session.info.pop(_PENDING, None)
@@ -9,11 +9,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
 import crud, schemas
-from password_utils import verify_password
+from cache import user_cache
+from password_utils import averify_and_update
 
 SECRET_KEY = os.getenv("SECRET_KEY", "a_very_secret_key_for_local_dev")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# When enabled, role checks trust the uid/role claims in the token instead of
+# loading the user on every request. Role changes and revocations then take
+# effect at token expiry, except on endpoints that use the fresh check.
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "true").lower() in ("1", "true", "yes")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
@@ -28,9 +33,15 @@ async def authenticate_user(db: AsyncSession, email: str, password: str):
         return None
     
     # Verify the provided password against the hashed password in the database.
-    # This is the critical step that was failing.
-    if not verify_password(password, user.password_hash):
+    # Runs in the hashing pool so the event loop keeps serving other requests.
+    verified, new_hash = await averify_and_update(password, user.password_hash)
+    if not verified:
         return None
+
+    # The configured bcrypt cost changed since this hash was made: upgrade it.
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
         
     # If both checks pass, return the user object.
     return user
@@ -48,28 +59,86 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> schemas.User:
-    """
-    Decodes a JWT from the request and retrieves the current user.
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
+        detail=detail,
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_access_token(token: str) -> schemas.TokenData:
+    """
+    Verifies a JWT and returns its claims. Tokens issued before the uid/role
+    claims were added only carry `sub`.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
+            raise _credentials_exception()
+        return schemas.TokenData(
+            email=email,
+            user_id=payload.get("uid"),
+            role=payload.get("role"),
+            version=payload.get("ver"),
+            expires_at=payload.get("exp"),
+        )
+    except (JWTError, ValueError):
+        raise _credentials_exception()
 
-    user = await crud.get_user_by_email(db, email=token_data.email)
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> schemas.User:
+    """
+    Decodes a JWT from the request and retrieves the current user.
+    Served from a short-lived user cache when possible.
+    """
+    token_data = decode_access_token(token)
+
+    user = user_cache.get(token_data.email)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        db_user = await crud.get_user_by_email(db, email=token_data.email)
+        if db_user is None:
+            raise _credentials_exception()
+        user = schemas.User.model_validate(db_user)
+        user_cache.set(token_data.email, user)
+    return user
+
+async def get_token_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> schemas.TokenUser:
+    """
+    Fast path: builds the caller from the token claims without touching the
+    database. Falls back to the cached user lookup for legacy tokens or when
+    AUTH_STATELESS is disabled.
+    """
+    token_data = decode_access_token(token)
+    if AUTH_STATELESS and token_data.user_id is not None and token_data.role is not None:
+        return schemas.TokenUser(id=token_data.user_id, email=token_data.email, role=token_data.role)
+
+    user = await get_current_user(token, db)
+    return schemas.TokenUser(id=user.id, email=user.email, role=user.role)
+
+async def get_current_user_fresh(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> schemas.User:
+    """
+    Always reads the user row and rejects tokens revoked by a bump of
+    User.token_version. For the few endpoints that must not act on stale data.
+    """
+    token_data = decode_access_token(token)
+    if token_data.user_id is not None:
+        db_user = await crud.get_user_by_id(db, token_data.user_id)
+    else:
+        db_user = await crud.get_user_by_email(db, email=token_data.email)
+    if db_user is None or db_user.email != token_data.email:
+        raise _credentials_exception()
+    if (token_data.version or 0) != (db_user.token_version or 0):
+        raise _credentials_exception("Token has been revoked")
+
+    user = schemas.User.model_validate(db_user)
+    user_cache.set(token_data.email, user)
+    return user
@@ -0,0 +1,180 @@
+# backend/benchmarks/bench_analytics_queries.py
+"""
+Seeds a large synthetic waste_logs table and records the latency of the
+analytics queries.
+
+Queries measured:
+  legacy_total_scan     - the old SUM(weight) over all of waste_logs
+  admin_totals          - /api/admin/analytics (waste_type_totals rollup)
+  admin_monthly_series  - a year of system-wide monthly totals (daily rollup)
+  admin_daily_by_type   - 30 days of daily totals per waste type (daily rollup)
+  household_weekly      - 90 days of one household's weekly totals (user_id, timestamp)
+  waste_type_daily      - 30 days of one waste type from the logs (waste_type, timestamp)
+  worker_pickups        - 30 days of pickup counts per worker (pickups date range)
+
+With --compare-without-indexes, the log queries are repeated after the
+composite indexes are dropped; the indexes are recreated afterwards.
+
+Usage:
+    python benchmarks/bench_analytics_queries.py --logs 2000000 --households 5000
+    python benchmarks/bench_analytics_queries.py --skip-seed --compare-without-indexes
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import common
+from sqlalchemy import func, insert, text
+from sqlalchemy.future import select
+
+from database import AsyncSessionLocal, engine, dispose_engines
+import crud, models
+
+WASTE_TYPES = ["plastic", "paper", "cardboard", "glass", "metal", "trash"]
+LOG_INDEXES = ["ix_waste_logs_user_id_timestamp", "ix_waste_logs_waste_type_timestamp"]
+
+async def seed(logs: int, households: int, workers: int, days: int, chunk: int):
+    await common.reset_schema()
+    rng = random.Random(42)
+    end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+
+    async with engine.begin() as conn:
+        users = [
+            {"name": f"household {i}", "email": f"household{i}@bench.example.com", "phone": f"h{i}",
+             "address": f"{i} Bench Street", "role": models.UserRole.household, "password_hash": "x"}
+            for i in range(households)
+        ] + [
+            {"name": f"worker {i}", "email": f"worker{i}@bench.example.com", "phone": f"w{i}",
+             "address": "Depot", "role": models.UserRole.worker, "password_hash": "x"}
+            for i in range(workers)
+        ]
+        await conn.execute(insert(models.User), users)
+    household_ids = list(range(1, households + 1))
+    worker_ids = list(range(households + 1, households + workers + 1))
+
+    seconds = days * 86400
+    started = time.perf_counter()
+    for offset in range(0, logs, chunk):
+        rows = []
+        for _ in range(min(chunk, logs - offset)):
+            weight = round(rng.uniform(0.05, 3.0), 3)
+            rows.append({
+                "user_id": rng.choice(household_ids),
+                "waste_type": rng.choice(WASTE_TYPES),
+                "weight": weight,
+                "points": int(round(weight * 20)),
+                "timestamp": start + timedelta(seconds=rng.randrange(seconds)),
+            })
+        async with engine.begin() as conn:
+            await conn.execute(insert(models.WasteLog), rows)
+        print(f"  seeded {offset + len(rows)}/{logs} logs", end="\r", flush=True)
+    print()
+    seed_seconds = time.perf_counter() - started
+
+    pickups = [
+        {"household_id": rng.choice(household_ids), "worker_id": rng.choice(worker_ids),
+         "status": rng.choice(list(models.PickupStatus)),
+         "date": start + timedelta(seconds=rng.randrange(seconds))}
+        for _ in range(max(1, logs // 10))
+    ]
+    async with engine.begin() as conn:
+        for offset in range(0, len(pickups), chunk):
+            await conn.execute(insert(models.Pickup), pickups[offset:offset + chunk])
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await crud.reconcile_waste_rollups(db)
+    rollup_seconds = time.perf_counter() - started
+    return {
+        "seed_seconds": round(seed_seconds, 3),
+        "logs_per_second": round(logs / seed_seconds, 1) if seed_seconds else 0.0,
+        "rollup_backfill_seconds": round(rollup_seconds, 3),
+    }
+
+async def time_query(fn, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await fn(db)
+            latencies.append(time.perf_counter() - started)
+    return common.summarize(latencies)
+
+def log_queries(today: date):
+    return {
+        "household_weekly": lambda db: crud.get_waste_log_series(
+            db, start=today - timedelta(days=89), end=today, bucket="week", user_id=1),
+        "waste_type_daily": lambda db: crud.get_waste_log_series(
+            db, start=today - timedelta(days=29), end=today, bucket="day", waste_type="glass"),
+    }
+
+def queries(today: date):
+    async def legacy_total_scan(db):
+        return (await db.execute(select(func.sum(models.WasteLog.weight)))).scalar()
+
+    return {
+        "legacy_total_scan": legacy_total_scan,
+        "admin_totals": crud.get_waste_type_totals,
+        "admin_monthly_series": lambda db: crud.get_rollup_series(
+            db, start=today - timedelta(days=364), end=today, bucket="month"),
+        "admin_daily_by_type": lambda db: crud.get_rollup_series(
+            db, start=today - timedelta(days=29), end=today, bucket="day", by_type=True),
+        **log_queries(today),
+        "worker_pickups": lambda db: crud.get_worker_pickup_stats(
+            db, start=today - timedelta(days=29), end=today),
+    }
+
+async def set_log_indexes(present: bool):
+    indexes = [index for index in models.WasteLog.__table__.indexes if index.name in LOG_INDEXES]
+    async with engine.begin() as conn:
+        for index in indexes:
+            if present:
+                await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+            else:
+                await conn.run_sync(lambda sync_conn: index.drop(sync_conn, checkfirst=True))
+        if engine.dialect.name == "postgresql":
+            await conn.execute(text("ANALYZE waste_logs"))
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--households", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--chunk", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data from a previous run")
+    parser.add_argument("--compare-without-indexes", action="store_true")
+    args = parser.parse_args()
+
+    report = {"dialect": engine.dialect.name}
+    if not args.skip_seed:
+        report["seed"] = await seed(args.logs, args.households, args.workers, args.days, args.chunk)
+    elif engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE"))
+    async with AsyncSessionLocal() as db:
+        report["rows"] = (await db.execute(select(func.count(models.WasteLog.id)))).scalar()
+
+    today = datetime.now(timezone.utc).date()
+    report["queries"] = {name: await time_query(fn, args.repeat) for name, fn in queries(today).items()}
+
+    if args.compare_without_indexes:
+        await set_log_indexes(False)
+        try:
+            report["queries_without_indexes"] = {
+                name: await time_query(fn, max(1, args.repeat // 4)) for name, fn in log_queries(today).items()
+            }
+        finally:
+            await set_log_indexes(True)
+
+    await dispose_engines()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+# backend/benchmarks/bench_login_storm.py
+"""
+Measures latency of unrelated endpoints while a login storm is running.
+
+A probe loop keeps calling GET / and GET /api/household/rewards while a
+burst of concurrent logins is fired at /api/login. Two modes are compared:
+  blocking - bcrypt verified inline on the event loop (the old behaviour)
+  pooled   - bcrypt verified in the password hashing pool (current code)
+
+Usage:
+    python benchmarks/bench_login_storm.py --logins 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import common
+import httpx
+
+import auth_utils, models, password_utils
+from database import AsyncSessionLocal, dispose_engines
+from main import app
+
+async def blocking_verify_and_update(plain_password, hashed_password):
+    return password_utils.verify_and_update(plain_password, hashed_password)
+
+async def seed(users: int):
+    await common.reset_schema()
+    password_hash = password_utils.get_password_hash("bench-password")
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            models.User(name=f"user {i}", email=f"user{i}@bench.example.com", phone=f"{5000 + i}",
+                        address="Bench Street", role=models.UserRole.household, password_hash=password_hash)
+            for i in range(users)
+        ])
+        await db.commit()
+
+async def run_mode(mode: str, logins: int, concurrency: int, users: int) -> dict:
+    await seed(users)
+    if mode == "blocking":
+        auth_utils.averify_and_update = blocking_verify_and_update
+    else:
+        auth_utils.averify_and_update = password_utils.averify_and_update
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        token = auth_utils.create_access_token(
+            {"sub": "user0@bench.example.com", "uid": 1, "role": "household", "ver": 0})
+        headers = {"Authorization": f"Bearer {token}"}
+        probes = {"/": [], "/api/household/rewards": []}
+        storm_done = asyncio.Event()
+
+        async def probe():
+            while not storm_done.is_set():
+                for path, samples in probes.items():
+                    started = time.perf_counter()
+                    await client.get(path, headers=headers)
+                    samples.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies, statuses = [], {}
+
+        async def login(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/api/login", data={
+                    "username": f"user{i % users}@bench.example.com", "password": "bench-password"})
+                login_latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        probe_task = asyncio.create_task(probe())
+        await asyncio.sleep(0.2)  # baseline samples before the storm
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - started
+        storm_done.set()
+        await probe_task
+
+    return {
+        "mode": mode,
+        "logins": logins,
+        "concurrency": concurrency,
+        "login_statuses": statuses,
+        "logins_per_sec": round(logins / elapsed, 1),
+        "login_latency": common.summarize(login_latencies),
+        "probe_latency": {path: common.summarize(samples) for path, samples in probes.items()},
+        "hasher": password_utils.hasher_stats() if mode == "pooled" else None,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--modes", default="blocking,pooled")
+    args = parser.parse_args()
+
+    results = [await run_mode(mode, args.logins, args.concurrency, args.users) for mode in args.modes.split(",")]
+    await dispose_engines()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+# backend/benchmarks/bench_ml_proxy.py
+"""
+Shows how the event loop behaves while concurrent classification requests
+are proxied to a (stub) model service.
+
+Starts benchmarks/stub_model_server.py in a subprocess, then for each mode
+fires concurrent POSTs at /api/ml/classify-waste while measuring event-loop
+lag and the latency of GET / on the same app:
+  blocking - synchronous requests.post inside the handler (the old code;
+             needs `pip install requests`)
+  async    - the shared httpx client in model_client.py (current code)
+
+Usage:
+    python benchmarks/bench_ml_proxy.py --requests 100 --concurrency 20 --delay-ms 150
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import common
+import httpx
+
+STUB_PORT = int(os.getenv("STUB_PORT", "8765"))
+os.environ["MODEL_SERVICE_URL"] = f"http://127.0.0.1:{STUB_PORT}/predict"
+
+import model_client
+from database import dispose_engines
+from main import app
+
+IMAGE = b"\xff\xd8\xff" + os.urandom(50_000)
+
+class BlockingClient:
+    """Mimics the old handler: requests.post on the event loop thread."""
+
+    url = model_client.model_client.url
+
+    async def classify(self, filename, content, content_type):
+        import requests
+        response = requests.post(self.url, files={"image": (filename, content, content_type)}, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+async def wait_for_stub():
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.post(os.environ["MODEL_SERVICE_URL"], files={"image": ("x.jpg", b"x", "image/jpeg")})
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("stub model server did not start")
+
+async def run_mode(mode: str, total: int, concurrency: int) -> dict:
+    import routers.ml as ml_router
+
+    real_client = model_client.model_client
+    ml_router.model_client = BlockingClient() if mode == "blocking" else real_client
+
+    lags, probe_latencies, latencies, statuses = [], [], [], {}
+    done = asyncio.Event()
+
+    async def lag_monitor():
+        interval = 0.01
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(max(0.0, time.perf_counter() - started - interval))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/")
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def classify():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/api/ml/classify-waste",
+                                             files={"image": ("bin.jpg", IMAGE, "image/jpeg")})
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        background = [asyncio.create_task(lag_monitor()), asyncio.create_task(probe())]
+        started = time.perf_counter()
+        await asyncio.gather(*(classify() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*background)
+
+    ml_router.model_client = real_client
+    return {
+        "mode": mode,
+        "requests": total,
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "classifications_per_sec": round(total / elapsed, 1),
+        "classify_latency": common.summarize(latencies),
+        "event_loop_lag": common.summarize(lags),
+        "probe_latency": common.summarize(probe_latencies),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay-ms", type=float, default=150)
+    parser.add_argument("--modes", default="blocking,async")
+    args = parser.parse_args()
+
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(os.path.dirname(__file__), "stub_model_server.py"),
+        "--port", str(STUB_PORT), "--delay-ms", str(args.delay_ms),
+    ])
+    try:
+        await wait_for_stub()
+        await model_client.model_client.start()
+        results = [await run_mode(mode, args.requests, args.concurrency) for mode in args.modes.split(",")]
+        await model_client.model_client.close()
+        await dispose_engines()
+    finally:
+        stub.terminate()
+        stub.wait()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+# backend/benchmarks/bench_pickup_assignment.py
+"""
+Simulates device readings from many households and measures how pickups are
+assigned to workers.
+
+Strategies compared:
+  first_worker   - the old behaviour: a new pickup per reading, always for
+                   the first worker (simulated here for comparison)
+  least_loaded   - PickupAssigner: one open pickup per household, given to
+                   the worker with the fewest open pickups
+  route_batched  - least_loaded, but a zone's pickups stay with the worker
+                   already serving it (PICKUP_ZONE_SLACK)
+
+Each tick delivers a batch of readings (a few busy households send most of
+them), then every worker collects up to --collect-per-tick of its oldest
+open pickups. Reported per strategy: pickups created, batch assignment
+latency, spread of open pickups over workers (coefficient of variation,
+max/mean) and the average number of workers serving a zone.
+
+With --db, the database path (PickupAssigner.assign inside a transaction,
+as the outbox consumer runs it) is timed as well.
+
+Usage:
+    python benchmarks/bench_pickup_assignment.py --households 20000 --workers 500 --ticks 400
+    python benchmarks/bench_pickup_assignment.py --db --households 5000 --workers 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict, deque
+
+import common
+from sqlalchemy import insert, update
+
+from database import AsyncSessionLocal, engine, dispose_engines
+import models
+from assignment import PickupAssigner, PICKUP_ZONE_SLACK
+
+def make_population(households: int, zones: int, rng: random.Random):
+    zone_of = {h: f"{560000 + rng.randrange(zones)}" for h in range(1, households + 1)}
+    # Roughly Zipf-distributed activity: a few households send most readings.
+    weights = [1.0 / (rank ** 0.8) for rank in range(1, households + 1)]
+    rng.shuffle(weights)
+    return zone_of, weights
+
+def spread(loads) -> dict:
+    mean = statistics.fmean(loads) if loads else 0.0
+    stdev = statistics.pstdev(loads) if loads else 0.0
+    return {
+        "open_pickups": sum(loads),
+        "min": min(loads),
+        "max": max(loads),
+        "mean": round(mean, 3),
+        "cv": round(stdev / mean, 3) if mean else 0.0,
+        "max_over_mean": round(max(loads) / mean, 3) if mean else 0.0,
+    }
+
+def zone_fanout(open_by_worker, zone_of) -> float:
+    workers_by_zone = defaultdict(set)
+    for worker_id, households in open_by_worker.items():
+        for household_id in households:
+            workers_by_zone[zone_of[household_id]].add(worker_id)
+    if not workers_by_zone:
+        return 0.0
+    return round(statistics.fmean(len(w) for w in workers_by_zone.values()), 3)
+
+def simulate(strategy: str, args, zone_of, weights) -> dict:
+    rng = random.Random(7)
+    worker_ids = list(range(1, args.workers + 1))
+    households = list(zone_of)
+    open_by_worker = {worker_id: deque() for worker_id in worker_ids}
+    assigner = PickupAssigner(route_batching=strategy == "route_batched",
+                              zone_slack=args.zone_slack, refresh_seconds=float("inf"))
+    assigner.reset(worker_ids)
+    created = 0
+    latencies = []
+
+    for _ in range(args.ticks):
+        batch = rng.choices(households, weights=weights, k=args.batch)
+        started = time.perf_counter()
+        if strategy == "first_worker":
+            open_by_worker[worker_ids[0]].extend(batch)
+            created += len(batch)
+        else:
+            for household_id in set(batch):
+                if assigner.has_open_pickup(household_id):
+                    continue
+                zone = zone_of[household_id]
+                worker_id = assigner.choose(zone)
+                assigner.record(worker_id, household_id, zone)
+                open_by_worker[worker_id].append(household_id)
+                created += 1
+        latencies.append(time.perf_counter() - started)
+
+        for worker_id, queue in open_by_worker.items():
+            for _ in range(min(args.collect_per_tick, len(queue))):
+                assigner.release(queue.popleft())
+
+    return {
+        "strategy": strategy,
+        "readings": args.ticks * args.batch,
+        "pickups_created": created,
+        "batch_latency": common.summarize(latencies),
+        "per_reading_us": round(sum(latencies) / (args.ticks * args.batch) * 1e6, 3),
+        "load": spread([len(open_by_worker[w]) for w in worker_ids]),
+        "workers_per_zone": zone_fanout(open_by_worker, zone_of),
+        "zone_hits": assigner.zone_hits,
+    }
+
+async def seed_db(args, zone_of) -> list:
+    await common.reset_schema()
+    async with engine.begin() as conn:
+        await conn.execute(insert(models.User), [
+            {"name": f"household {h}", "email": f"household{h}@bench.example.com", "phone": f"h{h}",
+             "address": f"{h} Bench Street, Bengaluru {zone_of[h]}",
+             "role": models.UserRole.household, "password_hash": "x"}
+            for h in zone_of
+        ] + [
+            {"name": f"worker {w}", "email": f"worker{w}@bench.example.com", "phone": f"w{w}",
+             "address": "Depot", "role": models.UserRole.worker, "password_hash": "x"}
+            for w in range(args.workers)
+        ])
+    return list(zone_of)
+
+async def run_db(route_batching: bool, args, zone_of, weights) -> dict:
+    rng = random.Random(7)
+    households = await seed_db(args, zone_of)
+    assigner = PickupAssigner(route_batching=route_batching, zone_slack=args.zone_slack,
+                              refresh_seconds=float("inf"))
+    latencies = []
+    created = 0
+    for tick in range(args.db_ticks):
+        if tick and tick % 10 == 0:
+            # Workers collect everything now and then; the index is rebuilt from the database.
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(models.Pickup).values(status=models.PickupStatus.collected))
+                await db.commit()
+                await assigner.refresh(db)
+        batch = rng.choices(households, weights=weights, k=args.batch)
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            created += len(await assigner.assign(db, batch))
+            await db.commit()
+            latencies.append(time.perf_counter() - started)
+    return {
+        "strategy": "route_batched" if route_batching else "least_loaded",
+        "batches": args.db_ticks,
+        "pickups_created": created,
+        "batch_latency": common.summarize(latencies),
+        "assigner": assigner.stats(),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--households", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=250)
+    parser.add_argument("--zones", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--batch", type=int, default=500, help="readings per tick (outbox batch size)")
+    parser.add_argument("--collect-per-tick", type=int, default=1)
+    parser.add_argument("--zone-slack", type=int, default=PICKUP_ZONE_SLACK)
+    parser.add_argument("--db", action="store_true", help="also time the database path")
+    parser.add_argument("--db-ticks", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    zone_of, weights = make_population(args.households, args.zones, rng)
+    report = {
+        "households": args.households,
+        "workers": args.workers,
+        "zones": args.zones,
+        "simulation": [simulate(s, args, zone_of, weights)
+                       for s in ("first_worker", "least_loaded", "route_batched")],
+    }
+    if args.db:
+        report["dialect"] = engine.dialect.name
+        report["database"] = [await run_db(batching, args, zone_of, weights) for batching in (False, True)]
+    await dispose_engines()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
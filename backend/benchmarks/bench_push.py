@@ -0,0 +1,177 @@
+# backend/benchmarks/bench_push.py
+"""
+Memory per open event stream and fan-out latency of /api/events/stream.
+
+For each --connections value, starts the app under uvicorn in a subprocess
+(with an extra /bench/publish route that publishes straight to the push
+hub), opens that many streams spread over --users users and reports:
+
+  rss_per_stream_kb  growth of the server's RSS per open, idle stream
+  fanout             --events rounds of one event to every user: delivery
+                     latency per stream (publish time stamped in the event
+                     to arrival at the client) and the server-side time to
+                     queue a round
+
+Client and server share the machine, so at high connection counts the
+delivery latency includes the client's own parsing of every event.
+
+Usage:
+    python benchmarks/bench_push.py --connections 1000,5000 --users 1000 --events 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import common
+import httpx
+
+PORT = int(os.getenv("PUSH_BENCH_PORT", "8767"))
+# Streams opened at once; keeps the listen backlog from overflowing.
+OPEN_BATCH = 200
+
+def serve(port: int):
+    import uvicorn
+    from main import app
+    from push import hub
+
+    @app.post("/bench/publish")
+    async def publish(users: int, round: int):
+        started = time.perf_counter()
+        delivered = 0
+        for user_id in range(1, users + 1):
+            delivered += hub.publish((user_id,), "bench", {"round": round, "sent": time.time()})
+        return {"queued_ms": (time.perf_counter() - started) * 1000, "delivered": delivered}
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+async def wait_until_up(client: httpx.AsyncClient):
+    for _ in range(200):
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+async def run_case(connections: int, users: int, events: int) -> dict:
+    from auth_utils import create_access_token
+
+    per_user = -(-connections // users)
+    # Opening streams in bursts lags the loop for a moment; loop-lag shedding would turn them away.
+    env = {**os.environ, "SCHEMA_AUTO_MIGRATE": "true", "PUSH_MAX_CONNECTIONS": str(connections + 100),
+           "PUSH_MAX_CONNECTIONS_PER_USER": str(per_user + 10), "PUSH_HEARTBEAT_SECONDS": "600",
+           "ANALYTICS_RECONCILE_SECONDS": "0", "SHED_MAX_LOOP_LAG_MS": "0"}
+    server = subprocess.Popen([sys.executable, __file__, "--serve", str(PORT)], cwd=common.BACKEND_DIR, env=env)
+    tokens = {u: create_access_token({"sub": f"bench{u}@bench.example.com", "uid": u, "role": "household"})
+              for u in range(1, users + 1)}
+    opened = 0
+    all_open = asyncio.Event()
+    latencies = []
+    received = defaultdict(int)
+    round_done = defaultdict(asyncio.Event)
+    failures = []
+
+    async def listen(client: httpx.AsyncClient, user_id: int):
+        nonlocal opened
+        headers = {"Authorization": f"Bearer {tokens[user_id]}"}
+        async with client.stream("GET", "/api/events/stream", headers=headers) as response:
+            if response.status_code != 200:
+                failures.append(f"{response.status_code} {(await response.aread())[:200]!r}")
+                return
+            name = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    name = line[7:]
+                elif line.startswith("data: ") and name == "ready":
+                    opened += 1
+                    if opened == connections:
+                        all_open.set()
+                elif line.startswith("data: ") and name == "bench":
+                    data = json.loads(line[6:])
+                    latencies.append(time.time() - data["sent"])
+                    received[data["round"]] += 1
+                    if received[data["round"]] == connections:
+                        round_done[data["round"]].set()
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    listeners = []
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits,
+                                     timeout=httpx.Timeout(30, read=None)) as client:
+            await wait_until_up(client)
+            # Warm-up: import and first-use allocations are not counted as per-stream memory.
+            await client.post("/bench/publish", params={"users": 1, "round": -1})
+            baseline = rss_kb(server.pid)
+
+            started = time.perf_counter()
+            for i in range(connections):
+                listeners.append(asyncio.create_task(listen(client, i % users + 1)))
+                if (i + 1) % OPEN_BATCH == 0:
+                    while opened + len(failures) < i + 1 - OPEN_BATCH // 2:
+                        await asyncio.sleep(0.01)
+            while not all_open.is_set():
+                if failures:
+                    raise RuntimeError(f"{len(failures)} streams failed to open, e.g. {failures[0]}")
+                await asyncio.sleep(0.05)
+            open_seconds = time.perf_counter() - started
+            await asyncio.sleep(1)
+            with_streams = rss_kb(server.pid)
+
+            queued = []
+            for r in range(events):
+                reply = (await client.post("/bench/publish", params={"users": users, "round": r})).json()
+                queued.append(reply["queued_ms"] / 1000)
+                await asyncio.wait_for(round_done[r].wait(), timeout=60)
+    finally:
+        for task in listeners:
+            task.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+        server.terminate()
+        server.wait()
+
+    return {
+        "connections": connections,
+        "users": users,
+        "open_seconds": round(open_seconds, 2),
+        "rss_baseline_mb": round(baseline / 1024, 1),
+        "rss_with_streams_mb": round(with_streams / 1024, 1),
+        "rss_per_stream_kb": round((with_streams - baseline) / connections, 2),
+        "fanout": {
+            "events_per_round": connections,
+            "rounds": events,
+            "queue_round": common.summarize(queued),
+            "delivery": common.summarize(latencies),
+        },
+    }
+
+async def main(args):
+    results = []
+    for connections in (int(v) for v in args.connections.split(",")):
+        results.append(await run_case(connections, min(args.users, connections), args.events))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", default="1000,5000")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--serve", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+    else:
+        asyncio.run(main(args))
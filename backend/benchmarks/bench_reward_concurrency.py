@@ -0,0 +1,131 @@
+# backend/benchmarks/bench_reward_concurrency.py
+"""
+Fires parallel device uploads at a single household and checks that the
+final reward balance is exact.
+
+Two ingestion paths are compared:
+  legacy  - the old three-commit path with a Python read-modify-write on
+            Reward.points (kept here only for comparison)
+  atomic  - the current path in routers/device.py: the log and its outbox
+            event commit together, and the outbox consumer then applies the
+            reward increments in batches (drained and timed separately)
+
+Usage:
+    python benchmarks/bench_reward_concurrency.py --uploads 500 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+
+import common
+from sqlalchemy.future import select
+
+from database import AsyncSessionLocal, dispose_engines
+import crud, models, schemas
+from outbox import outbox_consumer
+from routers.device import upload_from_device, calculate_points
+
+async def legacy_upload(log: schemas.WasteLogCreate, db):
+    """The pre-upsert ingestion path, reproduced for comparison."""
+    device = (await db.execute(
+        select(models.Device).filter(models.Device.device_id == log.device_id)
+    )).scalars().first()
+    user = (await db.execute(
+        select(models.User).filter(models.User.id == device.user_id)
+    )).scalars().first()
+    points = calculate_points(log.weight)
+    await crud.create_waste_log(db, user_id=user.id, waste_type=log.waste_type,
+                                weight=log.weight, points=points, timestamp=log.timestamp)
+    reward = (await db.execute(
+        select(models.Reward).filter(models.Reward.user_id == user.id)
+    )).scalars().first()
+    if reward:
+        reward.points = (reward.points or 0) + points
+    else:
+        db.add(models.Reward(user_id=user.id, points=points, redeemed=False))
+    await db.commit()
+    worker = (await db.execute(
+        select(models.User).filter(models.User.role == models.UserRole.worker)
+    )).scalars().first()
+    if worker:
+        await crud.create_pickup(db, household_id=user.id, worker_id=worker.id)
+
+async def seed():
+    await common.reset_schema()
+    async with AsyncSessionLocal() as db:
+        household = models.User(name="bench household", email="household@bench.example.com", phone="1000",
+                                address="1 Bench Street", role=models.UserRole.household, password_hash="x")
+        worker = models.User(name="bench worker", email="worker@bench.example.com", phone="1001",
+                             address="2 Bench Street", role=models.UserRole.worker, password_hash="x")
+        db.add_all([household, worker])
+        await db.flush()
+        db.add(models.Device(device_id="bench-bin", user_id=household.id))
+        await db.commit()
+        return household.id
+
+async def run_mode(mode: str, uploads: int, concurrency: int) -> dict:
+    household_id = await seed()
+    handler = legacy_upload if mode == "legacy" else upload_from_device
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        log = schemas.WasteLogCreate(device_id="bench-bin", waste_type="plastic",
+                                     weight=0.05 * (1 + i % 10), timestamp=datetime.now(timezone.utc))
+        async with semaphore:
+            async with AsyncSessionLocal() as db:
+                try:
+                    await handler(log, db)
+                except Exception:
+                    errors += 1
+                    await db.rollback()
+
+    expected = sum(calculate_points(0.05 * (1 + i % 10)) for i in range(uploads))
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(uploads)))
+    elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    applied = await outbox_consumer.drain() if mode != "legacy" else 0
+    drain_seconds = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as db:
+        rewards = await crud.get_rewards_by_user(db, user_id=household_id)
+    actual = sum(r.points or 0 for r in rewards)
+    # Failed uploads legitimately credit nothing; only count silent losses.
+    return {
+        "mode": mode,
+        "uploads": uploads,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "uploads_per_sec": round(uploads / elapsed, 1),
+        "outbox_events_applied": applied,
+        "outbox_drain_seconds": round(drain_seconds, 3),
+        "expected_points_if_no_errors": expected,
+        "actual_points": actual,
+        "reward_rows": len(rewards),
+        "exact": errors == 0 and actual == expected and len(rewards) == 1,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--modes", default="legacy,atomic")
+    args = parser.parse_args()
+
+    results = [await run_mode(mode, args.uploads, args.concurrency) for mode in args.modes.split(",")]
+    by_mode = {r["mode"]: r for r in results}
+    if "legacy" in by_mode and "atomic" in by_mode:
+        by_mode["atomic"]["throughput_gain"] = round(
+            by_mode["atomic"]["uploads_per_sec"] / by_mode["legacy"]["uploads_per_sec"], 2)
+    await dispose_engines()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+# backend/benchmarks/bench_startup.py
+"""
+Cold-start profile of the backend: how long a fresh worker process takes to
+import the app and to get through its startup (lifespan) to the point
+where it serves requests.
+
+Each run is a new interpreter:
+  import        `python -X importtime -c "import main"`; reported as the
+                median total plus the slowest modules of the last run,
+                grouped by top-level package (own modules listed by name)
+  startup       import + lifespan startup; the schema check is also timed
+                on its own, next to the create_all()/index reflection that
+                startup used to run, for comparison
+
+The database (DATABASE_URL, SQLite by default) is migrated first. With
+--max-import-ms / --max-startup-ms the script exits with status 1 when the
+median exceeds the target, so autoscaling budgets can be checked in CI.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 10 --max-import-ms 1500 --max-startup-ms 2500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+import common
+
+# Runs in the child process; prints one JSON line of timings.
+STARTUP_PROBE = r"""
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def probe():
+    from database import engine, Base, create_missing_indexes
+    from assignment import coalesce_pending_pickups
+    from migrations import check_schema_version
+
+    async with main.lifespan(main.app):
+        ready = time.perf_counter()
+    async with engine.begin() as conn:
+        t0 = time.perf_counter()
+        await conn.run_sync(check_schema_version)
+        t1 = time.perf_counter()
+    async with engine.begin() as conn:
+        t2 = time.perf_counter()
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(coalesce_pending_pickups)
+        await conn.run_sync(create_missing_indexes)
+        t3 = time.perf_counter()
+    await engine.dispose()
+    return {
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - started) * 1000,
+        "schema_check_ms": (t1 - t0) * 1000,
+        "create_all_ms": (t3 - t2) * 1000,
+    }
+
+print(json.dumps(asyncio.run(probe())))
+"""
+
+def own_modules() -> set:
+    names = {name[:-3] for name in os.listdir(common.BACKEND_DIR) if name.endswith(".py")}
+    return names | {"routers"}
+
+def parse_importtime(stderr: str):
+    """(total_us, [(module, self_us, cumulative_us)]) from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    total = next((cumulative for module, _, cumulative in reversed(rows) if module == "main"), 0)
+    return total, rows
+
+def group_modules(rows, own: set, top: int) -> list:
+    """Self time per top-level package; the app's own modules stay separate."""
+    grouped = defaultdict(int)
+    for module, self_us, _ in rows:
+        root = module.split(".")[0]
+        grouped[module if root in own else root] += self_us
+    slowest = sorted(grouped.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"module": name, "self_ms": round(us / 1000, 2), "own": name.split(".")[0] in own}
+            for name, us in slowest]
+
+def run_child(args, env) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=common.BACKEND_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+
+def median(values) -> float:
+    return round(statistics.median(values), 2) if values else 0.0
+
+async def migrate():
+    import migrations
+    from database import engine, dispose_engines
+
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.upgrade)
+    await dispose_engines()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-startup-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(migrate())
+    env = {**os.environ, "PYTHONPATH": common.BACKEND_DIR, "SCHEMA_AUTO_MIGRATE": "false",
+           "ANALYTICS_RECONCILE_SECONDS": os.getenv("ANALYTICS_RECONCILE_SECONDS", "0")}
+
+    import_totals, rows = [], []
+    for _ in range(args.runs):
+        child = run_child(["-X", "importtime", "-c", "import main"], env)
+        total_us, rows = parse_importtime(child.stderr)
+        import_totals.append(total_us / 1000)
+
+    probes = [json.loads(run_child(["-c", STARTUP_PROBE], env).stdout.strip().splitlines()[-1])
+              for _ in range(args.runs)]
+
+    own = own_modules()
+    report = {
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        "dialect": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "import_ms": median(import_totals),
+        "startup_ms": median([p["startup_ms"] for p in probes]),
+        "schema_check_ms": median([p["schema_check_ms"] for p in probes]),
+        "create_all_ms": median([p["create_all_ms"] for p in probes]),
+        "own_modules_ms": round(sum(self_us for module, self_us, _ in rows if module.split(".")[0] in own) / 1000, 2),
+        "slowest_modules": group_modules(rows, own, args.top),
+    }
+    failures = []
+    if args.max_import_ms is not None and report["import_ms"] > args.max_import_ms:
+        failures.append(f"import {report['import_ms']} ms > {args.max_import_ms} ms")
+    if args.max_startup_ms is not None and report["startup_ms"] > args.max_startup_ms:
+        failures.append(f"startup {report['startup_ms']} ms > {args.max_startup_ms} ms")
+    report["over_target"] = failures
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
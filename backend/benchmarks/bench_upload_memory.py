@@ -0,0 +1,165 @@
+# backend/benchmarks/bench_upload_memory.py
+"""
+Memory per classification request for large photos, by upload path.
+
+  buffered    - the old behaviour: `await image.read()` and the bytes are
+                re-encoded into a new multipart body (simulated here with
+                an extra route, for comparison)
+  multipart   - /api/ml/classify-waste: the parser's spooled file is
+                forwarded in chunks
+  raw         - /api/ml/classify-waste/raw: the request body is streamed
+                through to the model service as it arrives
+  downscaled  - /api/ml/classify-waste with ML_DOWNSCALE_MAX_SIDE set: a
+                smaller JPEG is forwarded instead
+
+Each case runs in a fresh subprocess against the app in process (httpx ASGI
+transport) and the stub model server, which reports how many bytes reached
+it. Reported: growth of the RSS high-water mark (VmHWM, so Pillow's native
+buffers are counted too), the tracemalloc peak (Python objects, e.g. copies
+of the image), bytes forwarded to the model service and latency.
+
+Usage:
+    python benchmarks/bench_upload_memory.py --sizes-mb 1,5,20 --repeat 5
+    python benchmarks/bench_upload_memory.py --modes multipart,raw --downscale-side 448
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import common
+
+STUB_PORT = int(os.getenv("STUB_PORT", "8766"))
+MODES = ("buffered", "multipart", "raw", "downscaled")
+PATHS = {
+    "buffered": "/bench/classify-buffered",
+    "multipart": "/api/ml/classify-waste",
+    "raw": "/api/ml/classify-waste/raw",
+    "downscaled": "/api/ml/classify-waste",
+}
+
+def synthetic_jpeg(width: int, height: int) -> bytes:
+    """A photo-like JPEG: smooth gradients plus sensor-style noise."""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape).astype(np.float32)
+    buf = BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buf, "JPEG", quality=95)
+    return buf.getvalue()
+
+def jpeg_of_size(target_bytes: int) -> bytes:
+    """A 4:3 JPEG of roughly `target_bytes`, sized from the byte rate of a sample."""
+    sample_w, sample_h = 800, 600
+    per_pixel = len(synthetic_jpeg(sample_w, sample_h)) / (sample_w * sample_h)
+    scale = (target_bytes / per_pixel / (sample_w * sample_h)) ** 0.5
+    return synthetic_jpeg(int(sample_w * scale), int(sample_h * scale))
+
+async def child(mode: str, path: str, repeat: int) -> dict:
+    import httpx
+    from fastapi import File, UploadFile
+    from main import app
+    from model_client import model_client
+    from uploads import iter_file
+
+    @app.post("/bench/classify-buffered")
+    async def classify_buffered(image: UploadFile = File(...)):
+        return await model_client.classify(image.filename, await image.read(), image.content_type)
+
+    size = os.path.getsize(path)
+
+    async def send(client, source, length):
+        source.seek(0)
+        if mode == "raw":
+            return await client.post(PATHS[mode], content=iter_file(source),
+                                     headers={"Content-Type": "image/jpeg", "Content-Length": str(length)})
+        return await client.post(PATHS[mode], files={"image": ("photo.jpg", source, "image/jpeg")})
+
+    await model_client.start()
+    transport = httpx.ASGITransport(app=app)
+    latencies, forwarded = [], 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        # Warm-up with a small image, so imports and first-use allocations are not counted.
+        small = BytesIO(synthetic_jpeg(64, 48))
+        response = await send(client, small, len(small.getvalue()))
+        response.raise_for_status()
+
+        baseline = common.peak_rss_kb()
+        with open(path, "rb") as source:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = await send(client, source, size)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+                forwarded = response.json().get("received_bytes", 0)
+            peak = common.peak_rss_kb()
+            # One more request under tracemalloc, which slows allocation-heavy code down.
+            tracemalloc.start()
+            (await send(client, source, size)).raise_for_status()
+            _, traced_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    await model_client.close()
+    return {
+        "mode": mode,
+        "rss_growth_mb": round((peak - baseline) / 1024, 1),
+        "traced_peak_mb": round(traced_peak / 1024 / 1024, 2),
+        "forwarded_kb": round(forwarded / 1024, 1),
+        "latency": common.summarize(latencies),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", default="1,5,20")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--downscale-side", type=int, default=448)
+    parser.add_argument("--child", nargs=2, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.child[0], args.child[1], args.repeat))))
+        return
+
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(os.path.dirname(__file__), "stub_model_server.py"),
+        "--port", str(STUB_PORT), "--delay-ms", "0",
+    ])
+    env = {**os.environ, "MODEL_SERVICE_URL": f"http://127.0.0.1:{STUB_PORT}/predict",
+           "ML_MAX_UPLOAD_BYTES": str(64 * 1024 * 1024), "METRICS_ENABLED": "false"}
+    results = []
+    try:
+        time.sleep(1.5)  # stub start-up
+        for size_mb in (float(v) for v in args.sizes_mb.split(",")):
+            with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+                f.write(jpeg_of_size(int(size_mb * 1024 * 1024)))
+                path = f.name
+            try:
+                row = {"target_mb": size_mb, "jpeg_mb": round(os.path.getsize(path) / 1024 / 1024, 2)}
+                for mode in args.modes.split(","):
+                    child_env = dict(env, ML_DOWNSCALE_MAX_SIDE=str(args.downscale_side if mode == "downscaled" else 0))
+                    output = subprocess.run(
+                        [sys.executable, __file__, "--child", mode, path, "--repeat", str(args.repeat)],
+                        cwd=common.BACKEND_DIR, env=child_env, capture_output=True, text=True, check=True,
+                    )
+                    row[mode] = json.loads(output.stdout.strip().splitlines()[-1])
+                results.append(row)
+            finally:
+                os.remove(path)
+    finally:
+        stub.terminate()
+        stub.wait()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+# backend/benchmarks/bench_workload.py
+"""
+Mixed-workload load test of the backend, with machine-readable results.
+
+Seeds synthetic households, workers, devices, waste logs, rewards and
+pickups at a chosen size, then runs closed-loop virtual users for a fixed
+duration. Each iteration, a user picks a scenario by weight:
+
+  upload           POST /api/device/upload (one reading)
+  upload_batch     POST /api/device/upload/batch (--batch-readings readings)
+  login            POST /api/login (bcrypt verify)
+  household_*      rewards, waste-logs page, weekly analytics
+  worker_pickups   GET /api/worker/pickups
+  admin_*          analytics totals, daily series
+  classify         POST /api/ml/classify-waste (proxied to the stub model server)
+
+With --conditional, every virtual user keeps the ETag of each GET it made
+and sends it back in If-None-Match, like a polling app does (unchanged
+lists then come back as 304).
+
+Reported per scenario: requests, errors, status counts, requests/sec and
+p50/p95/p99/max latency. Requests finished during --warmup are discarded.
+The JSON report (stdout, or --output) records the git commit and settings;
+compare two reports with benchmarks/compare_results.py.
+
+Targets:
+  default      the app in this process, through httpx's ASGI transport and
+               with its lifespan running (outbox consumer, reconciler, ...).
+               The client shares the event loop, so absolute numbers are
+               lower than a real server's; use it to compare commits.
+  --url URL    a running server (uvicorn/gunicorn) using the same
+               DATABASE_URL and SECRET_KEY; seed it first with --seed-only.
+
+The database is DATABASE_URL (SQLite file by default; point it at a local
+Postgres for production-like numbers). Classifications go to
+benchmarks/stub_model_server.py, started here, unless MODEL_SERVICE_URL
+is already set (e.g. to the real model service). SQLite serialises
+writers, so at high concurrency uploads fail with "database is locked"
+(counted as 500s); keep --concurrency low there or use Postgres.
+
+Usage:
+    python benchmarks/bench_workload.py --size small --duration 30 --concurrency 32
+    python benchmarks/bench_workload.py --size medium --mix upload=70,household_rewards=30 --output run.json
+    python benchmarks/bench_workload.py --size medium --seed-only
+    python benchmarks/bench_workload.py --skip-seed --url http://127.0.0.1:8000 --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import common
+import httpx
+
+STUB_PORT = int(os.getenv("STUB_PORT", "8765"))
+START_STUB = not os.getenv("MODEL_SERVICE_URL")
+if START_STUB:
+    os.environ["MODEL_SERVICE_URL"] = f"http://127.0.0.1:{STUB_PORT}/predict"
+# Every virtual user comes from one IP and a few devices: measure capacity, not the limits.
+# Load shedding stays on. For a --url target, start the server with this set too.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from sqlalchemy import func, insert
+from sqlalchemy.future import select
+
+import auth_utils, crud, models, password_utils
+from database import AsyncSessionLocal, engine, dispose_engines
+
+SIZES = {
+    "small": {"households": 200, "workers": 10, "logs": 20_000},
+    "medium": {"households": 2_000, "workers": 50, "logs": 200_000},
+    "large": {"households": 20_000, "workers": 200, "logs": 2_000_000},
+}
+DEFAULT_MIX = ("upload=40,upload_batch=5,login=3,household_rewards=12,household_waste_logs=10,"
+               "household_analytics=8,worker_pickups=8,admin_analytics=5,admin_waste_series=4,classify=5")
+WASTE_TYPES = ["plastic", "paper", "cardboard", "glass", "metal", "trash"]
+PASSWORD = "bench-password"
+IMAGE = b"\xff\xd8\xff" + os.urandom(30_000)
+SEED_CHUNK = 10_000
+
+# --- Seeding ---
+async def seed(households: int, workers: int, logs: int, days: int = 90) -> dict:
+    await common.reset_schema()
+    rng = random.Random(42)
+    password_hash = password_utils.get_password_hash(PASSWORD)
+    started = time.perf_counter()
+
+    async with engine.begin() as conn:
+        await conn.execute(insert(models.User), [
+            {"name": f"household {i}", "email": f"household{i}@bench.example.com", "phone": f"h{i}",
+             "address": f"{i} Bench Street, Bengaluru {560001 + i % 50}",
+             "role": models.UserRole.household, "password_hash": password_hash}
+            for i in range(households)
+        ] + [
+            {"name": f"worker {i}", "email": f"worker{i}@bench.example.com", "phone": f"w{i}",
+             "address": "Depot", "role": models.UserRole.worker, "password_hash": password_hash}
+            for i in range(workers)
+        ] + [
+            {"name": "admin", "email": "admin@bench.example.com", "phone": "a0",
+             "address": "Office", "role": models.UserRole.admin, "password_hash": password_hash},
+        ])
+        await conn.execute(insert(models.Device), [
+            {"device_id": f"bench-{i + 1}", "user_id": i + 1, "status": models.DeviceStatus.online}
+            for i in range(households)
+        ])
+
+    end = datetime.now(timezone.utc)
+    seconds = days * 86400
+    points = defaultdict(int)
+    for offset in range(0, logs, SEED_CHUNK):
+        rows = []
+        for _ in range(min(SEED_CHUNK, logs - offset)):
+            user_id = rng.randint(1, households)
+            weight = round(rng.uniform(0.05, 3.0), 3)
+            rows.append({"user_id": user_id, "waste_type": rng.choice(WASTE_TYPES), "weight": weight,
+                         "points": int(round(weight * 20)),
+                         "timestamp": end - timedelta(seconds=rng.randrange(seconds))})
+            points[user_id] += rows[-1]["points"]
+        async with engine.begin() as conn:
+            await conn.execute(insert(models.WasteLog), rows)
+
+    async with engine.begin() as conn:
+        if points:
+            await conn.execute(insert(models.Reward), [
+                {"user_id": user_id, "points": total, "redeemed": False} for user_id, total in points.items()])
+        open_households = rng.sample(range(1, households + 1), households // 3)
+        if open_households:
+            await conn.execute(insert(models.Pickup), [
+                {"household_id": h, "worker_id": households + 1 + rng.randrange(workers),
+                 "status": models.PickupStatus.pending}
+                for h in open_households
+            ])
+    async with AsyncSessionLocal() as db:
+        await crud.reconcile_waste_rollups(db)
+    return {"households": households, "workers": workers, "logs": logs,
+            "seed_seconds": round(time.perf_counter() - started, 3)}
+
+async def population() -> dict:
+    async with AsyncSessionLocal() as db:
+        counts = dict((await db.execute(
+            select(models.User.role, func.count(models.User.id)).group_by(models.User.role))).all())
+    households = counts.get(models.UserRole.household, 0)
+    workers = counts.get(models.UserRole.worker, 0)
+    if not households or not workers:
+        raise SystemExit("No seeded data found; run without --skip-seed first")
+    return {"households": households, "workers": workers}
+
+# --- Scenarios ---
+def bearer(user_id: int, email: str, role: str) -> dict:
+    token = auth_utils.create_access_token({"sub": email, "uid": user_id, "role": role, "ver": 0})
+    return {"Authorization": f"Bearer {token}"}
+
+class Scenarios:
+    """Builds one request per scenario for a random user of the seeded population."""
+
+    def __init__(self, households: int, workers: int, batch_readings: int):
+        self.households = households
+        self.workers = workers
+        self.batch_readings = batch_readings
+        self._headers = {}
+        admin_id = households + workers + 1
+        self.admin = bearer(admin_id, "admin@bench.example.com", "admin")
+
+    def _household(self, rng):
+        h = rng.randint(1, self.households)
+        key = ("household", h)
+        if key not in self._headers:
+            self._headers[key] = bearer(h, f"household{h - 1}@bench.example.com", "household")
+        return h, self._headers[key]
+
+    def _worker(self, rng):
+        w = rng.randrange(self.workers)
+        key = ("worker", w)
+        if key not in self._headers:
+            self._headers[key] = bearer(self.households + 1 + w, f"worker{w}@bench.example.com", "worker")
+        return self._headers[key]
+
+    @staticmethod
+    def _reading(rng, household: int) -> dict:
+        return {"device_id": f"bench-{household}", "waste_type": rng.choice(WASTE_TYPES),
+                "weight": round(rng.uniform(0.05, 3.0), 3),
+                "timestamp": datetime.now(timezone.utc).isoformat()}
+
+    def upload(self, rng):
+        return "POST", "/api/device/upload", {"json": self._reading(rng, rng.randint(1, self.households))}
+
+    def upload_batch(self, rng):
+        household = rng.randint(1, self.households)
+        readings = [self._reading(rng, household) for _ in range(self.batch_readings)]
+        return "POST", "/api/device/upload/batch", {"json": {"readings": readings}}
+
+    def login(self, rng):
+        h = rng.randrange(self.households)
+        return "POST", "/api/login", {"data": {"username": f"household{h}@bench.example.com", "password": PASSWORD}}
+
+    def household_rewards(self, rng):
+        return "GET", "/api/household/rewards", {"headers": self._household(rng)[1]}
+
+    def household_waste_logs(self, rng):
+        return "GET", "/api/household/waste-logs?limit=50", {"headers": self._household(rng)[1]}
+
+    def household_analytics(self, rng):
+        return "GET", "/api/household/analytics?bucket=week", {"headers": self._household(rng)[1]}
+
+    def worker_pickups(self, rng):
+        return "GET", "/api/worker/pickups?limit=50", {"headers": self._worker(rng)}
+
+    def admin_analytics(self, rng):
+        return "GET", "/api/admin/analytics", {"headers": self.admin}
+
+    def admin_waste_series(self, rng):
+        return "GET", "/api/admin/analytics/waste?bucket=day&by_type=true", {"headers": self.admin}
+
+    def classify(self, rng):
+        return "POST", "/api/ml/classify-waste", {"files": {"image": ("bin.jpg", IMAGE, "image/jpeg")}}
+
+def parse_mix(mix: str, scenarios: Scenarios):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if not hasattr(Scenarios, name) or name.startswith("_"):
+            raise SystemExit(f"Unknown scenario '{name}'")
+        weights[name] = float(weight or 1)
+    return [getattr(scenarios, name) for name in weights], list(weights.values())
+
+# --- Driver ---
+async def drive(client: httpx.AsyncClient, scenarios: Scenarios, mix: str,
+                concurrency: int, duration: float, warmup: float, conditional: bool = False) -> dict:
+    builders, weights = parse_mix(mix, scenarios)
+    samples = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    errors = defaultdict(int)
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def user(seed_value: int):
+        rng = random.Random(seed_value)
+        etags = {}
+        while time.perf_counter() < deadline:
+            build = rng.choices(builders, weights=weights)[0]
+            method, path, kwargs = build(rng)
+            cache_key = (path, kwargs.get("headers", {}).get("Authorization")) if method == "GET" else None
+            if conditional and cache_key in etags:
+                kwargs = {**kwargs, "headers": {**kwargs["headers"], "If-None-Match": etags[cache_key]}}
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = response.status_code
+                if cache_key and "etag" in response.headers:
+                    etags[cache_key] = response.headers["etag"]
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            finished = time.perf_counter()
+            if started < measure_from:
+                continue
+            name = build.__name__
+            samples[name].append(finished - started)
+            statuses[name][str(status)] += 1
+            if not isinstance(status, int) or status >= 400:
+                errors[name] += 1
+
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    endpoints = {}
+    for name in sorted(samples):
+        latencies = samples[name]
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": errors[name],
+            "statuses": dict(statuses[name]),
+            "rps": round(len(latencies) / duration, 2),
+            **common.summarize(latencies),
+        }
+    total = sum(len(v) for v in samples.values())
+    return {
+        "total": {"requests": total, "errors": sum(errors.values()), "rps": round(total / duration, 2),
+                  **common.summarize([s for v in samples.values() for s in v])},
+        "endpoints": endpoints,
+    }
+
+async def wait_for(url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.post(url, files={"image": ("x.jpg", b"x", "image/jpeg")})
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=common.BACKEND_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run(args) -> dict:
+    report = {
+        "benchmark": "workload",
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "dialect": engine.dialect.name,
+        "target": args.url or "in-process",
+        "size": args.size,
+        "mix": args.mix,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "warmup_seconds": args.warmup,
+        "conditional": args.conditional,
+    }
+    if args.skip_seed:
+        report["population"] = await population()
+    else:
+        size = SIZES[args.size]
+        report["population"] = await seed(size["households"], size["workers"], args.logs or size["logs"])
+    if args.seed_only:
+        return report
+
+    scenarios = Scenarios(report["population"]["households"], report["population"]["workers"], args.batch_readings)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            report.update(await drive(client, scenarios, args.mix, args.concurrency, args.duration, args.warmup,
+                                      args.conditional))
+    else:
+        from main import app, lifespan
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with lifespan(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                report.update(await drive(client, scenarios, args.mix, args.concurrency, args.duration, args.warmup,
+                                          args.conditional))
+    return report
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--logs", type=int, default=None, help="override the number of seeded logs")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,... (see the list above)")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--batch-readings", type=int, default=20)
+    parser.add_argument("--url", default=None, help="base URL of a running server")
+    parser.add_argument("--seed-only", action="store_true")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data from a previous run")
+    parser.add_argument("--conditional", action="store_true", help="send If-None-Match with the last ETag seen")
+    parser.add_argument("--output", default=None, help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    stub = None
+    if START_STUB and not args.seed_only:
+        stub = subprocess.Popen([
+            sys.executable, os.path.join(os.path.dirname(__file__), "stub_model_server.py"),
+            "--port", str(STUB_PORT), "--delay-ms", os.getenv("STUB_DELAY_MS", "50"),
+        ])
+    try:
+        if stub is not None:
+            await wait_for(os.environ["MODEL_SERVICE_URL"])
+        report = await run(args)
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
+        await dispose_engines()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    asyncio.run(main())
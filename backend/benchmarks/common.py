@@ -0,0 +1,63 @@
+# backend/benchmarks/common.py
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Run the scripts from the backend directory, e.g.
+    python benchmarks/bench_reward_concurrency.py
+
+If DATABASE_URL is not set the scripts fall back to a local SQLite file
+(requires aiosqlite); point it at Postgres for numbers that match production.
+"""
+
+import os
+import resource
+import sys
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./benchmark.db")
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile; `pct` is in the 0-100 range."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+def summarize(latencies_s) -> dict:
+    """Latency summary in milliseconds."""
+    ms = [value * 1000 for value in latencies_s]
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+def peak_rss_kb() -> int:
+    """RSS high-water mark of this process; unlike ru_maxrss it is not inherited across exec."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+async def reset_schema():
+    """Drops every table on the configured database and migrates it from scratch."""
+    from database import engine, Base
+    import migrations
+    import models  # noqa: F401  (registers the tables on Base.metadata)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(migrations.schema_version.drop, checkfirst=True)
+        await conn.run_sync(migrations.upgrade)
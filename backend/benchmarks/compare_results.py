@@ -0,0 +1,96 @@
+# backend/benchmarks/compare_results.py
+"""
+Compares two bench_workload.py reports, endpoint by endpoint.
+
+Prints requests/sec and p50/p95/p99 for both runs with the relative change,
+and exits with status 1 when an endpoint's p95 grew, or its throughput fell,
+by more than --threshold (default 15%), so it can gate a CI job. Endpoints
+with fewer than --min-requests samples in either run are shown but not judged.
+
+Usage:
+    python benchmarks/compare_results.py baseline.json candidate.json
+    python benchmarks/compare_results.py baseline.json candidate.json --threshold 0.10 --json
+"""
+
+import argparse
+import json
+import sys
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms")
+# Runs are only comparable when these match.
+SETTINGS = ("dialect", "target", "size", "mix", "concurrency", "duration_seconds", "conditional")
+
+def change(old: float, new: float):
+    return round((new - old) / old, 4) if old else None
+
+def compare(baseline: dict, candidate: dict, threshold: float, min_requests: int) -> dict:
+    rows = {}
+    regressions = []
+    endpoints = dict(baseline.get("endpoints", {}), **{"total": baseline.get("total", {})})
+    candidates = dict(candidate.get("endpoints", {}), **{"total": candidate.get("total", {})})
+    for name in sorted(set(endpoints) | set(candidates)):
+        old, new = endpoints.get(name), candidates.get(name)
+        if not old or not new:
+            rows[name] = {"missing_in": "baseline" if not old else "candidate"}
+            continue
+        row = {metric: {"baseline": old.get(metric, 0), "candidate": new.get(metric, 0),
+                        "change": change(old.get(metric, 0), new.get(metric, 0))}
+               for metric in METRICS}
+        row["errors"] = {"baseline": old.get("errors", 0), "candidate": new.get("errors", 0)}
+        rows[name] = row
+        if min(old.get("requests", 0), new.get("requests", 0)) < min_requests:
+            continue
+        if (row["p95_ms"]["change"] or 0) > threshold:
+            regressions.append(f"{name}: p95 {row['p95_ms']['baseline']} -> {row['p95_ms']['candidate']} ms")
+        if (row["rps"]["change"] or 0) < -threshold:
+            regressions.append(f"{name}: rps {row['rps']['baseline']} -> {row['rps']['candidate']}")
+    return {
+        "baseline": {key: baseline.get(key) for key in ("commit",) + SETTINGS},
+        "candidate": {key: candidate.get(key) for key in ("commit",) + SETTINGS},
+        "mismatched_settings": [key for key in SETTINGS if baseline.get(key) != candidate.get(key)],
+        "threshold": threshold,
+        "endpoints": rows,
+        "regressions": regressions,
+    }
+
+def _pct(value) -> str:
+    return "   n/a" if value is None else f"{value * 100:+6.1f}%"
+
+def print_table(result: dict) -> None:
+    print(f"baseline {result['baseline']['commit']}  vs  candidate {result['candidate']['commit']}")
+    for key in result["mismatched_settings"]:
+        print(f"warning: {key} differs ({result['baseline'][key]} vs {result['candidate'][key]})")
+    header = f"{'endpoint':<22}" + "".join(f"{metric:>26}" for metric in METRICS)
+    print(header)
+    for name, row in result["endpoints"].items():
+        if "missing_in" in row:
+            print(f"{name:<22}  (missing in {row['missing_in']})")
+            continue
+        cells = "".join(
+            f"{row[m]['baseline']:>9} -> {row[m]['candidate']:<8}{_pct(row[m]['change'])}" for m in METRICS)
+        print(f"{name:<22}{cells}")
+    for line in result["regressions"]:
+        print(f"REGRESSION {line}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--min-requests", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    result = compare(baseline, candidate, args.threshold, args.min_requests)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_table(result)
+    sys.exit(1 if result["regressions"] else 0)
+
+if __name__ == "__main__":
+    main()
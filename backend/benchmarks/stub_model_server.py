@@ -0,0 +1,84 @@
+# backend/benchmarks/stub_model_server.py
+"""
+Stand-in for the Flask model service: accepts the same uploads (`image` on
+/predict, `images` on /predict/batch, the image as the body on /predict/raw)
+and answers with canned predictions after a configurable delay. Responses
+carry `received_bytes`, the size of the image(s) that arrived. Needs no
+TensorFlow or model file.
+
+Usage:
+    python benchmarks/stub_model_server.py --port 8765 --delay-ms 150
+    MODEL_SERVICE_URL=http://127.0.0.1:8765/predict python benchmarks/bench_ml_proxy.py
+"""
+
+import argparse
+import asyncio
+import os
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+DELAY_SECONDS = float(os.getenv("STUB_DELAY_MS", "150")) / 1000
+FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+_counter = 0
+
+def _prediction() -> dict:
+    return {
+        "predicted_class": "plastic",
+        "confidence": "97.00%",
+        "recommended_dustbin": "🔵 Blue Dustbin (Dry Waste / Recyclable)",
+    }
+
+async def predict(request):
+    form = await request.form()
+    if "image" not in form:
+        return JSONResponse({"error": "No image file provided"}, status_code=400)
+    received = len(await form["image"].read())
+    return await _answer(received)
+
+async def predict_raw(request):
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+    if not received:
+        return JSONResponse({"error": "No image data provided"}, status_code=400)
+    return await _answer(received)
+
+async def _answer(received: int):
+    global _counter
+    await asyncio.sleep(DELAY_SECONDS)
+    _counter += 1
+    if FAILURE_RATE and (_counter % max(1, int(1 / FAILURE_RATE))) == 0:
+        return JSONResponse({"error": "stub failure"}, status_code=500)
+    return JSONResponse({**_prediction(), "received_bytes": received})
+
+async def predict_batch(request):
+    form = await request.form()
+    images = form.getlist("images")
+    if not images:
+        return JSONResponse({"error": "No image files provided"}, status_code=400)
+    for image in images:
+        await image.read()
+    await asyncio.sleep(DELAY_SECONDS)
+    return JSONResponse({"results": [
+        {"index": i, "filename": image.filename, **_prediction()} for i, image in enumerate(images)
+    ]})
+
+app = Starlette(routes=[
+    Route("/predict", predict, methods=["POST"]),
+    Route("/predict/batch", predict_batch, methods=["POST"]),
+    Route("/predict/raw", predict_raw, methods=["POST"]),
+])
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay-ms", type=float, default=None)
+    args = parser.parse_args()
+    if args.delay_ms is not None:
+        DELAY_SECONDS = args.delay_ms / 1000
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,100 @@
+# backend/cache.py
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+class LRUCache:
+    """
+    Small in-process cache with LRU eviction, a per-entry TTL and hit/miss
+    counters. Not shared between worker processes.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drops every entry for which predicate(key, value) is true."""
+        stale = [key for key, (value, _) in self._data.items() if predicate(key, value)]
+        for key in stale:
+            del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+# --- Device -> (user_id, role) ---
+# Keyed by the device's public device_id. Only resolved, linked devices are
+# cached so newly registered devices are picked up immediately.
+device_owner_cache = LRUCache(
+    maxsize=int(os.getenv("DEVICE_CACHE_MAXSIZE", "10000")),
+    ttl=float(os.getenv("DEVICE_CACHE_TTL_SECONDS", "300")),
+)
+
+# --- email -> schemas.User snapshot ---
+# Short-lived on purpose: used by endpoints that want the full user record
+# without a query on every call.
+user_cache = LRUCache(
+    maxsize=int(os.getenv("USER_CACHE_MAXSIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL_SECONDS", "30")),
+)
+
+# --- (resource, user_id, data version, query string) -> serialized page ---
+# Entries never go stale (a write bumps the version, so it gets a new key);
+# the TTL only bounds how long unused pages take up memory.
+response_cache = LRUCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_MAXSIZE", "2000")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300")),
+)
+
+def invalidate_device(device_id: str) -> None:
+    device_owner_cache.pop(device_id)
+
+def invalidate_user(user_id: int) -> None:
+    device_owner_cache.invalidate_where(lambda _, owner: owner[0] == user_id)
+    user_cache.invalidate_where(lambda _, user: user.id == user_id)
@@ -0,0 +1,80 @@
+# backend/conditional.py
+
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+from cache import response_cache
+from metrics import conditional_responses
+from pagination import PageParams, next_page, page_headers
+
+# Part of every ETag: bump it when a list's JSON changes shape, so clients
+# holding a copy from before the deploy download it again.
+ETAG_FORMAT = "1"
+
+_adapters: Dict[Type[BaseModel], TypeAdapter] = {}
+
+def make_etag(resource: str, user_id: int, version: int, query: str) -> str:
+    digest = hashlib.blake2b(
+        f"{ETAG_FORMAT}:{resource}:{user_id}:{version}:{query}".encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+def _dump(schema: Type[BaseModel], rows: List[Any]) -> bytes:
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(List[schema])
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+async def versioned_page(
+    request: Request,
+    db: AsyncSession,
+    *,
+    resource: str,
+    user_id: int,
+    schema: Type[BaseModel],
+    page: PageParams,
+    key: Sequence[str],
+    load: Callable[[], Awaitable[List[Any]]],
+) -> Response:
+    """
+    One page of a user's list, tagged with an ETag derived from the user's
+    data version for it. A matching If-None-Match gets 304 after a single
+    primary-key lookup. Otherwise the serialized page comes from the
+    response cache, or from `load()` (a `page.limit + 1` fetch) and is
+    cached under that version.
+    """
+    # Version first: a write committing between the two reads can only make
+    # the body newer than its ETag (one extra download later), never older.
+    version = await crud.get_data_version(db, user_id, resource)
+    query = request.url.query
+    etag = make_etag(resource, user_id, version, query)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        conditional_responses.inc(resource, "not_modified")
+        return Response(status_code=304, headers=headers)
+
+    cache_key = (resource, user_id, version, query)
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        rows, cursor = next_page(await load(), page, key)
+        cached = (_dump(schema, rows), cursor)
+        response_cache.set(cache_key, cached)
+        conditional_responses.inc(resource, "miss")
+    else:
+        conditional_responses.inc(resource, "hit")
+
+    body, cursor = cached
+    if cursor:
+        headers.update(page_headers(request, cursor))
+    return Response(content=body, media_type="application/json", headers=headers)
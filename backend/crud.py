@@ -2,19 +2,28 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func
-from typing import Optional
-from datetime import datetime
+from sqlalchemy import (func, event, inspect, delete, update, cast, case, distinct, tuple_, Date, DateTime, Integer, table,
+                        column, text, literal)
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+from datetime import date, datetime, time, timedelta, timezone
+from collections import defaultdict
 import models, schemas
-from password_utils import get_password_hash
+from cache import device_owner_cache, invalidate_device, invalidate_user
+from password_utils import aget_password_hash
+from push import queue_event
 
 # --- User CRUD ---
 async def get_user_by_email(db: AsyncSession, email: str):
     result = await db.execute(select(models.User).filter(models.User.email == email))
     return result.scalars().first()
 
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    result = await db.execute(select(models.User).filter(models.User.id == user_id))
+    return result.scalars().first()
+
 async def create_user(db: AsyncSession, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await aget_password_hash(user.password)
     db_user = models.User(
         name=user.name,
         email=user.email,
@@ -28,39 +37,191 @@ async def create_user(db: AsyncSession, user: schemas.UserCreate):
     await db.refresh(db_user)
     return db_user
 
+async def revoke_user_tokens(db: AsyncSession, user_id: int):
+    """Invalidates every access token issued to the user so far."""
+    user = await get_user_by_id(db, user_id)
+    if not user:
+        return None
+    user.token_version = (user.token_version or 0) + 1
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+# --- Keyset Pagination ---
+# List queries sort newest first on a unique key and continue strictly after
+# the key of the previous page (see pagination.py). `limit` is usually the
+# page size + 1 so the caller can tell whether another page exists.
+WASTE_LOG_PAGE_KEY = ("timestamp", "id")
+PICKUP_PAGE_KEY = ("date", "id")
+ID_PAGE_KEY = ("id",)
+# Python types of those keys, for validating cursors (pagination.page_params)
+WASTE_LOG_PAGE_TYPES = (datetime, int)
+PICKUP_PAGE_TYPES = (datetime, int)
+ID_PAGE_TYPES = (int,)
+
+def _keyset(query, columns, after: Optional[Tuple] = None, limit: Optional[int] = None):
+    if after is not None:
+        query = query.filter(tuple_(*columns) < tuple_(*after))
+    query = query.order_by(*(column.desc() for column in columns))
+    return query.limit(limit) if limit else query
+
 # --- WasteLog CRUD ---
-async def get_waste_logs_by_user(db: AsyncSession, user_id: int):
-    result = await db.execute(select(models.WasteLog).filter(models.WasteLog.user_id == user_id))
+async def get_waste_logs_by_user(db: AsyncSession, user_id: int, *, limit: Optional[int] = None, after: Optional[Tuple] = None):
+    query = select(models.WasteLog).filter(models.WasteLog.user_id == user_id)
+    query = _keyset(query, (models.WasteLog.timestamp, models.WasteLog.id), after, limit)
+    result = await db.execute(query)
     return result.scalars().all()
 
+def waste_logs_export_query(user_id: int):
+    """Column-level select of a household's logs, oldest first, for streaming exports."""
+    log = models.WasteLog
+    return (
+        select(log.id, log.user_id, log.waste_type, log.weight, log.points, log.timestamp)
+        .filter(log.user_id == user_id)
+        .order_by(log.timestamp, log.id)
+    )
+
 # --- Reward CRUD ---
-async def get_rewards_by_user(db: AsyncSession, user_id: int):
-    result = await db.execute(select(models.Reward).filter(models.Reward.user_id == user_id))
+async def get_rewards_by_user(db: AsyncSession, user_id: int, *, limit: Optional[int] = None, after: Optional[Tuple] = None):
+    query = select(models.Reward).filter(models.Reward.user_id == user_id)
+    query = _keyset(query, (models.Reward.id,), after, limit)
+    result = await db.execute(query)
     return result.scalars().all()
 
 # --- Pickup CRUD ---
-async def get_pickups_by_worker(db: AsyncSession, worker_id: int):
-    result = await db.execute(select(models.Pickup).filter(models.Pickup.worker_id == worker_id))
+async def get_pickups_by_worker(db: AsyncSession, worker_id: int, *, limit: Optional[int] = None, after: Optional[Tuple] = None):
+    query = select(models.Pickup).filter(models.Pickup.worker_id == worker_id)
+    query = _keyset(query, (models.Pickup.date, models.Pickup.id), after, limit)
+    result = await db.execute(query)
     return result.scalars().all()
 
+def pickups_export_query(worker_id: int):
+    pickup = models.Pickup
+    return (
+        select(pickup.id, pickup.worker_id, pickup.household_id, pickup.status, pickup.date)
+        .filter(pickup.worker_id == worker_id)
+        .order_by(pickup.date, pickup.id)
+    )
+
 async def get_pickup_by_id(db: AsyncSession, pickup_id: int):
     result = await db.execute(select(models.Pickup).filter(models.Pickup.id == pickup_id))
     return result.scalars().first()
 
 # --- Admin CRUD ---
-async def get_total_waste_collected(db: AsyncSession):
-    result = await db.execute(select(func.sum(models.WasteLog.weight)))
-    return result.scalar_one_or_none() or 0.0
+# Served from the analytics rollups (see "Analytics Rollups" below), never from waste_logs.
+async def get_waste_type_totals(db: AsyncSession):
+    result = await db.execute(select(models.WasteTypeTotal).order_by(models.WasteTypeTotal.waste_type))
+    return result.scalars().all()
 
 async def get_active_households_count(db: AsyncSession):
-    result = await db.execute(select(func.count(models.User.id)).filter(models.User.role == 'household'))
+    """Households that have logged waste at least once."""
+    result = await db.execute(
+        select(func.count(models.HouseholdWasteTotal.id)).filter(models.HouseholdWasteTotal.log_count > 0)
+    )
     return result.scalar_one()
 
 # --- Device CRUD ---
-async def get_all_devices(db: AsyncSession):
-    result = await db.execute(select(models.Device))
+async def get_all_devices(db: AsyncSession, *, limit: Optional[int] = None, after: Optional[Tuple] = None):
+    query = _keyset(select(models.Device), (models.Device.id,), after, limit)
+    result = await db.execute(query)
     return result.scalars().all()
 
+def devices_export_query():
+    device = models.Device
+    return select(device.id, device.device_id, device.user_id, device.status).order_by(device.id)
+
+DeviceOwner = Tuple[Optional[int], Optional[models.UserRole]]
+
+def _device_owner_query(device_ids: Iterable[str]):
+    return (
+        select(models.Device.device_id, models.Device.user_id, models.User.role)
+        .outerjoin(models.User, models.User.id == models.Device.user_id)
+        .filter(models.Device.device_id.in_(device_ids))
+    )
+
+async def resolve_device_owners(db: AsyncSession, device_ids: Iterable[str]) -> Dict[str, DeviceOwner]:
+    """
+    Maps device_id -> (user_id, role) using the in-process cache and a single
+    joined query for the misses. Unknown devices are absent from the result;
+    devices without a linked user map to (None, None).
+    """
+    owners: Dict[str, DeviceOwner] = {}
+    missing = []
+    for device_id in set(device_ids):
+        owner = device_owner_cache.get(device_id)
+        if owner is None:
+            missing.append(device_id)
+        else:
+            owners[device_id] = owner
+    if missing:
+        result = await db.execute(_device_owner_query(missing))
+        for device_id, user_id, role in result.all():
+            owner = (user_id, role)
+            owners[device_id] = owner
+            if user_id is not None and role is not None:
+                device_owner_cache.set(device_id, owner)
+    return owners
+
+async def resolve_device_owner(db: AsyncSession, device_id: str) -> Optional[DeviceOwner]:
+    owners = await resolve_device_owners(db, [device_id])
+    return owners.get(device_id)
+
+# Keep the device owner cache honest whenever the ORM changes a device or user.
+# Core-level UPDATE/DELETE statements bypass these hooks and must call
+# cache.invalidate_device / cache.invalidate_user themselves.
+@event.listens_for(models.Device, "after_update")
+@event.listens_for(models.Device, "after_delete")
+def _invalidate_device_owner(mapper, connection, target):
+    invalidate_device(target.device_id)
+    for old_device_id in inspect(target).attrs.device_id.history.deleted or ():
+        invalidate_device(old_device_id)
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_user_devices(mapper, connection, target):
+    invalidate_user(target.id)
+
+# --- Data Versions ---
+# A counter per (user, list) that goes up with every write to that list, in
+# the write's own transaction. Conditional GETs compare it instead of
+# re-running the list query. Writes that bypass these helpers (scripts,
+# manual SQL) must bump it too, or clients keep their cached copy.
+WASTE_LOGS = "waste_logs"
+REWARDS = "rewards"
+PICKUPS = "pickups"
+
+async def bump_data_versions(db: AsyncSession, resource: str, user_ids: Iterable[int]):
+    """Does not commit."""
+    # Sorted so concurrent writers take row locks in the same order.
+    user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+    if not user_ids:
+        return
+    insert = _dialect_insert(db)
+    stmt = insert(models.DataVersion).values(
+        [{"user_id": user_id, "resource": resource, "version": 1} for user_id in user_ids])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.DataVersion.user_id, models.DataVersion.resource],
+        set_={"version": models.DataVersion.version + 1},
+    ))
+
+async def get_data_version(db: AsyncSession, user_id: int, resource: str) -> int:
+    result = await db.execute(
+        select(models.DataVersion.version)
+        .filter(models.DataVersion.user_id == user_id, models.DataVersion.resource == resource)
+    )
+    return result.scalar() or 0
+
+# --- Push Events ---
+# Published to the users' open event streams (push.py) when the write commits.
+def _pickup_event(db: AsyncSession, *, pickup_id: int, worker_id: int, household_id: int, status) -> None:
+    queue_event(db, (worker_id, household_id), "pickup", {
+        "id": pickup_id, "worker_id": worker_id, "household_id": household_id,
+        "status": getattr(status, "value", status),
+    })
+
+def _reward_event(db: AsyncSession, *, user_id: int, points: int) -> None:
+    queue_event(db, (user_id,), "reward", {"user_id": user_id, "points": points})
+
 # --- New Business Logic Helpers ---
 async def create_waste_log(
     db: AsyncSession,
@@ -69,7 +230,8 @@ async def create_waste_log(
     waste_type: str,
     weight: float,
     points: int,
-    timestamp: Optional[datetime] = None
+    timestamp: Optional[datetime] = None,
+    commit: bool = True
 ):
     log = models.WasteLog(
         user_id=user_id,
@@ -79,32 +241,35 @@ async def create_waste_log(
         timestamp=timestamp,  # if None, model default applies
     )
     db.add(log)
-    await db.commit()
-    await db.refresh(log)
+    await bump_data_versions(db, WASTE_LOGS, [user_id])
+    if commit:
+        await db.commit()
+        await db.refresh(log)
     return log
 
-async def update_or_create_reward(
-    db: AsyncSession,
-    *,
-    user_id: int,
-    points_to_add: int
-):
-    result = await db.execute(select(models.Reward).filter(models.Reward.user_id == user_id))
-    reward = result.scalars().first()
-    if reward:
-        reward.points = (reward.points or 0) + points_to_add
-    else:
-        reward = models.Reward(user_id=user_id, points=points_to_add, redeemed=False)
-        db.add(reward)
-    await db.commit()
-    await db.refresh(reward)
-    return reward
+def _dialect_insert(db: AsyncSession):
+    """Returns the dialect-specific insert() that supports ON CONFLICT."""
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Upserts are not supported on '{dialect}'")
+
+def _reward_upsert(db: AsyncSession, rows: List[Dict[str, Any]]):
+    insert = _dialect_insert(db)
+    stmt = insert(models.Reward).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[models.Reward.user_id],
+        set_={"points": func.coalesce(models.Reward.points, 0) + stmt.excluded.points},
+    )
 
 async def create_pickup(
     db: AsyncSession,
     *,
     household_id: int,
-    worker_id: int
+    worker_id: int,
+    commit: bool = True
 ):
     pickup = models.Pickup(
         household_id=household_id,
@@ -112,8 +277,12 @@ async def create_pickup(
         status=models.PickupStatus.pending,
     )
     db.add(pickup)
-    await db.commit()
-    await db.refresh(pickup)
+    await bump_data_versions(db, PICKUPS, [worker_id])
+    await db.flush()
+    _pickup_event(db, pickup_id=pickup.id, worker_id=worker_id, household_id=household_id, status=pickup.status)
+    if commit:
+        await db.commit()
+        await db.refresh(pickup)
     return pickup
 
 async def update_pickup_status(
@@ -126,6 +295,522 @@ async def update_pickup_status(
     if not pickup:
         return None
     pickup.status = new_status
+    await bump_data_versions(db, PICKUPS, [pickup.worker_id])
+    _pickup_event(db, pickup_id=pickup.id, worker_id=pickup.worker_id, household_id=pickup.household_id,
+                  status=new_status)
     await db.commit()
     await db.refresh(pickup)
-    return pickup
\ No newline at end of file
+    return pickup
+
+# --- Bulk Ingestion Helpers ---
+# These helpers only stage changes on the session; the caller owns the commit
+# so a whole batch lands in a single transaction.
+async def bulk_create_waste_logs(db: AsyncSession, rows: List[Dict[str, Any]]):
+    logs = [models.WasteLog(**row) for row in rows]
+    db.add_all(logs)
+    await bump_data_versions(db, WASTE_LOGS, (row["user_id"] for row in rows))
+    await db.flush()
+    return logs
+
+async def add_reward_points_bulk(db: AsyncSession, points_by_user: Dict[int, int]):
+    if not points_by_user:
+        return
+    # Sorted so concurrent batches take row locks in the same order.
+    rows = [
+        {"user_id": user_id, "points": points, "redeemed": False}
+        for user_id, points in sorted(points_by_user.items())
+    ]
+    result = await db.execute(_reward_upsert(db, rows).returning(models.Reward.user_id, models.Reward.points))
+    for user_id, points in result.all():
+        _reward_event(db, user_id=user_id, points=points)
+    await bump_data_versions(db, REWARDS, points_by_user)
+
+# --- Pickup Assignment ---
+PENDING_PICKUP = text("status = 'pending'")
+
+async def get_worker_ids(db: AsyncSession) -> List[int]:
+    result = await db.execute(select(models.User.id).filter(models.User.role == models.UserRole.worker))
+    return list(result.scalars().all())
+
+async def get_open_pickups(db: AsyncSession, *, with_address: bool = False):
+    """(worker_id, household_id, household address or None) of every pending pickup."""
+    pickup = models.Pickup
+    address = models.User.address if with_address else literal(None)
+    query = select(pickup.worker_id, pickup.household_id, address).filter(pickup.status == models.PickupStatus.pending)
+    if with_address:
+        query = query.join(models.User, models.User.id == pickup.household_id)
+    return (await db.execute(query)).all()
+
+async def get_pending_pickup_workers(db: AsyncSession, household_ids: List[int]) -> Dict[int, int]:
+    """household_id -> worker_id of the households that already have an open pickup."""
+    pickup = models.Pickup
+    result = await db.execute(
+        select(pickup.household_id, pickup.worker_id)
+        .filter(pickup.household_id.in_(household_ids), pickup.status == models.PickupStatus.pending)
+    )
+    return dict(result.all())
+
+async def get_user_addresses(db: AsyncSession, user_ids: List[int]) -> Dict[int, Optional[str]]:
+    result = await db.execute(select(models.User.id, models.User.address).filter(models.User.id.in_(user_ids)))
+    return dict(result.all())
+
+async def create_pending_pickups(db: AsyncSession, assignments: Dict[int, int]) -> List[int]:
+    """
+    Opens a pickup per household_id -> worker_id, skipping households that
+    got one concurrently (uq_pickups_household_pending). Returns the
+    households whose pickup was created. Does not commit.
+    """
+    if not assignments:
+        return []
+    insert = _dialect_insert(db)
+    rows = [
+        {"household_id": household_id, "worker_id": worker_id, "status": models.PickupStatus.pending}
+        for household_id, worker_id in sorted(assignments.items())
+    ]
+    result = await db.execute(
+        insert(models.Pickup).values(rows)
+        .on_conflict_do_nothing(index_elements=[models.Pickup.household_id], index_where=PENDING_PICKUP)
+        .returning(models.Pickup.id, models.Pickup.household_id)
+    )
+    created = []
+    for pickup_id, household_id in result.all():
+        _pickup_event(db, pickup_id=pickup_id, worker_id=assignments[household_id], household_id=household_id,
+                      status=models.PickupStatus.pending)
+        created.append(household_id)
+    await bump_data_versions(db, PICKUPS, (assignments[household_id] for household_id in created))
+    return created
+
+# --- Analytics Rollups ---
+# Per-day/per-type, per-type and per-household totals. The outbox consumer
+# adds each log to them in the transaction that applies its waste_logged
+# event; reconcile_waste_rollups() recomputes them from waste_logs to correct
+# any drift (e.g. rows written by scripts).
+_ROLLUP_SUMS = ("log_count", "total_weight", "total_points")
+# Idempotency key prefix of a waste log's outbox event ("waste_log:<id>").
+WASTE_LOG_EVENT_PREFIX = "waste_log:"
+# Arbitrary key of the Postgres advisory lock held by a reconciliation run.
+ROLLUP_RECONCILE_LOCK_KEY = 72_310_002
+
+def waste_type_key(waste_type: Optional[str]) -> str:
+    """Rollups group waste types case-insensitively; blank types become "unknown"."""
+    return (waste_type or "").strip().lower() or "unknown"
+
+def _waste_type_key_sql(column):
+    return func.coalesce(func.nullif(func.lower(func.trim(column)), ""), "unknown")
+
+def _log_day(timestamp: Optional[datetime]) -> date:
+    """UTC day of a log; logs without a timestamp are stamped now by the database."""
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc)
+    elif timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+def _as_date(value) -> date:
+    # SQLite returns date() as an ISO string.
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def _rollup_upsert(db: AsyncSession, model, key_columns: List[str], rows: List[Dict[str, Any]], *, overwrite: bool = False):
+    insert = _dialect_insert(db)
+    stmt = insert(model).values(rows)
+    if overwrite:
+        set_ = {name: getattr(stmt.excluded, name) for name in _ROLLUP_SUMS}
+    else:
+        set_ = {name: getattr(model, name) + getattr(stmt.excluded, name) for name in _ROLLUP_SUMS}
+    return stmt.on_conflict_do_update(index_elements=key_columns, set_=set_)
+
+def _rollup_rows(key_columns: Tuple[str, ...], totals: Dict[tuple, List]) -> List[Dict[str, Any]]:
+    # Sorted so concurrent writers take row locks in the same order.
+    return [
+        {**dict(zip(key_columns, key)), **dict(zip(_ROLLUP_SUMS, sums))}
+        for key, sums in sorted(totals.items())
+    ]
+
+async def add_waste_rollups(db: AsyncSession, logs: Iterable[Dict[str, Any]]):
+    """
+    Adds a set of new waste logs (dicts with user_id, waste_type, weight,
+    points, timestamp) to the rollups. Does not commit.
+    """
+    daily = defaultdict(lambda: [0, 0.0, 0])
+    by_type = defaultdict(lambda: [0, 0.0, 0])
+    by_household = defaultdict(lambda: [0, 0.0, 0])
+    for log in logs:
+        waste_type = waste_type_key(log["waste_type"])
+        for totals, key in (
+            (daily, (_log_day(log.get("timestamp")), waste_type)),
+            (by_type, (waste_type,)),
+            (by_household, (log["user_id"],)),
+        ):
+            sums = totals[key]
+            sums[0] += 1
+            sums[1] += log["weight"] or 0.0
+            sums[2] += log["points"] or 0
+    if not daily:
+        return
+    await db.execute(_rollup_upsert(
+        db, models.WasteDailyTotal, ["day", "waste_type"], _rollup_rows(("day", "waste_type"), daily)))
+    await db.execute(_rollup_upsert(
+        db, models.WasteTypeTotal, ["waste_type"], _rollup_rows(("waste_type",), by_type)))
+    await db.execute(_rollup_upsert(
+        db, models.HouseholdWasteTotal, ["user_id"], _rollup_rows(("user_id",), by_household)))
+
+def _sums_differ(a, b) -> bool:
+    return a[0] != b[0] or a[2] != b[2] or abs(a[1] - b[1]) > 1e-6
+
+async def _reconcile_rollup(db: AsyncSession, model, key_columns: Tuple[str, ...], truth: Dict[tuple, tuple], *scope) -> int:
+    """Makes the rollup rows matching `scope` equal to `truth`; returns the number of rows fixed."""
+    columns = [getattr(model, name) for name in key_columns]
+    result = await db.execute(
+        select(model.id, *columns, model.log_count, model.total_weight, model.total_points).filter(*scope)
+    )
+    existing = {}
+    for row in result.all():
+        key = tuple(_as_date(v) if name == "day" else v for name, v in zip(key_columns, row[1:-3]))
+        existing[key] = (row.id, tuple(row[-3:]))
+
+    changed = {key: sums for key, sums in truth.items()
+               if key not in existing or _sums_differ(existing[key][1], sums)}
+    stale = [row_id for key, (row_id, _) in existing.items() if key not in truth]
+    if changed:
+        await db.execute(_rollup_upsert(
+            db, model, list(key_columns), _rollup_rows(key_columns, changed), overwrite=True))
+    if stale:
+        await db.execute(delete(model).where(model.id.in_(stale)))
+    return len(changed) + len(stale)
+
+def _unapplied_log_ids():
+    """Ids of the waste logs whose outbox event is still pending (or failed): not in the rollups yet."""
+    outbox = models.OutboxEvent
+    return (
+        select(cast(func.substr(outbox.idempotency_key, len(WASTE_LOG_EVENT_PREFIX) + 1), Integer))
+        .filter(outbox.idempotency_key.startswith(WASTE_LOG_EVENT_PREFIX),
+                outbox.status != models.OutboxStatus.done)
+    )
+
+async def _lock_rollups(db: AsyncSession, wait: bool) -> bool:
+    """
+    Locks the rollup tables against writes until the transaction ends, so
+    no consumer increment lands between a reconciliation's reads and its
+    absolute writes. On Postgres runs also take an advisory lock: with
+    wait=False, returns False at once if another run holds it.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        if wait:
+            await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ROLLUP_RECONCILE_LOCK_KEY})
+        elif not (await db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ROLLUP_RECONCILE_LOCK_KEY})).scalar():
+            return False
+        # Conflicts with the consumer's INSERT ... ON CONFLICT, not with readers.
+        await db.execute(text(
+            "LOCK TABLE waste_daily_totals, waste_type_totals, household_waste_totals IN SHARE ROW EXCLUSIVE MODE"))
+    elif dialect == "sqlite":
+        # Any write statement takes SQLite's database-wide write lock until commit.
+        await db.execute(text("UPDATE waste_type_totals SET log_count = log_count WHERE 0 = 1"))
+    return True
+
+async def reconcile_waste_rollups(
+    db: AsyncSession, *, since: Optional[date] = None, wait: bool = True
+) -> Optional[Dict[str, int]]:
+    """
+    Recomputes the rollups from waste_logs and commits the corrections.
+    With `since`, only daily rows from that day on are recomputed; the
+    per-type totals are then rebuilt from the daily rows.
+    Per-household totals span all history and are only checked in a full run.
+    Logs whose event the outbox consumer has not applied yet are left out,
+    as the consumer adds them when it does.
+
+    The rollups stay locked against the consumer until the run commits.
+    With wait=False, returns None when another run is in progress (Postgres).
+    """
+    if not await _lock_rollups(db, wait):
+        await db.rollback()
+        return None
+    log = models.WasteLog
+    waste_type = _waste_type_key_sql(log.waste_type)
+    sums = (func.count(log.id), func.coalesce(func.sum(log.weight), 0.0), func.coalesce(func.sum(log.points), 0))
+    applied = log.id.not_in(_unapplied_log_ids())
+
+    day = func.date(_utc_wall_clock(db, log.timestamp))
+    daily_query = select(day, waste_type, *sums).filter(applied).group_by(day, waste_type)
+    daily_scope = []
+    if since is not None:
+        daily_query = daily_query.filter(log.timestamp >= _day_start(since))
+        daily_scope.append(models.WasteDailyTotal.day >= since)
+    daily_truth = {(_as_date(d), t): (c, w, p) for d, t, c, w, p in (await db.execute(daily_query)).all()}
+    fixed = {"daily": await _reconcile_rollup(db, models.WasteDailyTotal, ("day", "waste_type"), daily_truth, *daily_scope)}
+
+    daily = models.WasteDailyTotal
+    type_query = select(
+        daily.waste_type, func.sum(daily.log_count), func.sum(daily.total_weight), func.sum(daily.total_points)
+    ).group_by(daily.waste_type)
+    type_truth = {(t,): (c, w, p) for t, c, w, p in (await db.execute(type_query)).all()}
+    fixed["waste_type"] = await _reconcile_rollup(db, models.WasteTypeTotal, ("waste_type",), type_truth)
+
+    if since is None:
+        household_query = (
+            select(log.user_id, *sums).filter(log.user_id.is_not(None), applied).group_by(log.user_id)
+        )
+        household_truth = {(u,): (c, w, p) for u, c, w, p in (await db.execute(household_query)).all()}
+        fixed["household"] = await _reconcile_rollup(
+            db, models.HouseholdWasteTotal, ("user_id",), household_truth)
+
+    await db.commit()
+    return fixed
+
+# --- Time-bucketed Analytics ---
+# Date ranges are inclusive UTC days. Global series come from the daily
+# rollups; per-household series read waste_logs through the
+# (user_id, timestamp) index, or the optional materialized view.
+WASTE_HOUSEHOLD_DAILY_MV = "waste_household_daily_mv"
+
+household_daily_mv = table(
+    WASTE_HOUSEHOLD_DAILY_MV,
+    column("user_id"), column("day"), column("waste_type"),
+    column("log_count"), column("total_weight"), column("total_points"),
+)
+
+def _utc_wall_clock(db: AsyncSession, expr):
+    """
+    A timestamptz as UTC wall-clock time, so date() and date_trunc() cut days
+    at UTC midnight rather than in the session's time zone. SQLite stores
+    timestamps as UTC wall-clock already.
+    """
+    if db.bind.dialect.name == "postgresql":
+        return func.timezone("UTC", expr)
+    return expr
+
+def _time_bucket(db: AsyncSession, expr, bucket: str):
+    """Start day of the day / week (Monday) / month containing `expr` (a UTC timestamp or a day)."""
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        # Truncate a plain timestamp: on timestamptz (or a date promoted to
+        # one) date_trunc would follow the session time zone.
+        expr = _utc_wall_clock(db, expr) if isinstance(expr.type, DateTime) else cast(expr, DateTime())
+        return cast(func.date_trunc(bucket, expr), Date)
+    if dialect == "sqlite":
+        if bucket == "day":
+            return func.date(expr)
+        if bucket == "week":
+            return func.date(expr, "weekday 0", "-6 days")
+        return func.strftime("%Y-%m-01", expr)
+    raise NotImplementedError(f"Time buckets are not supported on '{dialect}'")
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+async def _series(db: AsyncSession, query, group_columns, bucket: Optional[str]) -> List[Dict[str, Any]]:
+    query = query.group_by(*group_columns).order_by(*group_columns)
+    points = []
+    for row in (await db.execute(query)).all():
+        point = dict(row._mapping)
+        if bucket:
+            point["period"] = _as_date(point["period"])
+        point["total_weight"] = point["total_weight"] or 0.0
+        point["total_points"] = point["total_points"] or 0
+        points.append(point)
+    return points
+
+def _group_columns(db: AsyncSession, day_column, type_column, bucket: Optional[str], by_type: bool):
+    columns = []
+    if bucket:
+        columns.append(_time_bucket(db, day_column, bucket).label("period"))
+    if by_type:
+        columns.append(type_column.label("waste_type"))
+    return columns
+
+async def get_rollup_series(
+    db: AsyncSession,
+    *,
+    start: date,
+    end: date,
+    bucket: Optional[str] = None,
+    waste_type: Optional[str] = None,
+    by_type: bool = False
+) -> List[Dict[str, Any]]:
+    """System-wide totals per bucket (and waste type) from the daily rollups."""
+    daily = models.WasteDailyTotal
+    group_columns = _group_columns(db, daily.day, daily.waste_type, bucket, by_type)
+    query = select(
+        *group_columns,
+        func.sum(daily.log_count).label("log_count"),
+        func.sum(daily.total_weight).label("total_weight"),
+        func.sum(daily.total_points).label("total_points"),
+    ).filter(daily.day >= start, daily.day <= end)
+    if waste_type:
+        query = query.filter(daily.waste_type == waste_type_key(waste_type))
+    return await _series(db, query, group_columns, bucket)
+
+async def get_waste_log_series(
+    db: AsyncSession,
+    *,
+    start: date,
+    end: date,
+    bucket: Optional[str] = None,
+    user_id: Optional[int] = None,
+    waste_type: Optional[str] = None,
+    by_type: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Totals per bucket (and waste type) straight from waste_logs. Filtering by
+    user_id or waste_type turns the timestamp range into a composite index
+    range scan; waste_type is matched exactly as stored so that index applies.
+    """
+    log = models.WasteLog
+    group_columns = _group_columns(db, log.timestamp, _waste_type_key_sql(log.waste_type), bucket, by_type)
+    query = select(
+        *group_columns,
+        func.count(log.id).label("log_count"),
+        func.sum(log.weight).label("total_weight"),
+        func.sum(log.points).label("total_points"),
+    ).filter(log.timestamp >= _day_start(start), log.timestamp < _day_start(end + timedelta(days=1)))
+    if user_id is not None:
+        query = query.filter(log.user_id == user_id)
+    if waste_type:
+        query = query.filter(log.waste_type == waste_type)
+    return await _series(db, query, group_columns, bucket)
+
+async def get_household_mv_series(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    start: date,
+    end: date,
+    bucket: Optional[str] = None,
+    by_type: bool = False
+) -> List[Dict[str, Any]]:
+    """Same shape as get_waste_log_series, from the Postgres materialized view."""
+    mv = household_daily_mv
+    group_columns = _group_columns(db, mv.c.day, mv.c.waste_type, bucket, by_type)
+    query = select(
+        *group_columns,
+        func.sum(mv.c.log_count).label("log_count"),
+        func.sum(mv.c.total_weight).label("total_weight"),
+        func.sum(mv.c.total_points).label("total_points"),
+    ).filter(mv.c.user_id == user_id, mv.c.day >= start, mv.c.day <= end)
+    return await _series(db, query, group_columns, bucket)
+
+def merge_series(*series: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Adds up points with the same period/waste_type from several sources."""
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for points in series:
+        for point in points:
+            key = (point.get("period"), point.get("waste_type"))
+            if key not in merged:
+                merged[key] = dict(point)
+            else:
+                for name in _ROLLUP_SUMS:
+                    merged[key][name] += point[name]
+    return [merged[key] for key in sorted(merged, key=lambda k: (k[0] or date.min, k[1] or ""))]
+
+async def get_worker_pickup_stats(db: AsyncSession, *, start: date, end: date) -> List[Dict[str, Any]]:
+    """Pickups per worker in the range, split by status, with distinct households served."""
+    pickup = models.Pickup
+    query = (
+        select(
+            pickup.worker_id,
+            models.User.name,
+            func.count(pickup.id).label("pickups"),
+            func.sum(case((pickup.status == models.PickupStatus.collected, 1), else_=0)).label("collected"),
+            func.count(distinct(pickup.household_id)).label("households"),
+        )
+        .join(models.User, models.User.id == pickup.worker_id)
+        .filter(pickup.date >= _day_start(start), pickup.date < _day_start(end + timedelta(days=1)))
+        .group_by(pickup.worker_id, models.User.name)
+        .order_by(pickup.worker_id)
+    )
+    stats = []
+    for row in (await db.execute(query)).all():
+        collected = row.collected or 0
+        stats.append({
+            "worker_id": row.worker_id,
+            "name": row.name,
+            "pickups": row.pickups,
+            "collected": collected,
+            "pending": row.pickups - collected,
+            "households": row.households,
+        })
+    return stats
+
+# --- Outbox ---
+async def enqueue_outbox_events(db: AsyncSession, events: List[Dict[str, Any]]):
+    """
+    Stages events (dicts with kind, idempotency_key, payload) in the caller's
+    transaction. Keys that were already enqueued are skipped. Does not commit.
+    """
+    if not events:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [
+        {**event, "status": models.OutboxStatus.pending, "attempts": 0, "created_at": now, "available_at": now}
+        for event in events
+    ]
+    insert = _dialect_insert(db)
+    await db.execute(insert(models.OutboxEvent).values(rows).on_conflict_do_nothing(
+        index_elements=[models.OutboxEvent.idempotency_key]))
+
+class OutboxClaimConflict(Exception):
+    """Another consumer claimed some of the selected events first."""
+
+async def claim_outbox_events(db: AsyncSession, *, limit: int, ids: Optional[List[int]] = None):
+    """
+    Marks up to `limit` due pending events as done and returns them, inside
+    the caller's transaction. The caller applies their side effects in the
+    same transaction, so either both commit or the events stay pending: a
+    retried batch can never apply an event twice.
+
+    Postgres consumers skip rows locked by other consumers (SKIP LOCKED);
+    the conditional UPDATE below catches races on databases without it.
+    """
+    now = datetime.now(timezone.utc)
+    event = models.OutboxEvent
+    query = select(event.id).filter(event.status == models.OutboxStatus.pending, event.available_at <= now)
+    if ids is not None:
+        query = query.filter(event.id.in_(ids))
+    query = query.order_by(event.id).limit(limit).with_for_update(skip_locked=True)
+    claimed = list((await db.execute(query)).scalars().all())
+    if not claimed:
+        return []
+
+    result = await db.execute(
+        update(event)
+        .where(event.id.in_(claimed), event.status == models.OutboxStatus.pending)
+        .values(status=models.OutboxStatus.done, processed_at=now, attempts=event.attempts + 1)
+    )
+    if result.rowcount != len(claimed):
+        raise OutboxClaimConflict(f"{len(claimed) - result.rowcount} of {len(claimed)} events were already claimed")
+    events = await db.execute(select(event).filter(event.id.in_(claimed)).order_by(event.id))
+    return events.scalars().all()
+
+async def record_outbox_failure(db: AsyncSession, *, event_id: int, error: str, retry_at: Optional[datetime]):
+    """Counts a failed attempt; the event is retried at `retry_at`, or parked as failed when None."""
+    event = models.OutboxEvent
+    values = {"attempts": event.attempts + 1, "last_error": error[:1000]}
+    if retry_at is None:
+        values["status"] = models.OutboxStatus.failed
+    else:
+        values["available_at"] = retry_at
+    await db.execute(update(event).where(event.id == event_id).values(**values))
+    await db.commit()
+
+async def get_outbox_attempts(db: AsyncSession, event_id: int) -> int:
+    result = await db.execute(select(models.OutboxEvent.attempts).filter(models.OutboxEvent.id == event_id))
+    return result.scalar_one_or_none() or 0
+
+async def get_pending_outbox_ids(db: AsyncSession, *, limit: int) -> List[int]:
+    now = datetime.now(timezone.utc)
+    event = models.OutboxEvent
+    result = await db.execute(
+        select(event.id)
+        .filter(event.status == models.OutboxStatus.pending, event.available_at <= now)
+        .order_by(event.id).limit(limit)
+    )
+    return list(result.scalars().all())
+
+async def delete_processed_outbox_events(db: AsyncSession, *, older_than: datetime) -> int:
+    event = models.OutboxEvent
+    result = await db.execute(
+        delete(event).where(event.status == models.OutboxStatus.done, event.processed_at < older_than)
+    )
+    await db.commit()
+    return result.rowcount
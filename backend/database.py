@@ -2,37 +2,176 @@
 
 import os
 import logging
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import exc as sa_exc
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
-import traceback
+from fastapi import Depends, HTTPException
+from metrics import instrument_engine
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional read replica for read-only endpoints; defaults to the primary.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
 
 if not DATABASE_URL:
     logger.critical("DATABASE_URL not found in environment variables.")
     raise ValueError("No DATABASE_URL found. Please set it in your .env file.")
 
-engine = create_async_engine(DATABASE_URL)
+# --- Pool configuration (per engine, per worker process) ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds a request waits for a free connection before failing.
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Connections older than this are replaced (managed Postgres drops idle ones).
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# asyncpg prepared statements cached per connection; set 0 behind PgBouncer in transaction mode.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how many callers wait for a connection and for how long."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - started
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return connection
+
+    def metrics(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "max_overflow": self._max_overflow,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.wait_seconds_max * 1000, 3),
+        }
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite") and ":memory:" in url:
+        return {}
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+read_engine = (
+    create_async_engine(DATABASE_READ_URL, **_engine_options(DATABASE_READ_URL))
+    if DATABASE_READ_URL else engine
+)
+
+instrument_engine(engine, "primary")
+if read_engine is not engine:
+    instrument_engine(read_engine, "replica")
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+ReadSessionLocal = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 Base = declarative_base()
 
-async def get_db():
-    async with AsyncSessionLocal() as session:
+def create_missing_indexes(sync_conn):
+    """create_all() only indexes new tables; this adds indexes declared later to existing ones."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+def pool_stats() -> dict:
+    """Connection pool utilisation of the primary (and replica) engine in this worker."""
+    def describe(pool):
+        if isinstance(pool, InstrumentedQueuePool):
+            return {"pool": type(pool).__name__, **pool.metrics()}
+        return {"pool": type(pool).__name__}
+
+    stats = {"primary": describe(engine.pool)}
+    if read_engine is not engine:
+        stats["replica"] = describe(read_engine.pool)
+    return stats
+
+async def dispose_engines():
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+@asynccontextmanager
+async def _request_session(session_factory):
+    async with session_factory() as session:
         try:
             yield session
-        except Exception as e:
-            # --- REPLACE THIS LINE ---
-            logger.error(f"Database session error: {e}\n{traceback.format_exc()}")
-            # -------------------------
+        except HTTPException:
+            # An expected client error, not a database failure.
+            await session.rollback()
+            raise
+        except Exception:
+            logger.exception("Database session error")
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_db():
+    """
+    One session per request: FastAPI caches the dependency, so the auth
+    dependencies and the endpoint share it. A connection is only checked
+    out at the first query and goes back to the pool when the session closes.
+    """
+    async with _request_session(AsyncSessionLocal) as session:
+        yield session
+
+async def get_read_db(db: AsyncSession = Depends(get_db)):
+    """
+    Session for read-only endpoints; routed to DATABASE_READ_URL when set
+    (may lag the primary). Without a replica it is the request's get_db
+    session, so an endpoint that also authenticates against the primary
+    holds one pooled connection, not two.
+    """
+    if read_engine is engine:
+        yield db
+        return
+    async with _request_session(ReadSessionLocal) as session:
+        yield session
@@ -1,16 +1,41 @@
 # backend/dependencies.py
 
 from fastapi import Depends, HTTPException, status
-from typing import List
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
 import schemas
-from auth_utils import get_current_user
+from analytics import ANALYTICS_MAX_RANGE_DAYS
+from auth_utils import get_token_user, get_current_user_fresh
+from ratelimit import user_limiter
 
-def role_checker(allowed_roles: List[str]):
-    def check_roles(current_user: schemas.User = Depends(get_current_user)):
+def role_checker(allowed_roles: List[str], fresh: bool = False):
+    """
+    Authorizes the caller by role. By default the role comes from the token
+    claims and no query is made; pass fresh=True for endpoints that must see
+    the current user row and reject revoked tokens. Each authorized request
+    is charged to the user's rate limit (RATE_LIMIT_USER).
+    """
+    user_dependency = get_current_user_fresh if fresh else get_token_user
+
+    async def check_roles(current_user: schemas.TokenUser = Depends(user_dependency)):
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You don't have permission to access this resource"
             )
+        await user_limiter.check(str(current_user.id))
         return current_user
-    return check_roles
\ No newline at end of file
+    return check_roles
+
+def analytics_date_range(start: Optional[date] = None, end: Optional[date] = None) -> Tuple[date, date]:
+    """Inclusive UTC day range for the analytics endpoints; defaults to the last 30 days."""
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+    if (end - start).days >= ANALYTICS_MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date ranges are limited to {ANALYTICS_MAX_RANGE_DAYS} days",
+        )
+    return start, end
@@ -0,0 +1,70 @@
+# backend/export.py
+
+import os
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+
+from fastapi.responses import StreamingResponse
+
+from database import ReadSessionLocal
+
+# --- Configuration ---
+# Rows fetched per round trip from the server-side cursor (and per response chunk).
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+class ExportFormat(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+async def _partitions(query):
+    # A session of its own: the stream outlives the request's dependencies.
+    # Plain column rows (not ORM objects) keep the identity map empty, so
+    # memory stays flat however many rows are exported.
+    async with ReadSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for rows in result.partitions():
+            yield rows
+
+async def _ndjson(query):
+    async for rows in _partitions(query):
+        yield "".join(
+            json.dumps({key: _plain(value) for key, value in row._mapping.items()}) + "\n"
+            for row in rows
+        )
+
+async def _csv(query):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(query.selected_columns.keys())
+    async for rows in _partitions(query):
+        for row in rows:
+            writer.writerow([_plain(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def stream_export(query, export_format: ExportFormat, filename: str) -> StreamingResponse:
+    """Streams every row of a column-level select() as NDJSON or CSV."""
+    body = _csv(query) if export_format == ExportFormat.csv else _ndjson(query)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'},
+    )
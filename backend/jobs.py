@@ -0,0 +1,107 @@
+# backend/jobs.py
+
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds stop() lets a run in progress finish before cancelling it.
+JOB_STOP_TIMEOUT = 10.0
+
+class PeriodicJob(ABC):
+    """Runs `run_once` every `interval` seconds in a background task, recording its outcome."""
+
+    name = "job"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at: Optional[str] = None
+        self.last_duration_ms: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    @abstractmethod
+    async def run_once(self, **kwargs):
+        """One run of the job; its result is passed to _delay_after."""
+
+    async def _timed_run(self, **kwargs):
+        started = time.perf_counter()
+        result = await self.run_once(**kwargs)
+        self.runs += 1
+        self.last_run_at = datetime.now(timezone.utc).isoformat()
+        self.last_duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def _next_run_kwargs(self, run: int) -> dict:
+        return {}
+
+    def _delay_after(self, result) -> float:
+        return self.interval
+
+    def notify(self) -> None:
+        """Ends the current wait so the next run starts now."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _wait(self, delay: float) -> None:
+        if delay > 0:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+        self._wakeup.clear()
+
+    async def _loop(self) -> None:
+        run = 0
+        while not self._stopping:
+            delay = self.interval
+            try:
+                result = await self._timed_run(**self._next_run_kwargs(run))
+                delay = self._delay_after(result)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failures += 1
+                logger.exception("Background %s failed", self.name)
+            run += 1
+            if not self._stopping:
+                await self._wait(delay)
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        # A run in progress is allowed to finish: cancelling it mid-query
+        # would leak its pooled connection past dispose_engines().
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout=JOB_STOP_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at,
+            "last_duration_ms": self.last_duration_ms,
+        }
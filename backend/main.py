@@ -1,20 +1,50 @@
 # backend/main.py
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 import logging
 
-from database import engine, Base
-from routers import auth, household, ml, worker, admin, device
+from typing import Optional
+from database import engine, dispose_engines, pool_stats
+from password_utils import shutdown_executor, hasher_stats
+from model_client import model_client
+from analytics import reconciler, matview_refresher
+from outbox import outbox_consumer
+from migrations import check_schema_version
+from cache import device_owner_cache, user_cache
+import metrics
+from uploads import UploadLimitMiddleware, ML_MAX_UPLOAD_BYTES, ML_MAX_BATCH_UPLOAD_BYTES
+import ratelimit
+from ratelimit import AdmissionMiddleware, load_monitor
+from push import hub
+from routers import auth, household, ml, worker, admin, device, events
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logging.info("Application startup...")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logging.info("Database tables verified/created.")
+    # The schema is created and upgraded by `python migrations.py`; workers only check its version.
+    try:
+        async with engine.begin() as conn:
+            version = await conn.run_sync(check_schema_version)
+    except Exception:
+        await dispose_engines()
+        raise
+    logging.info(f"Database schema version {version}.")
+    await model_client.start()
+    reconciler.start()
+    matview_refresher.start()
+    outbox_consumer.start()
+    load_monitor.start()
     yield
+    await load_monitor.stop()
+    await outbox_consumer.stop()
+    await matview_refresher.stop()
+    await reconciler.stop()
+    await model_client.close()
+    shutdown_executor()
+    await dispose_engines()
     logging.info("Application shutdown.")
 
 app = FastAPI(
@@ -23,6 +53,23 @@ app = FastAPI(
     version="idk first?"
 )
 
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Oversized images are rejected before their body is read.
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/api/ml/": ML_MAX_UPLOAD_BYTES,
+    "/api/ml/classify-waste/batch": ML_MAX_BATCH_UPLOAD_BYTES,
+})
+
+# Runs before the upload limit and the routes: overload shedding and per-IP limits, before any body is read.
+app.add_middleware(AdmissionMiddleware, ip_limits={
+    "/api/login": ratelimit.login_ip_limiter,
+    "/api/register": ratelimit.login_ip_limiter,
+    "/api/device/": ratelimit.device_ip_limiter,
+    "/api/ml/": ratelimit.classify_ip_limiter,
+})
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],            #CORS issue was solved here
@@ -39,8 +86,38 @@ app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(device.router, prefix="/api/device", tags=["IoT Device"])
 # ---------------------------------------------------
 app.include_router(ml.router, prefix="/api/ml", tags=["ml"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
 @app.get("/", tags=["Health Check"])
 def read_root():
     return {"message": "API is healthy"}
 
+@metrics.registry.collector
+def _runtime_gauges():
+    for engine_name, pool in pool_stats().items():
+        for key in ("checked_out", "overflow", "waiting"):
+            if key in pool:
+                yield f"db_pool_{key}", f"Pool connections {key.replace('_', ' ')}.", {"engine": engine_name}, pool[key]
+    hasher = hasher_stats()
+    yield "password_hash_queued", "bcrypt calls waiting for a worker.", {}, hasher["queued"]
+    yield "model_service_in_flight", "Model service calls in flight.", {}, model_client.in_flight
+    yield ("model_service_breaker_open", "1 while the model service circuit breaker is open.", {},
+           int(model_client.breaker.state == "open"))
+    yield "http_requests_in_flight", "API requests admitted and not yet finished.", {}, ratelimit.in_flight
+    yield "event_loop_lag_seconds", "Smoothed event loop lag seen by the load monitor.", {}, load_monitor.loop_lag
+    yield "push_connections", "Open event streams.", {}, hub.connections
+    yield "push_events_delivered", "Events queued to event streams.", {}, hub.delivered
+    yield "outbox_events_processed", "Outbox events applied by this worker.", {}, outbox_consumer.processed
+    yield "outbox_max_lag_seconds", "Largest delay seen between enqueue and apply.", {}, outbox_consumer.max_lag_ms / 1000
+    for name, cache in (("device_owner", device_owner_cache), ("user", user_cache)):
+        cache_stats = cache.stats()
+        yield "cache_hits", "Cache hits.", {"cache": name}, cache_stats["hits"]
+        yield "cache_misses", "Cache misses.", {"cache": name}, cache_stats["misses"]
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition of this worker's metrics (one series set per process)."""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled")
+    if not metrics.authorized(authorization):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,229 @@
+# backend/metrics.py
+
+import os
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# --- Configuration ---
+# Metrics cost two clock reads and a bucket increment per observation; they
+# are meant to stay on in production. METRICS_TOKEN protects /metrics.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Seconds; from sub-millisecond queries to slow model calls.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    """Prometheus-style histogram family with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # bucket counts (last is +Inf), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series):
+            running = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                running += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+# Gauges are read at scrape time from the components' own stats().
+GaugeCollector = Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[GaugeCollector] = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, collect: GaugeCollector) -> GaugeCollector:
+        """Registers a function yielding (name, help, labels, value) gauge samples."""
+        self._collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        described = set()
+        for collect in self._collectors:
+            for name, documentation, labels, value in collect():
+                if name not in described:
+                    described.add(name)
+                    lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# --- Hot-path metrics ---
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template, method and status.",
+    ("route", "method", "status"))
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Database statement latency by engine and statement type.",
+    ("engine", "operation"))
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds", "bcrypt hash/verify time in the executor.")
+password_hash_wait = registry.histogram(
+    "password_hash_wait_seconds", "Time spent waiting for a free bcrypt worker.")
+model_request_duration = registry.histogram(
+    "model_service_request_duration_seconds", "Model service call latency by endpoint and outcome.",
+    ("endpoint", "outcome"))
+model_queue_wait = registry.histogram(
+    "model_service_queue_wait_seconds", "Time spent waiting for a model service concurrency slot.")
+logins = registry.counter("auth_logins_total", "Login attempts by outcome.", ("outcome",))
+conditional_responses = registry.counter(
+    "conditional_responses_total", "Versioned list responses: not_modified (304), hit or miss of the response cache.",
+    ("resource", "outcome"))
+rate_limited = registry.counter("rate_limited_total", "Requests refused with 429, by limit.", ("limit",))
+requests_shed = registry.counter("requests_shed_total", "Requests refused with 503 while overloaded, by reason.", ("reason",))
+
+# --- Request middleware ---
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no extra task per request, streaming untouched)
+    that records the latency of every HTTP request under its route template,
+    so /items/1 and /items/2 share one series. Unmatched paths are pooled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                getattr(route, "path", "unmatched"), scope["method"], str(status_code),
+            )
+
+# --- Database ---
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+def instrument_engine(engine, label: str) -> None:
+    """Times every statement run on `engine` (an AsyncEngine); a no-op when metrics are off."""
+    if not METRICS_ENABLED:
+        return
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        db_query_duration.observe(time.perf_counter() - started, label, _operation(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+def authorized(authorization: Optional[str]) -> bool:
+    return not METRICS_TOKEN or authorization == f"Bearer {METRICS_TOKEN}"
@@ -0,0 +1,179 @@
+# backend/migrations.py
+"""
+Versioned schema migrations.
+
+Run once per deploy, before the web workers start:
+    python migrations.py            # upgrade to the latest version
+    python migrations.py --status   # recorded vs required version
+
+Workers only read the recorded version at startup (check_schema_version).
+Version 1 builds the schema from the current models, so later migrations
+must check before they alter anything (e.g. with _has_column): on a new
+database they run right after version 1 has already created it. On an
+existing database version 1 only adds missing tables and indexes;
+create_all() never alters a table that exists, so every new column or
+constraint on an existing table needs a migration of its own.
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import argparse
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# Lets a single local process create or upgrade its own schema at startup.
+# Leave off when several workers share a database: migrate once instead.
+SCHEMA_AUTO_MIGRATE = os.getenv("SCHEMA_AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
+# Arbitrary key of the Postgres advisory lock held while migrating.
+MIGRATION_LOCK_KEY = 72_310_001
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+def _has_unique(conn: Connection, table: str, columns: List[str]) -> bool:
+    """True when a unique constraint or unique index covers exactly `columns`."""
+    inspector = inspect(conn)
+    constraints = [c["column_names"] for c in inspector.get_unique_constraints(table)]
+    indexes = [i["column_names"] for i in inspector.get_indexes(table) if i.get("unique")]
+    return columns in constraints + indexes
+
+# --- Migrations ---
+def _baseline(conn: Connection) -> None:
+    """
+    Missing tables and indexes of the models; merges duplicate pending
+    pickups before their unique index is created. Leaves existing tables'
+    columns and constraints alone (see migrations 3 and 4).
+    """
+    from database import Base, create_missing_indexes
+    from assignment import coalesce_pending_pickups
+    import models  # noqa: F401  (registers the tables on Base.metadata)
+
+    Base.metadata.create_all(conn)
+    coalesce_pending_pickups(conn)
+    create_missing_indexes(conn)
+
+def _data_versions(conn: Connection) -> None:
+    """Per-user data versions behind the ETags of the household and worker lists."""
+    import models
+
+    models.DataVersion.__table__.create(conn, checkfirst=True)
+
+def _token_version(conn: Connection) -> None:
+    """users.token_version, for databases whose users table predates it."""
+    if not _has_column(conn, "users", "token_version"):
+        conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+
+def _rewards_unique_user(conn: Connection) -> None:
+    """
+    One reward row per user, which the reward upsert relies on. Duplicate
+    rows are merged into the oldest one, with the points summed.
+    """
+    if _has_unique(conn, "rewards", ["user_id"]):
+        return
+    keep = "SELECT MIN(id) FROM rewards WHERE user_id IS NOT NULL GROUP BY user_id"
+    conn.execute(text(
+        "UPDATE rewards SET points = "
+        "(SELECT SUM(COALESCE(r.points, 0)) FROM rewards r WHERE r.user_id = rewards.user_id) "
+        f"WHERE id IN ({keep} HAVING COUNT(*) > 1)"
+    ))
+    result = conn.execute(text(f"DELETE FROM rewards WHERE user_id IS NOT NULL AND id NOT IN ({keep})"))
+    if result.rowcount:
+        logger.warning("Merged %s duplicate reward rows", result.rowcount)
+    conn.execute(text("CREATE UNIQUE INDEX uq_rewards_user_id ON rewards (user_id)"))
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", _baseline),
+    Migration(2, "data_versions", _data_versions),
+    Migration(3, "users_token_version", _token_version),
+    Migration(4, "rewards_unique_user", _rewards_unique_user),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+# --- Version check ---
+def current_version(conn: Connection) -> Optional[int]:
+    """The recorded schema version, or None when the database was never migrated."""
+    if not inspect(conn).has_table(schema_version.name):
+        return None
+    return conn.execute(select(func.max(schema_version.c.version))).scalar()
+
+def check_schema_version(conn: Connection) -> int:
+    """
+    Worker startup check: two small queries. Upgrades in place with
+    SCHEMA_AUTO_MIGRATE; otherwise fails when the schema is behind the code.
+    """
+    version = current_version(conn)
+    if version is not None and version >= LATEST_VERSION:
+        if version > LATEST_VERSION:
+            logger.warning("Database schema is at version %s, newer than this code (%s)", version, LATEST_VERSION)
+        return version
+    if SCHEMA_AUTO_MIGRATE:
+        return upgrade(conn)
+    raise SchemaVersionError(
+        f"Database schema is at version {version or 0}, this code needs {LATEST_VERSION}. "
+        "Run `python migrations.py` (or set SCHEMA_AUTO_MIGRATE=true for a single local process)."
+    )
+
+# --- Upgrade ---
+def upgrade(conn: Connection) -> int:
+    """
+    Applies the pending migrations inside the caller's transaction. On
+    Postgres an advisory lock makes concurrent runs wait for each other.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    schema_version.create(conn, checkfirst=True)
+    version = conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        logger.info("Applying schema migration %s (%s)", migration.version, migration.name)
+        migration.apply(conn)
+        conn.execute(schema_version.insert().values(version=migration.version, name=migration.name))
+        version = migration.version
+    return version
+
+async def run(status_only: bool = False) -> int:
+    from database import engine, dispose_engines
+
+    try:
+        if status_only:
+            async with engine.connect() as conn:
+                version = await conn.run_sync(current_version)
+            print(f"schema version {version or 0}, code requires {LATEST_VERSION}")
+            return 0 if (version or 0) >= LATEST_VERSION else 1
+        async with engine.begin() as conn:
+            version = await conn.run_sync(upgrade)
+        print(f"schema version {version}")
+        return 0
+    finally:
+        await dispose_engines()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+    parser = argparse.ArgumentParser(description="Apply the database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="only report the schema version")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(status_only=args.status)))
@@ -0,0 +1,228 @@
+# backend/model_client.py
+
+import os
+import asyncio
+import logging
+import time
+from typing import AsyncIterable, BinaryIO, List, Optional, Tuple, Union
+
+import httpx
+
+from metrics import model_queue_wait, model_request_duration
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+MODEL_SERVICE_URL = os.environ.get("MODEL_SERVICE_URL")
+# Multi-image endpoint; defaults to "<MODEL_SERVICE_URL>/batch" (i.e. /predict/batch).
+MODEL_SERVICE_BATCH_URL = os.environ.get("MODEL_SERVICE_BATCH_URL") or (
+    MODEL_SERVICE_URL.rstrip("/") + "/batch" if MODEL_SERVICE_URL else None
+)
+# Endpoint taking the image itself as the request body; defaults to "<MODEL_SERVICE_URL>/raw".
+MODEL_SERVICE_RAW_URL = os.environ.get("MODEL_SERVICE_RAW_URL") or (
+    MODEL_SERVICE_URL.rstrip("/") + "/raw" if MODEL_SERVICE_URL else None
+)
+ML_MAX_CONNECTIONS = int(os.getenv("ML_MAX_CONNECTIONS", "20"))
+ML_MAX_KEEPALIVE = int(os.getenv("ML_MAX_KEEPALIVE", "10"))
+ML_CONNECT_TIMEOUT = float(os.getenv("ML_CONNECT_TIMEOUT", "3"))
+ML_READ_TIMEOUT = float(os.getenv("ML_READ_TIMEOUT", "30"))
+# Classifications allowed in flight at once, and how long a request may wait for a slot.
+ML_MAX_CONCURRENCY = int(os.getenv("ML_MAX_CONCURRENCY", "16"))
+ML_QUEUE_TIMEOUT = float(os.getenv("ML_QUEUE_TIMEOUT", "5"))
+# Consecutive failures that open the circuit, and how long it stays open.
+ML_BREAKER_FAILURES = int(os.getenv("ML_BREAKER_FAILURES", "5"))
+ML_BREAKER_RESET_SECONDS = float(os.getenv("ML_BREAKER_RESET_SECONDS", "30"))
+
+class ModelServiceUnavailable(Exception):
+    """The model service cannot take the request right now (circuit open or saturated)."""
+
+    def __init__(self, detail: str, retry_after: float = 1.0):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fails fast for
+    `reset_timeout` seconds. After that a single trial request is let
+    through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_request(self) -> bool:
+        """Raises while the circuit is open; returns True when this request is the half-open trial."""
+        state = self.state
+        if state == "open":
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise ModelServiceUnavailable("The model service is currently unavailable", retry_after=remaining)
+        if state == "half_open":
+            if self.trial_in_flight:
+                raise ModelServiceUnavailable("The model service is recovering, please retry")
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """The trial ended without an outcome (never sent, cancelled, failed on our side); the next request retries."""
+        self.trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        was_trial = self.trial_in_flight
+        self.trial_in_flight = False
+        if was_trial or self.failures >= self.failure_threshold:
+            if self.opened_at is None or was_trial:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+class ModelServiceClient:
+    """
+    Shared async HTTP client for the model service. One instance lives for
+    the lifetime of the app so connections are pooled and kept alive.
+    """
+
+    def __init__(self, url: Optional[str] = MODEL_SERVICE_URL, batch_url: Optional[str] = MODEL_SERVICE_BATCH_URL,
+                 raw_url: Optional[str] = MODEL_SERVICE_RAW_URL):
+        self.url = url
+        self.batch_url = batch_url
+        self.raw_url = raw_url
+        self.breaker = CircuitBreaker(ML_BREAKER_FAILURES, ML_BREAKER_RESET_SECONDS)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(ML_MAX_CONCURRENCY)
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=ML_MAX_CONNECTIONS,
+                    max_keepalive_connections=ML_MAX_KEEPALIVE,
+                ),
+                timeout=httpx.Timeout(ML_READ_TIMEOUT, connect=ML_CONNECT_TIMEOUT),
+            )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _acquire_slot(self) -> None:
+        try:
+            with model_queue_wait.time():
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=ML_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ModelServiceUnavailable("Too many classification requests in flight, please retry")
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """
+        POSTs to the model service through the breaker and concurrency cap.
+        Raises httpx errors for timeouts, transport errors and non-2xx replies.
+        """
+        await self.start()
+        trial = self.breaker.before_request()
+        try:
+            await self._acquire_slot()
+        except BaseException:
+            # Give the half-open trial back if we never sent it (queue timeout, or cancelled while waiting).
+            if trial:
+                self.breaker.release_trial()
+            raise
+
+        self.in_flight += 1
+        self.requests += 1
+        endpoint = {self.batch_url: "batch", self.raw_url: "raw"}.get(url, "single")
+        outcome = "error"
+        recorded = False
+        started = time.perf_counter()
+        try:
+            response = await self._client.post(url, **kwargs)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            # A 4xx means the service is up and rejected the input.
+            if e.response.status_code >= 500:
+                self.failures += 1
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            recorded = True
+            raise
+        except httpx.HTTPError:
+            self.failures += 1
+            self.breaker.record_failure()
+            recorded = True
+            raise
+        else:
+            self.breaker.record_success()
+            recorded = True
+            outcome = "ok"
+            return response
+        finally:
+            # No outcome: our side failed (e.g. a streamed upload went over the size
+            # limit) or the caller was cancelled. Says nothing about the service.
+            if trial and not recorded:
+                self.breaker.release_trial()
+            self.in_flight -= 1
+            self._semaphore.release()
+            model_request_duration.observe(time.perf_counter() - started, endpoint, outcome)
+
+    async def classify(self, filename: str, content, content_type: str) -> dict:
+        """`content` is bytes or an open binary file; files are sent in chunks, not read whole."""
+        response = await self.post(self.url, files={"image": (filename, content, content_type)})
+        return response.json()
+
+    async def classify_raw(self, content: Union[bytes, AsyncIterable[bytes]], content_type: str,
+                           content_length: Optional[int] = None) -> dict:
+        """
+        Sends the image as the request body. An async iterable is streamed as
+        it is produced; with `content_length` it is sent with that length
+        instead of chunked.
+        """
+        headers = {"Content-Type": content_type}
+        if content_length is not None and not isinstance(content, bytes):
+            headers["Content-Length"] = str(content_length)
+        response = await self.post(self.raw_url, content=content, headers=headers)
+        return response.json()
+
+    async def classify_batch(self, images: List[Tuple[str, Union[bytes, BinaryIO], str]]) -> List[dict]:
+        """Classifies (filename, content, content_type) tuples in one request; results keep input order."""
+        response = await self.post(self.batch_url, files=[("images", image) for image in images])
+        return response.json()["results"]
+
+    def stats(self) -> dict:
+        return {
+            "url_configured": bool(self.url),
+            "breaker_state": self.breaker.state,
+            "breaker_times_opened": self.breaker.times_opened,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self.in_flight,
+            "max_concurrency": ML_MAX_CONCURRENCY,
+            "requests": self.requests,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+model_client = ModelServiceClient()
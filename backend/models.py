@@ -1,9 +1,9 @@
 # backend/models.py
 
-from sqlalchemy import (Column, Integer, String, Boolean, DateTime,
-                        ForeignKey, Enum, Float)
+from sqlalchemy import (Column, Integer, String, Boolean, DateTime, Date,
+                        ForeignKey, Enum, Float, UniqueConstraint, Index, JSON)
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from database import Base
 import enum
 
@@ -20,6 +20,11 @@ class DeviceStatus(str, enum.Enum):
     online = "online"
     offline = "offline"
 
+class OutboxStatus(str, enum.Enum):
+    pending = "pending"
+    done = "done"
+    failed = "failed"
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -29,6 +34,8 @@ class User(Base):
     address = Column(String)
     role = Column(Enum(UserRole))
     password_hash = Column(String)
+    # Bumped to revoke every token issued before the change.
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     devices = relationship("Device", back_populates="owner")
     waste_logs = relationship("WasteLog", back_populates="owner")
@@ -50,26 +57,105 @@ class WasteLog(Base):
     waste_type = Column(String)
     weight = Column(Float)
     points = Column(Integer)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     owner = relationship("User", back_populates="waste_logs")
 
+    # Range queries per household and per waste type (see the analytics endpoints).
+    __table_args__ = (
+        Index("ix_waste_logs_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_waste_logs_waste_type_timestamp", "waste_type", "timestamp"),
+    )
+
 class Pickup(Base):
     __tablename__ = "pickups"
     id = Column(Integer, primary_key=True, index=True)
     worker_id = Column(Integer, ForeignKey("users.id"))
     household_id = Column(Integer, ForeignKey("users.id"))
     status = Column(Enum(PickupStatus), default=PickupStatus.pending)
-    date = Column(DateTime(timezone=True), server_default=func.now())
+    date = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     worker = relationship("User", foreign_keys=[worker_id])
     household = relationship("User", foreign_keys=[household_id])
 
+    __table_args__ = (
+        Index("ix_pickups_worker_id_date", "worker_id", "date"),
+        # Coalescing: a household has at most one open pickup, however many readings arrive.
+        Index("uq_pickups_household_pending", "household_id", unique=True,
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+    )
+
 class Reward(Base):
     __tablename__ = "rewards"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    # One running balance per user; the upsert in crud relies on this constraint.
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True)
     points = Column(Integer)
     redeemed = Column(Boolean, default=False)
 
-    owner = relationship("User", back_populates="rewards")
\ No newline at end of file
+    owner = relationship("User", back_populates="rewards")
+# --- Analytics rollups ---
+# Pre-aggregated totals kept up to date by the ingestion path (crud.add_waste_rollups)
+# and periodically corrected from waste_logs by the reconciler in analytics.py.
+
+class WasteDailyTotal(Base):
+    __tablename__ = "waste_daily_totals"
+    __table_args__ = (UniqueConstraint("day", "waste_type", name="uq_waste_daily_totals_day_type"),)
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    waste_type = Column(String, nullable=False)
+    log_count = Column(Integer, nullable=False, default=0)
+    total_weight = Column(Float, nullable=False, default=0.0)
+    total_points = Column(Integer, nullable=False, default=0)
+
+class WasteTypeTotal(Base):
+    __tablename__ = "waste_type_totals"
+    id = Column(Integer, primary_key=True, index=True)
+    waste_type = Column(String, unique=True, nullable=False)
+    log_count = Column(Integer, nullable=False, default=0)
+    total_weight = Column(Float, nullable=False, default=0.0)
+    total_points = Column(Integer, nullable=False, default=0)
+
+class HouseholdWasteTotal(Base):
+    __tablename__ = "household_waste_totals"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+    log_count = Column(Integer, nullable=False, default=0)
+    total_weight = Column(Float, nullable=False, default=0.0)
+    total_points = Column(Integer, nullable=False, default=0)
+
+# --- Per-user data versions ---
+# Bumped in the same transaction as every write to a user's waste logs,
+# rewards or pickups (see crud.bump_data_versions); the list endpoints
+# derive their ETags from it.
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+    __table_args__ = (UniqueConstraint("user_id", "resource", name="uq_data_versions_user_resource"),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    resource = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, default=0)
+
+# --- Outbox ---
+# Side effects of ingestion (rewards, rollups, pickups) are recorded here in
+# the same transaction as the waste log and applied later by outbox.py.
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    # One event per source row (e.g. "waste_log:42"); enqueueing it twice is a no-op.
+    idempotency_key = Column(String, unique=True, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(Enum(OutboxStatus), nullable=False, default=OutboxStatus.pending)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String)
+    # Timestamps are set by the application (UTC) so retry back-off works on every dialect.
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    processed_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_outbox_events_status_available_at", "status", "available_at"),
+    )
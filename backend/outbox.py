@@ -0,0 +1,200 @@
+# backend/outbox.py
+
+import os
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud, models
+from assignment import pickup_assigner
+from database import AsyncSessionLocal
+from jobs import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Seconds between polls when the queue is idle; uploads in this worker wake the consumer early.
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+# Failed events are retried with exponential back-off, then parked as "failed".
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "2"))
+# Processed events are kept this long for auditing, then deleted.
+OUTBOX_RETENTION_HOURS = float(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+
+# --- Events ---
+WASTE_LOGGED = "waste_logged"
+
+def waste_logged_event(log: models.WasteLog) -> Dict[str, Any]:
+    """Outbox event for a stored waste log; its id makes the event unique."""
+    return {
+        "kind": WASTE_LOGGED,
+        "idempotency_key": f"{crud.WASTE_LOG_EVENT_PREFIX}{log.id}",
+        "payload": {
+            "waste_log_id": log.id,
+            "user_id": log.user_id,
+            "waste_type": log.waste_type,
+            "weight": log.weight,
+            "points": log.points,
+            "timestamp": log.timestamp.isoformat() if log.timestamp else None,
+        },
+    }
+
+async def apply_waste_logged(db: AsyncSession, payloads: List[Dict[str, Any]]) -> None:
+    """
+    Side effects of a batch of stored waste logs: analytics rollups, one
+    aggregated reward increment per household, and a pickup for each household
+    that has no open one.
+    """
+    logs = [
+        {**payload, "timestamp": datetime.fromisoformat(payload["timestamp"]) if payload["timestamp"] else None}
+        for payload in payloads
+    ]
+    await crud.add_waste_rollups(db, logs)
+
+    points_by_user = defaultdict(int)
+    for log in logs:
+        points_by_user[log["user_id"]] += log["points"]
+    await crud.add_reward_points_bulk(db, points_by_user)
+
+    await pickup_assigner.assign(db, points_by_user.keys())
+
+HANDLERS = {
+    WASTE_LOGGED: apply_waste_logged,
+}
+
+async def apply_events(db: AsyncSession, events: List[models.OutboxEvent]) -> None:
+    by_kind = defaultdict(list)
+    for event in events:
+        by_kind[event.kind].append(event.payload)
+    for kind, payloads in by_kind.items():
+        handler = HANDLERS.get(kind)
+        if handler is None:
+            raise ValueError(f"No outbox handler for event kind '{kind}'")
+        await handler(db, payloads)
+
+# --- Consumer ---
+class OutboxConsumer(PeriodicJob):
+    """
+    Drains the outbox in batches. A batch is claimed, applied and marked done
+    in one transaction. When a batch fails, its events are retried one by one
+    so a single bad event cannot block the rest.
+    """
+
+    name = "outbox consumer"
+
+    def __init__(self, interval: float, batch_size: int):
+        super().__init__(interval)
+        self.batch_size = batch_size
+        self.processed = 0
+        self.batches = 0
+        self.conflicts = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.last_batch_size = 0
+        self.max_lag_ms = 0.0
+        # loop.time() has an arbitrary origin; -inf makes the first run prune.
+        self._last_cleanup = float("-inf")
+
+    def _delay_after(self, processed: int) -> float:
+        # A full batch means more is probably waiting.
+        return 0 if processed >= self.batch_size else self.interval
+
+    async def run_once(self) -> int:
+        try:
+            async with AsyncSessionLocal() as db:
+                events = await crud.claim_outbox_events(db, limit=self.batch_size)
+                if not events:
+                    await db.rollback()
+                    await self._cleanup()
+                    return 0
+                await apply_events(db, events)
+                await db.commit()
+        except crud.OutboxClaimConflict:
+            self.conflicts += 1
+            return self.batch_size
+        except Exception:
+            logger.exception("Outbox batch failed; retrying its events one by one")
+            processed = await self._run_individually()
+        else:
+            processed = len(events)
+            self._record_lag(events)
+        self.batches += 1
+        self.processed += processed
+        self.last_batch_size = processed
+        return processed
+
+    def _record_lag(self, events: List[models.OutboxEvent]) -> None:
+        oldest = min(event.created_at for event in events)
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        lag_ms = (datetime.now(timezone.utc) - oldest).total_seconds() * 1000
+        self.max_lag_ms = max(self.max_lag_ms, round(lag_ms, 3))
+
+    async def _run_individually(self) -> int:
+        async with AsyncSessionLocal() as db:
+            ids = await crud.get_pending_outbox_ids(db, limit=self.batch_size)
+        processed = 0
+        for event_id in ids:
+            try:
+                async with AsyncSessionLocal() as db:
+                    events = await crud.claim_outbox_events(db, limit=1, ids=[event_id])
+                    if events:
+                        await apply_events(db, events)
+                        await db.commit()
+                        processed += 1
+            except crud.OutboxClaimConflict:
+                self.conflicts += 1
+            except Exception as e:
+                logger.exception("Outbox event %s failed", event_id)
+                await self._record_failure(event_id, f"{type(e).__name__}: {e}")
+        return processed
+
+    async def _record_failure(self, event_id: int, error: str) -> None:
+        async with AsyncSessionLocal() as db:
+            attempts = await crud.get_outbox_attempts(db, event_id) + 1
+            if attempts >= OUTBOX_MAX_ATTEMPTS:
+                retry_at = None
+                self.dead_lettered += 1
+            else:
+                retry_at = datetime.now(timezone.utc) + timedelta(
+                    seconds=OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+                self.retried += 1
+            await crud.record_outbox_failure(db, event_id=event_id, error=error, retry_at=retry_at)
+
+    async def _cleanup(self) -> None:
+        loop_time = asyncio.get_running_loop().time()
+        if loop_time - self._last_cleanup < 3600:
+            return
+        self._last_cleanup = loop_time
+        async with AsyncSessionLocal() as db:
+            await crud.delete_processed_outbox_events(
+                db, older_than=datetime.now(timezone.utc) - timedelta(hours=OUTBOX_RETENTION_HOURS))
+
+    async def drain(self) -> int:
+        """Processes everything that is due now (used by scripts and benchmarks)."""
+        total = 0
+        while True:
+            processed = await self._timed_run()
+            total += processed
+            if processed == 0:
+                return total
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "batch_size": self.batch_size,
+            "processed": self.processed,
+            "batches": self.batches,
+            "conflicts": self.conflicts,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "last_batch_size": self.last_batch_size,
+            "max_lag_ms": self.max_lag_ms,
+        }
+
+outbox_consumer = OutboxConsumer(OUTBOX_POLL_SECONDS, OUTBOX_BATCH_SIZE)
@@ -0,0 +1,98 @@
+# backend/pagination.py
+
+import os
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Request, Response, status
+
+# --- Configuration ---
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+
+# Keyset (cursor) pagination: a page is the next `limit` rows after the sort
+# key of the last row of the previous page, so every page is an index range
+# scan no matter how deep the client pages, and rows inserted meanwhile
+# never shift or duplicate entries. The cursor is that sort key, encoded.
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    values = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in key]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+# Ids are INTEGER columns; anything outside that range cannot match a row
+# and would only make the database reject the bound parameter.
+_MAX_ID = 2**31 - 1
+
+def _decode_value(value: Any, kind: type) -> Any:
+    if kind is datetime:
+        if not isinstance(value, dict) or set(value) != {"dt"} or not isinstance(value["dt"], str):
+            raise ValueError("expected a timestamp")
+        return datetime.fromisoformat(value["dt"])
+    if kind is int:
+        # bool is an int subclass but never a valid id
+        if type(value) is not int or not -_MAX_ID <= value <= _MAX_ID:
+            raise ValueError("expected an id")
+        return value
+    raise TypeError(f"unsupported cursor key type {kind!r}")
+
+def decode_cursor(cursor: str, key_types: Sequence[type]) -> Tuple[Any, ...]:
+    """
+    Decodes a cursor made by encode_cursor for a key of `key_types`. A
+    cursor of any other shape is a client error (400), never a query.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(key_types):
+            raise ValueError("cursor does not match the sort key")
+        return tuple(_decode_value(v, kind) for v, kind in zip(values, key_types))
+    except (ValueError, RecursionError):  # ValueError covers base64, JSON and unicode errors
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+class PageParams:
+    """Limit and decoded cursor of a paginated list request; see page_params."""
+
+    def __init__(self, limit: int, after: Optional[Tuple[Any, ...]] = None):
+        self.limit = limit
+        self.after = after
+
+def page_params(key_types: Sequence[type]):
+    """
+    Query parameters of a list endpoint sorted on a key of `key_types`; use
+    as `page: PageParams = Depends(page_params(crud.ID_PAGE_TYPES))`.
+    """
+    key_types = tuple(key_types)
+
+    def dependency(
+        limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    ) -> PageParams:
+        return PageParams(limit, decode_cursor(cursor, key_types) if cursor else None)
+
+    return dependency
+
+def next_page(rows: List[Any], page: PageParams, key: Sequence[str]) -> Tuple[List[Any], Optional[str]]:
+    """Trims a `page.limit + 1` row fetch to one page; returns it and the next page's cursor, if there is one."""
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    return rows, encode_cursor([getattr(rows[-1], name) for name in key])
+
+def page_headers(request: Request, cursor: str) -> Dict[str, str]:
+    return {
+        "X-Next-Cursor": cursor,
+        "Link": f'<{request.url.include_query_params(cursor=cursor)}>; rel="next"',
+    }
+
+def paginate(request: Request, response: Response, rows: List[Any], page: PageParams, key: Sequence[str]) -> List[Any]:
+    """
+    Trims a `page.limit + 1` row fetch to one page. When more rows exist,
+    the cursor of the next page is returned in the X-Next-Cursor and Link
+    headers, so the body stays a plain list.
+    """
+    rows, cursor = next_page(rows, page, key)
+    if cursor:
+        response.headers.update(page_headers(request, cursor))
+    return rows
@@ -1,11 +1,133 @@
 # backend/password_utils.py
 
+import os
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from metrics import password_hash_duration, password_hash_wait
+
+# --- Configuration ---
+# Hashes with a different cost are upgraded transparently on the next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# "thread" (bcrypt releases the GIL) or "process".
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests waiting for a hashing slot beyond this are rejected with PasswordHasherBusy.
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Returns (matches, new_hash); new_hash is set when the stored hash should be upgraded."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# --- Async API ---
+# bcrypt takes 100-300 ms per call, so it never runs on the event loop.
+# A semaphore caps concurrent hashes at the pool size; callers waiting for
+# a slot form the queue that the metrics below describe.
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+_executor: Optional[Executor] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "rejected": 0,
+    "running": 0,
+    "queued": 0,
+    "max_queued": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+    "hash_seconds_total": 0.0,
+}
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+    return _semaphore
+
+async def _run(fn, *args):
+    if _stats["queued"] >= PASSWORD_HASH_MAX_QUEUE:
+        _stats["rejected"] += 1
+        raise PasswordHasherBusy("Password hashing queue is full")
+
+    _stats["submitted"] += 1
+    _stats["queued"] += 1
+    _stats["max_queued"] = max(_stats["max_queued"], _stats["queued"])
+    enqueued = time.perf_counter()
+    acquired = False
+    try:
+        async with _get_semaphore():
+            acquired = True
+            started = time.perf_counter()
+            waited = started - enqueued
+            _stats["queued"] -= 1
+            _stats["running"] += 1
+            _stats["wait_seconds_total"] += waited
+            _stats["wait_seconds_max"] = max(_stats["wait_seconds_max"], waited)
+            password_hash_wait.observe(waited)
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(_get_executor(), fn, *args)
+            finally:
+                _stats["running"] -= 1
+                _stats["completed"] += 1
+                elapsed = time.perf_counter() - started
+                _stats["hash_seconds_total"] += elapsed
+                password_hash_duration.observe(elapsed)
+    finally:
+        if not acquired:
+            # Cancelled while still waiting for a slot.
+            _stats["queued"] -= 1
+
+async def aget_password_hash(password: str) -> str:
+    return await _run(get_password_hash, password)
+
+async def averify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run(verify_and_update, plain_password, hashed_password)
+
+def hasher_stats() -> dict:
+    completed = _stats["completed"]
+    return {
+        **_stats,
+        "executor": PASSWORD_HASH_EXECUTOR,
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_queue": PASSWORD_HASH_MAX_QUEUE,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        "avg_hash_ms": round(_stats["hash_seconds_total"] / completed * 1000, 3) if completed else 0.0,
+    }
+
+def shutdown_executor() -> None:
+    global _executor, _semaphore
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _semaphore = None
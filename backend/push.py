@@ -0,0 +1,172 @@
+# backend/push.py
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+PUSH_ENABLED = os.getenv("PUSH_ENABLED", "true").lower() == "true"
+# Open event streams per worker, and per user (phone + tablet + a stale tab ...).
+PUSH_MAX_CONNECTIONS = int(os.getenv("PUSH_MAX_CONNECTIONS", "10000"))
+PUSH_MAX_CONNECTIONS_PER_USER = int(os.getenv("PUSH_MAX_CONNECTIONS_PER_USER", "5"))
+# Events buffered for a connection that is not reading; past that it is sent
+# a "resync" event and closed, and refetches the lists when it reconnects.
+PUSH_QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "64"))
+# Comment line sent on idle streams so proxies keep them open.
+PUSH_HEARTBEAT_SECONDS = float(os.getenv("PUSH_HEARTBEAT_SECONDS", "15"))
+# Streams are closed after this long (or at token expiry, if sooner); clients reconnect.
+PUSH_MAX_STREAM_SECONDS = float(os.getenv("PUSH_MAX_STREAM_SECONDS", "600"))
+# Reconnection delay suggested to EventSource clients.
+PUSH_RETRY_MS = int(os.getenv("PUSH_RETRY_MS", "3000"))
+
+class PushHubFull(Exception):
+    """No room for another stream, on this worker or for this user."""
+
+    def __init__(self, detail: str, per_user: bool):
+        super().__init__(detail)
+        self.detail = detail
+        self.per_user = per_user
+
+class Subscriber:
+    __slots__ = ("user_id", "queue")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        # Bounded by PushHub.publish; None means "resync and close".
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+
+class PushHub:
+    """
+    In-process fan-out of server-sent events to the open streams of each
+    user. A message is encoded once and the same bytes are queued for every
+    stream of its users, so publishing never waits on a slow client. Only
+    reaches streams held by this worker.
+    """
+
+    def __init__(self, max_connections: int = PUSH_MAX_CONNECTIONS,
+                 max_per_user: int = PUSH_MAX_CONNECTIONS_PER_USER):
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._next_id = 0
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.overflowed = 0
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        if self.connections >= self.max_connections:
+            raise PushHubFull("Too many open event streams, please retry shortly", per_user=False)
+        streams = self._subscribers.setdefault(user_id, set())
+        if len(streams) >= self.max_per_user:
+            raise PushHubFull(f"At most {self.max_per_user} event streams per user", per_user=True)
+        subscriber = Subscriber(user_id)
+        streams.add(subscriber)
+        self.connections += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        streams = self._subscribers.get(subscriber.user_id)
+        if streams is None or subscriber not in streams:
+            return
+        streams.discard(subscriber)
+        if not streams:
+            del self._subscribers[subscriber.user_id]
+        self.connections -= 1
+
+    def publish(self, user_ids: Iterable[int], name: str, data: dict) -> int:
+        """Queues one event for every open stream of `user_ids`; returns how many streams got it."""
+        targets = [s for user_id in set(user_ids) for s in self._subscribers.get(user_id, ())]
+        self.published += 1
+        if not targets:
+            return 0
+        self._next_id += 1
+        message = f"id: {self._next_id}\nevent: {name}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+        for subscriber in targets:
+            queue = subscriber.queue
+            if queue.qsize() >= PUSH_QUEUE_SIZE:
+                # Not reading: drop what is buffered, tell it to resync and stop sending to it.
+                self.overflowed += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.unsubscribe(subscriber)
+                continue
+            queue.put_nowait(message)
+            self.delivered += 1
+        return len(targets)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": PUSH_ENABLED,
+            "connections": self.connections,
+            "users": len(self._subscribers),
+            "max_connections": self.max_connections,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflowed": self.overflowed,
+        }
+
+hub = PushHub()
+
+def _sse(name: str, data: dict) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+async def stream(subscriber: Subscriber, expires_at: Optional[float] = None) -> AsyncIterator[bytes]:
+    """
+    The text/event-stream body of one connection: a "ready" event, then the
+    user's events as they are published, heartbeats while idle, until the
+    stream's lifetime (or `expires_at`, a time.time() deadline) runs out.
+    Clients should refetch the lists after "ready" and "resync".
+    """
+    deadline = time.monotonic() + PUSH_MAX_STREAM_SECONDS
+    if expires_at is not None:
+        deadline = min(deadline, time.monotonic() + (expires_at - time.time()))
+    queue = subscriber.queue
+    try:
+        yield f"retry: {PUSH_RETRY_MS}\n".encode() + _sse("ready", {"user_id": subscriber.user_id})
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=min(PUSH_HEARTBEAT_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if message is None:
+                yield _sse("resync", {})
+                return
+            yield message
+    finally:
+        hub.unsubscribe(subscriber)
+
+# --- Publishing on commit ---
+# Write paths queue their events on the session; they are published only
+# once its transaction commits, and dropped on rollback.
+_PENDING = "push_events"
+
+def queue_event(db: AsyncSession, user_ids: Iterable[int], name: str, data: dict) -> None:
+    if PUSH_ENABLED:
+        db.info.setdefault(_PENDING, []).append((tuple(user_ids), name, data))
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for user_ids, name, data in session.info.pop(_PENDING, ()):
+        try:
+            hub.publish(user_ids, name, data)
+        except Exception:
+            logger.exception("Could not publish %s event", name)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,281 @@
+# backend/ratelimit.py
+
+import os
+import math
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from database import engine, read_engine
+from jobs import PeriodicJob
+from metrics import rate_limited, requests_shed
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Limits read "<count>/<second|minute|hour>[:<burst>]", e.g. "6/minute:20"
+# (refill 6 a minute, up to 20 at once). Empty or "0" turns that limit off.
+# Off by default: bins report on their own schedule, so set this from the real
+# upload cadence of your devices with headroom (e.g. "2/second:30").
+RATE_LIMIT_DEVICE = os.getenv("RATE_LIMIT_DEVICE", "")                         # uploads per device_id
+RATE_LIMIT_DEVICE_IP = os.getenv("RATE_LIMIT_DEVICE_IP", "50/second:200")      # /api/device requests per client IP
+RATE_LIMIT_LOGIN_IP = os.getenv("RATE_LIMIT_LOGIN_IP", "20/minute:10")         # login/register per client IP
+RATE_LIMIT_LOGIN_USER = os.getenv("RATE_LIMIT_LOGIN_USER", "10/minute:5")      # logins per account
+RATE_LIMIT_CLASSIFY_IP = os.getenv("RATE_LIMIT_CLASSIFY_IP", "30/minute:10")   # /api/ml requests per client IP
+RATE_LIMIT_USER = os.getenv("RATE_LIMIT_USER", "10/second:60")                  # authenticated requests per user
+# Buckets kept per worker; the least recently used go first (and come back full).
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Load shedding: /api requests get 503 while one of these is over its threshold. 0 disables a check.
+SHED_MAX_IN_FLIGHT = int(os.getenv("SHED_MAX_IN_FLIGHT", "256"))
+SHED_MAX_LOOP_LAG_MS = float(os.getenv("SHED_MAX_LOOP_LAG_MS", "250"))
+SHED_MAX_DB_WAITING = int(os.getenv("SHED_MAX_DB_WAITING", "50"))
+# How often event-loop lag and pool waiters are sampled; 0 disables the monitor (and those two checks).
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+# Never shed these, so operators can still see what is going on.
+SHED_EXEMPT_PATHS = ("/api/admin/stats",)
+# Long-lived streams: shed when they connect, but not counted as in flight while open.
+LONG_LIVED_PATHS = ("/api/events/stream",)
+
+PERIODS = {"s": 1, "sec": 1, "second": 1, "m": 60, "min": 60, "minute": 60, "h": 3600, "hour": 3600}
+
+class Limit(NamedTuple):
+    rate: float   # tokens added per second
+    burst: float  # bucket size
+
+def parse_limit(spec: Optional[str]) -> Optional[Limit]:
+    """Parses "<count>/<period>[:<burst>]"; None when the limit is off."""
+    spec = (spec or "").strip()
+    if not spec or spec == "0":
+        return None
+    counted, _, burst = spec.partition(":")
+    count, _, period = counted.partition("/")
+    if period.strip().lower() not in PERIODS:
+        raise ValueError(f"Unknown rate limit period in {spec!r}")
+    count = float(count)
+    if count <= 0:
+        return None
+    return Limit(rate=count / PERIODS[period.strip().lower()], burst=float(burst) if burst else max(1.0, count))
+
+class RateLimited(HTTPException):
+    """429 with Retry-After; raised by RateLimiter.check and sent as-is by the middleware."""
+
+    def __init__(self, retry_after: float, detail: str = "Too many requests, please slow down"):
+        super().__init__(status_code=429, detail=detail,
+                         headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+        self.retry_after = retry_after
+
+# --- Bucket storage ---
+class RateLimitStore(ABC):
+    """
+    Holds the token buckets. The default keeps them in this process; a
+    shared store (e.g. Redis running the same refill arithmetic in a
+    script) can be installed with set_store() so limits hold across workers.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        """Charges `cost` tokens to `key`; returns 0 if they were available, else seconds until they will be."""
+
+    def stats(self) -> dict:
+        return {"store": type(self).__name__}
+
+class MemoryStore(RateLimitStore):
+    """Token buckets in an LRU-bounded dict. Not shared between worker processes."""
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self.evictions = 0
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+        return wait
+
+    def stats(self) -> dict:
+        return {"store": "memory", "keys": len(self._buckets), "max_keys": self.maxsize, "evictions": self.evictions}
+
+_store: RateLimitStore = MemoryStore()
+
+def set_store(store: RateLimitStore) -> None:
+    global _store
+    _store = store
+
+class RateLimiter:
+    """One named limit (e.g. "login_ip"); keys are whatever the caller limits by (IP, device_id, email)."""
+
+    def __init__(self, name: str, spec: Optional[str]):
+        self.name = name
+        self.spec = spec
+        self.limit = parse_limit(spec)
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return RATE_LIMIT_ENABLED and self.limit is not None
+
+    async def hit(self, key: str, cost: float = 1.0) -> float:
+        """Seconds until `key` may make this call; 0 means it is allowed (and charged) now."""
+        if not self.enabled:
+            return 0.0
+        # A call never costs more than a full bucket, or it could never succeed.
+        wait = await _store.take(f"{self.name}:{key}", self.limit, min(cost, self.limit.burst))
+        if wait:
+            self.limited += 1
+            rate_limited.inc(self.name)
+        return wait
+
+    async def check(self, key: str, cost: float = 1.0) -> None:
+        wait = await self.hit(key, cost)
+        if wait:
+            raise RateLimited(wait)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "limit": self.spec, "limited": self.limited}
+
+device_limiter = RateLimiter("device", RATE_LIMIT_DEVICE)
+device_ip_limiter = RateLimiter("device_ip", RATE_LIMIT_DEVICE_IP)
+login_ip_limiter = RateLimiter("login_ip", RATE_LIMIT_LOGIN_IP)
+login_user_limiter = RateLimiter("login_user", RATE_LIMIT_LOGIN_USER)
+classify_ip_limiter = RateLimiter("classify_ip", RATE_LIMIT_CLASSIFY_IP)
+user_limiter = RateLimiter("user", RATE_LIMIT_USER)
+limiters = (device_limiter, device_ip_limiter, login_ip_limiter, login_user_limiter, classify_ip_limiter, user_limiter)
+
+# --- Load shedding ---
+class LoadMonitor(PeriodicJob):
+    """
+    Samples event-loop lag (how late each tick wakes up) and the number of
+    requests waiting for a pooled DB connection. Lag rises to a new peak at
+    once and decays over a few ticks, so one slow tick does not flap.
+    """
+
+    name = "load monitor"
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        super().__init__(interval)
+        self._due: Optional[float] = None
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+        self.db_waiting = 0
+
+    async def run_once(self):
+        now = time.monotonic()
+        if self._due is not None:
+            lag = max(0.0, now - self._due)
+            self.loop_lag = lag if lag > self.loop_lag else 0.7 * self.loop_lag + 0.3 * lag
+            self.max_loop_lag = max(self.max_loop_lag, lag)
+        self._due = now + self.interval
+        pools = {engine.pool, read_engine.pool}
+        self.db_waiting = sum(getattr(pool, "waiting", 0) for pool in pools)
+
+    async def stop(self) -> None:
+        await super().stop()
+        self._due = None
+        self.loop_lag = 0.0
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "loop_lag_ms": round(self.loop_lag * 1000, 3),
+            "max_loop_lag_ms": round(self.max_loop_lag * 1000, 3),
+            "db_waiting": self.db_waiting,
+        }
+
+load_monitor = LoadMonitor()
+shed_counts: Dict[str, int] = {}
+# /api requests admitted and not yet finished in this worker.
+in_flight = 0
+
+def overload_reason(in_flight: int) -> Optional[str]:
+    """Why a new request should be shed right now, or None."""
+    if SHED_MAX_IN_FLIGHT and in_flight >= SHED_MAX_IN_FLIGHT:
+        return "in_flight"
+    if SHED_MAX_LOOP_LAG_MS and load_monitor.loop_lag * 1000 >= SHED_MAX_LOOP_LAG_MS:
+        return "loop_lag"
+    if SHED_MAX_DB_WAITING and load_monitor.db_waiting >= SHED_MAX_DB_WAITING:
+        return "db_waiting"
+    return None
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware in front of /api: sheds requests with 503 while the
+    worker is overloaded, then applies the per-IP limit of the longest
+    matching path prefix (429). Both happen before the body is read, so a
+    rejected upload costs next to nothing. Per-device and per-account limits
+    need the parsed body and are checked in the endpoints; per-user limits
+    need the token and are checked by dependencies.role_checker.
+
+    The client IP is the ASGI client address; behind a proxy, let uvicorn
+    rewrite it from X-Forwarded-For (FORWARDED_ALLOW_IPS).
+    """
+
+    def __init__(self, app, ip_limits: Dict[str, RateLimiter]):
+        self.app = app
+        self.ip_limits = sorted(ip_limits.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _limiter(self, path: str) -> Optional[RateLimiter]:
+        for prefix, limiter in self.ip_limits:
+            if path.startswith(prefix):
+                return limiter
+        return None
+
+    async def __call__(self, scope, receive, send):
+        global in_flight
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        reason = None if path in SHED_EXEMPT_PATHS else overload_reason(in_flight)
+        if reason is not None:
+            shed_counts[reason] = shed_counts.get(reason, 0) + 1
+            requests_shed.inc(reason)
+            response = JSONResponse({"detail": "Server is busy, please retry shortly"},
+                                    status_code=503, headers={"Retry-After": "1"})
+            return await response(scope, receive, send)
+
+        limiter = self._limiter(path)
+        if limiter is not None:
+            client = scope.get("client")
+            wait = await limiter.hit(client[0] if client else "unknown")
+            if wait:
+                e = RateLimited(wait)
+                response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+                return await response(scope, receive, send)
+
+        if path in LONG_LIVED_PATHS:
+            return await self.app(scope, receive, send)
+        in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            in_flight -= 1
+
+def admission_stats() -> dict:
+    return {
+        "rate_limits": {limiter.name: limiter.stats() for limiter in limiters},
+        "store": _store.stats(),
+        "in_flight": in_flight,
+        "shed": dict(shed_counts),
+        "thresholds": {
+            "max_in_flight": SHED_MAX_IN_FLIGHT,
+            "max_loop_lag_ms": SHED_MAX_LOOP_LAG_MS,
+            "max_db_waiting": SHED_MAX_DB_WAITING,
+        },
+        "monitor": load_monitor.stats(),
+    }
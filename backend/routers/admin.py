@@ -1,25 +1,126 @@
 # backend/routers/admin.py
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 import schemas, crud
-from database import get_db
-from dependencies import role_checker
+from cache import device_owner_cache, user_cache, response_cache
+from database import get_db, get_read_db, pool_stats
+from password_utils import hasher_stats
+from model_client import model_client
+from analytics import reconciler, matview_refresher, segregation_accuracy
+from outbox import outbox_consumer
+from assignment import pickup_assigner
+from ratelimit import admission_stats
+from push import hub
+from dependencies import role_checker, analytics_date_range
+from export import ExportFormat, stream_export
+from pagination import PageParams, page_params, paginate
 
 router = APIRouter()
-admin_access = role_checker(["admin"])
+admin_access = role_checker(["admin"], fresh=True)
 
 @router.get("/analytics", response_model=schemas.AdminAnalytics)
-async def get_admin_analytics(db: AsyncSession = Depends(get_db), current_user: schemas.User = Depends(admin_access)):
-    total_waste = await crud.get_total_waste_collected(db)
+async def get_admin_analytics(db: AsyncSession = Depends(get_read_db), current_user: schemas.User = Depends(admin_access)):
+    # Read from the pre-aggregated rollups: a few rows per waste type, not a scan of waste_logs.
+    type_totals = await crud.get_waste_type_totals(db)
     active_households = await crud.get_active_households_count(db)
     return {
-        "total_waste_collected": total_waste,
-        "segregation_accuracy": 95.5,
+        "total_waste_collected": sum(row.total_weight for row in type_totals),
+        "segregation_accuracy": segregation_accuracy(type_totals),
         "active_households": active_households,
+        "waste_by_type": type_totals,
     }
 
+@router.post("/analytics/reconcile")
+async def reconcile_analytics(full: bool = False, current_user: schemas.User = Depends(admin_access)):
+    """Recomputes the analytics rollups from the waste logs now (recent days, or all history with full=true)."""
+    corrected = await reconciler.reconcile(full=full)
+    return {"corrected": corrected}
+
+@router.get("/analytics/waste", response_model=schemas.WasteSeries)
+async def get_waste_series(
+    date_range=Depends(analytics_date_range),
+    bucket: schemas.TimeBucket = schemas.TimeBucket.day,
+    waste_type: Optional[str] = None,
+    by_type: bool = False,
+    household_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.User = Depends(admin_access)
+):
+    """
+    Waste totals per day, week or month. System-wide series are served from
+    the daily rollups; with household_id they are read from waste_logs.
+    """
+    start, end = date_range
+    if household_id is None:
+        source = "rollup"
+        points = await crud.get_rollup_series(
+            db, start=start, end=end, bucket=bucket.value, waste_type=waste_type, by_type=by_type)
+    else:
+        source = "logs"
+        points = await crud.get_waste_log_series(
+            db, start=start, end=end, bucket=bucket.value, user_id=household_id,
+            waste_type=waste_type, by_type=by_type)
+    return {"start": start, "end": end, "bucket": bucket, "source": source, "points": points}
+
+@router.get("/analytics/waste-types", response_model=schemas.WasteSeries)
+async def get_waste_by_type(
+    date_range=Depends(analytics_date_range),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.User = Depends(admin_access)
+):
+    start, end = date_range
+    points = await crud.get_rollup_series(db, start=start, end=end, by_type=True)
+    return {"start": start, "end": end, "source": "rollup", "points": points}
+
+@router.get("/analytics/workers", response_model=schemas.WorkerPickupReport)
+async def get_worker_analytics(
+    date_range=Depends(analytics_date_range),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.User = Depends(admin_access)
+):
+    start, end = date_range
+    workers = await crud.get_worker_pickup_stats(db, start=start, end=end)
+    return {"start": start, "end": end, "workers": workers}
+
 @router.get("/devices", response_model=List[schemas.Device])
-async def get_all_devices(db: AsyncSession = Depends(get_db), current_user: schemas.User = Depends(admin_access)):
-    return await crud.get_all_devices(db)
\ No newline at end of file
+async def get_all_devices(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(page_params(crud.ID_PAGE_TYPES)),
+    export_format: Optional[ExportFormat] = Query(None, alias="format"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.User = Depends(admin_access)
+):
+    if export_format:
+        return stream_export(crud.devices_export_query(), export_format, "devices")
+    devices = await crud.get_all_devices(db, limit=page.limit + 1, after=page.after)
+    return paginate(request, response, devices, page, crud.ID_PAGE_KEY)
+
+@router.post("/users/{user_id}/revoke-tokens", status_code=204)
+async def revoke_tokens(user_id: int, current_user: schemas.User = Depends(admin_access), db: AsyncSession = Depends(get_db)):
+    """Revokes every token issued to the user so far (e.g. a lost or stolen phone)."""
+    if await crud.revoke_user_tokens(db, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return Response(status_code=204)
+
+@router.get("/stats")
+async def get_runtime_stats(current_user: schemas.User = Depends(admin_access)):
+    """In-process runtime counters for this worker (caches, pools)."""
+    return {
+        "database": pool_stats(),
+        "caches": {
+            "device_owner": device_owner_cache.stats(),
+            "user": user_cache.stats(),
+            "response": response_cache.stats(),
+        },
+        "password_hasher": hasher_stats(),
+        "model_client": model_client.stats(),
+        "analytics_reconciler": reconciler.stats(),
+        "analytics_matview": matview_refresher.stats(),
+        "outbox": outbox_consumer.stats(),
+        "pickup_assignment": pickup_assigner.stats(),
+        "admission": admission_stats(),
+        "push": hub.stats(),
+    }
@@ -1,6 +1,6 @@
 # backend/routers/auth.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
@@ -8,7 +8,17 @@ from typing import Annotated
 
 import schemas, crud
 from database import get_db
-from auth_utils import authenticate_user, create_access_token
+from auth_utils import authenticate_user, create_access_token, get_current_user_fresh
+from metrics import logins
+from password_utils import PasswordHasherBusy
+from ratelimit import login_user_limiter
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
 router = APIRouter()
 
@@ -17,25 +27,47 @@ async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get
     db_user = await crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return await crud.create_user(db=db, user=user)
+    try:
+        return await crud.create_user(db=db, user=user)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
 
-# --- MODIFIED FUNCTION WITH DEBUGGING PRINT ---
 @router.post("/login", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: AsyncSession = Depends(get_db)
 ):
-    # This will print the exact username and password received from the form
-    print("--- LOGIN ATTEMPT (from browser) ---")
-    print(f"DEBUG: Received username: '{form_data.username}'")
-    print(f"DEBUG: Received password: '{form_data.password}'")
-    print("------------------------------------")
-
-    user = await authenticate_user(db, form_data.username, form_data.password)
+    # Per-IP limits are applied by the admission middleware; this one protects a single account.
+    await login_user_limiter.check(form_data.username.strip().lower())
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        logins.inc("busy")
+        raise _hasher_busy()
     if not user:
+        logins.inc("failed")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
-    access_token = create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    access_token = create_access_token(data={
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role.value,
+        "ver": user.token_version or 0,
+    })
+    logins.inc("ok")
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    current_user: schemas.User = Depends(get_current_user_fresh),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Signs the caller out on every device: revokes all of their tokens. The
+    revocation is checked by the fresh endpoints (admin, pickup confirm) at
+    once; elsewhere it takes effect when the token expires.
+    """
+    await crud.revoke_user_tokens(db, current_user.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
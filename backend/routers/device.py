@@ -1,55 +1,128 @@
 # backend/routers/device.py
 
+import os
+import math
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 import schemas, models, crud
 from database import get_db
+from outbox import outbox_consumer, waste_logged_event
+from ratelimit import device_limiter
 
 router = APIRouter()
 
+# Upper bound on readings accepted in one batch upload.
+DEVICE_BATCH_MAX_READINGS = int(os.getenv("DEVICE_BATCH_MAX_READINGS", "1000"))
+
+def calculate_points(weight: float) -> int:
+    """1 kg of waste is worth 20 reward points."""
+    return int(round(weight * 20))
+
 @router.post("/upload")
 async def upload_from_device(
     log: schemas.WasteLogCreate,
     db: AsyncSession = Depends(get_db)
 ):
-    # Step 1: Find Household by device_id
-    device_result = await db.execute(
-        select(models.Device).filter(models.Device.device_id == log.device_id)
-    )
-    device = device_result.scalars().first()
-    if not device:
+    # A bin stuck in a retry loop is turned away before it costs a query.
+    await device_limiter.check(log.device_id)
+
+    # Step 1: Find Household by device_id (served from the device owner cache when warm)
+    owner = await crud.resolve_device_owner(db, log.device_id)
+    if owner is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device not found")
 
-    user_result = await db.execute(
-        select(models.User).filter(models.User.id == device.user_id)
-    )
-    user = user_result.scalars().first()
-    if not user or user.role != models.UserRole.household:
+    user_id, role = owner
+    if user_id is None or role != models.UserRole.household:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Device not linked to a household user")
 
     # Step 2: Calculate points
-    points = int(round(log.weight * 20))
+    points = calculate_points(log.weight)
 
-    # Step 3: Create Waste Log
-    await crud.create_waste_log(
+    # Step 3: Store the Waste Log and, in the same transaction, an outbox event
+    # for its side effects (rollups, reward, pickup), applied by the consumer.
+    waste_log = await crud.create_waste_log(
         db,
-        user_id=user.id,
+        user_id=user_id,
         waste_type=log.waste_type,
         weight=log.weight,
         points=points,
         timestamp=log.timestamp,
+        commit=False,
     )
+    await db.flush()
+    await crud.enqueue_outbox_events(db, [waste_logged_event(waste_log)])
 
-    # Step 4: Update Reward
-    await crud.update_or_create_reward(db, user_id=user.id, points_to_add=points)
+    # Step 4: Single commit, then wake the consumer
+    await db.commit()
+    outbox_consumer.notify()
 
-    # Step 5: Create Pickup for first worker (placeholder logic)
-    worker_result = await db.execute(
-        select(models.User).filter(models.User.role == models.UserRole.worker)
-    )
-    worker = worker_result.scalars().first()
-    if worker:
-        await crud.create_pickup(db, household_id=user.id, worker_id=worker.id)
+    return {"message": "Waste log stored; reward and pickup are applied shortly",
+            "waste_log_id": waste_log.id, "points": points}
 
-    return {"message": "Waste log processed, reward updated, and pickup created"}
\ No newline at end of file
+@router.post("/upload/batch", response_model=schemas.WasteLogBatchResult)
+async def upload_batch_from_device(
+    batch: schemas.WasteLogBatchCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Ingests many buffered readings in one request and one transaction.
+    Each reading gets its own result entry so a device only retries the
+    readings that were rejected.
+    """
+    readings = batch.readings
+    if len(readings) > DEVICE_BATCH_MAX_READINGS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch may contain at most {DEVICE_BATCH_MAX_READINGS} readings",
+        )
+
+    # Each device in the batch is charged one upload, however many readings it buffered.
+    waits = {device_id: await device_limiter.hit(device_id) for device_id in {r.device_id for r in readings}}
+
+    # Step 1: Resolve every device owner (cache first, one joined query for misses)
+    owners = await crud.resolve_device_owners(db, (r.device_id for r in readings if not waits[r.device_id]))
+
+    # Step 2: Validate each reading and stage the accepted ones
+    results = []
+    rows = []
+    for index, reading in enumerate(readings):
+        if waits[reading.device_id]:
+            results.append(schemas.WasteLogBatchItemResult(
+                index=index, device_id=reading.device_id, status="error",
+                detail=f"Rate limited, retry in {math.ceil(waits[reading.device_id])} s"))
+            continue
+        owner = owners.get(reading.device_id)
+        if owner is None:
+            results.append(schemas.WasteLogBatchItemResult(
+                index=index, device_id=reading.device_id, status="error", detail="Device not found"))
+            continue
+        user_id, role = owner
+        if user_id is None or role != models.UserRole.household:
+            results.append(schemas.WasteLogBatchItemResult(
+                index=index, device_id=reading.device_id, status="error",
+                detail="Device not linked to a household user"))
+            continue
+
+        points = calculate_points(reading.weight)
+        rows.append({
+            "user_id": user_id,
+            "waste_type": reading.waste_type,
+            "weight": reading.weight,
+            "points": points,
+            "timestamp": reading.timestamp,
+        })
+        results.append(schemas.WasteLogBatchItemResult(
+            index=index, device_id=reading.device_id, status="ok", points=points))
+
+    # Step 3: Bulk insert logs and their outbox events in a single transaction
+    if rows:
+        logs = await crud.bulk_create_waste_logs(db, rows)
+        await crud.enqueue_outbox_events(db, [waste_logged_event(waste_log) for waste_log in logs])
+        await db.commit()
+        outbox_consumer.notify()
+
+    return schemas.WasteLogBatchResult(
+        accepted=len(rows),
+        rejected=len(readings) - len(rows),
+        results=results,
+    )
@@ -0,0 +1,53 @@
+# backend/routers/events.py
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Optional
+
+from auth_utils import decode_access_token
+from push import PUSH_ENABLED, PushHubFull, hub, stream
+
+router = APIRouter()
+
+@router.get("/stream")
+async def event_stream(request: Request, access_token: Optional[str] = Query(None)):
+    """
+    Server-sent events for the caller: `pickup` (created or status changed,
+    for its worker and household) and `reward` (new balance). Authenticate
+    with the Authorization header, or `?access_token=` where the client
+    cannot set headers (browser EventSource).
+
+    Events only cover changes made after the stream opened: refetch the
+    lists (with If-None-Match) after the `ready` and `resync` events.
+    """
+    if not PUSH_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Event streams are disabled")
+
+    # Claims only: a dependency on the database session would hold it open for the whole stream.
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    token = token if scheme.lower() == "bearer" and token else access_token
+    token_data = decode_access_token(token) if token else None
+    if token_data is None or token_data.user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated" if token_data is None else "Please sign in again",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    try:
+        subscriber = hub.subscribe(token_data.user_id)
+    except PushHubFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS if e.per_user else status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.detail,
+            headers={"Retry-After": "5"},
+        )
+    return StreamingResponse(
+        stream(subscriber, expires_at=token_data.expires_at),
+        media_type="text/event-stream",
+        # no-transform and X-Accel-Buffering stop proxies from buffering the stream.
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+        # The stream unsubscribes when it ends; this covers a client gone before it started.
+        background=BackgroundTask(hub.unsubscribe, subscriber),
+    )
@@ -1,25 +1,65 @@
 # backend/routers/household.py
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 import schemas, crud
-from database import get_db
-from dependencies import role_checker
+from analytics import household_series
+from conditional import versioned_page
+from database import get_read_db
+from dependencies import role_checker, analytics_date_range
+from export import ExportFormat, stream_export
+from pagination import PageParams, page_params
 
 router = APIRouter()
 household_access = role_checker(["household"])
 
 @router.get("/waste-logs", response_model=List[schemas.WasteLog])
 async def get_household_waste_logs(
-    db: AsyncSession = Depends(get_db),
-    current_user: schemas.User = Depends(household_access)
+    request: Request,
+    page: PageParams = Depends(page_params(crud.WASTE_LOG_PAGE_TYPES)),
+    export_format: Optional[ExportFormat] = Query(None, alias="format"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.TokenUser = Depends(household_access)
 ):
-    return await crud.get_waste_logs_by_user(db, user_id=current_user.id)
+    """
+    Newest logs first, one page at a time (follow X-Next-Cursor). With
+    format=ndjson or format=csv the whole history is streamed instead.
+    Pages carry an ETag; send it back in If-None-Match to get 304 while
+    nothing has changed.
+    """
+    if export_format:
+        return stream_export(crud.waste_logs_export_query(current_user.id), export_format, "waste-logs")
+    return await versioned_page(
+        request, db, resource=crud.WASTE_LOGS, user_id=current_user.id, schema=schemas.WasteLog,
+        page=page, key=crud.WASTE_LOG_PAGE_KEY,
+        load=lambda: crud.get_waste_logs_by_user(db, user_id=current_user.id, limit=page.limit + 1, after=page.after),
+    )
 
 @router.get("/rewards", response_model=List[schemas.Reward])
 async def get_household_rewards(
-    db: AsyncSession = Depends(get_db),
-    current_user: schemas.User = Depends(household_access)
+    request: Request,
+    page: PageParams = Depends(page_params(crud.ID_PAGE_TYPES)),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.TokenUser = Depends(household_access)
 ):
-    return await crud.get_rewards_by_user(db, user_id=current_user.id)
\ No newline at end of file
+    """Pages carry an ETag; If-None-Match gets 304 while nothing has changed."""
+    return await versioned_page(
+        request, db, resource=crud.REWARDS, user_id=current_user.id, schema=schemas.Reward,
+        page=page, key=crud.ID_PAGE_KEY,
+        load=lambda: crud.get_rewards_by_user(db, user_id=current_user.id, limit=page.limit + 1, after=page.after),
+    )
+
+@router.get("/analytics", response_model=schemas.WasteSeries)
+async def get_household_analytics(
+    date_range=Depends(analytics_date_range),
+    bucket: schemas.TimeBucket = schemas.TimeBucket.day,
+    by_type: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.TokenUser = Depends(household_access)
+):
+    """The caller's own waste totals per day, week or month over a date range."""
+    start, end = date_range
+    source, points = await household_series(
+        db, user_id=current_user.id, start=start, end=end, bucket=bucket.value, by_type=by_type)
+    return {"start": start, "end": end, "bucket": bucket, "source": source, "points": points}
@@ -1,8 +1,13 @@
 import os
+import asyncio
 import logging
-from fastapi import APIRouter, File, UploadFile, HTTPException
-import requests
-from typing import Dict
+from tempfile import SpooledTemporaryFile
+from fastapi import APIRouter, File, Header, Request, UploadFile, HTTPException
+import httpx
+from typing import Dict, List, Optional
+
+from model_client import model_client, ModelServiceUnavailable
+from uploads import ML_DOWNSCALE_MAX_SIDE, downscale_image, iter_file
 
 # The router is created without a prefix.
 # The prefix will be added in main.py when the router is included.
@@ -11,9 +16,29 @@ router = APIRouter(
 )
 
 # --- Configuration ---
-# The URL for your model service, loaded from an environment variable.
-# Ensure this is set in your Railway project settings.
-MODEL_SERVICE_URL = os.environ.get("MODEL_SERVICE_URL")
+# The URL for your model service (MODEL_SERVICE_URL) and the connection pool,
+# timeout, concurrency and circuit breaker settings live in model_client.py.
+# Ensure MODEL_SERVICE_URL is set in your Railway project settings.
+ML_BATCH_MAX_IMAGES = int(os.environ.get("ML_BATCH_MAX_IMAGES", "32"))
+# Size limits and downscaling are configured in uploads.py.
+# Uploads up to this size stay in memory while they are downscaled; larger ones go to a temp file.
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+def _model_service_error(e: Exception) -> HTTPException:
+    """Maps a failed model service call to the HTTP error we return."""
+    if isinstance(e, ModelServiceUnavailable):
+        # Circuit open or too many classifications in flight: fail fast
+        return HTTPException(
+            status_code=503,
+            detail=e.detail,
+            headers={"Retry-After": str(max(1, int(e.retry_after)))},
+        )
+    if isinstance(e, httpx.TimeoutException):
+        logging.error("Request to the model service timed out.")
+        return HTTPException(status_code=504, detail="The model service took too long to respond.")
+    # Handle network errors or if the model service is down
+    logging.error(f"Could not connect to the model service: {e}")
+    return HTTPException(status_code=503, detail=f"The model service is currently unavailable: {e}")
 
 # The endpoint path is now clean and simple.
 # Final URL will be: /api/ml (from main.py) + /classify-waste (from here)
@@ -24,7 +49,7 @@ async def classify_waste_image(image: UploadFile = File(...)):
     classification, and returns the model's prediction.
     """
     # Check if the model service URL is configured
-    if not MODEL_SERVICE_URL:
+    if not model_client.url:
         logging.error("MODEL_SERVICE_URL environment variable is not set.")
         raise HTTPException(status_code=500, detail="Model service is not configured correctly.")
 
@@ -32,25 +57,93 @@ async def classify_waste_image(image: UploadFile = File(...)):
     if not image.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image.")
 
-    # Prepare the image file in the format the model service expects
-    files = {'image': (image.filename, await image.read(), image.content_type)}
+    # The upload is already spooled by the form parser (to disk when large):
+    # forward that file in chunks, or a downscaled copy, instead of reading it whole.
+    await image.seek(0)
+    content, content_type = image.file, image.content_type
+    if ML_DOWNSCALE_MAX_SIDE:
+        smaller = await asyncio.to_thread(downscale_image, image.file)
+        if smaller is not None:
+            content, content_type = smaller, "image/jpeg"
 
     try:
-        logging.info(f"Forwarding request to model service at {MODEL_SERVICE_URL}")
-        # Send the POST request to the external model service
-        response = requests.post(MODEL_SERVICE_URL, files=files, timeout=30)
-        
-        # Check if the model service responded with an error
-        response.raise_for_status()
-        
-        # Return the successful JSON response from the model
-        return response.json()
-
-    except requests.exceptions.Timeout:
-        logging.error("Request to the model service timed out.")
-        raise HTTPException(status_code=504, detail="The model service took too long to respond.")
-    except requests.exceptions.RequestException as e:
-        # Handle network errors or if the model service is down
-        logging.error(f"Could not connect to the model service: {e}")
-        raise HTTPException(status_code=503, detail=f"The model service is currently unavailable: {e}")
+        logging.info(f"Forwarding request to model service at {model_client.url}")
+        # Shared keep-alive client; never blocks the event loop
+        return await model_client.classify(image.filename, content, content_type)
+
+    except (ModelServiceUnavailable, httpx.HTTPError) as e:
+        raise _model_service_error(e)
+
+@router.post("/classify-waste/raw", response_model=Dict)
+async def classify_waste_image_raw(
+    request: Request,
+    content_type: str = Header(...),
+    content_length: Optional[int] = Header(None),
+):
+    """
+    Same as /classify-waste, but the request body is the image itself
+    (Content-Type: image/jpeg, image/png, ...). The body is passed on to the
+    model service while it arrives, so the image is never held in memory.
+    """
+    if not model_client.raw_url:
+        logging.error("MODEL_SERVICE_URL environment variable is not set.")
+        raise HTTPException(status_code=500, detail="Model service is not configured correctly.")
+    if not content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image.")
+
+    try:
+        if not ML_DOWNSCALE_MAX_SIDE:
+            return await model_client.classify_raw(request.stream(), content_type, content_length)
+
+        # Downscaling needs the whole image: spool it, then forward the smaller copy.
+        with SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spooled:
+            size = 0
+            async for chunk in request.stream():
+                spooled.write(chunk)
+                size += len(chunk)
+            spooled.seek(0)
+            smaller = await asyncio.to_thread(downscale_image, spooled)
+            if smaller is not None:
+                return await model_client.classify_raw(smaller, "image/jpeg")
+            return await model_client.classify_raw(iter_file(spooled), content_type, size)
+
+    except (ModelServiceUnavailable, httpx.HTTPError) as e:
+        raise _model_service_error(e)
+
+@router.post("/classify-waste/batch", response_model=Dict)
+async def classify_waste_images(images: List[UploadFile] = File(...)):
+    """
+    Classifies a burst of images with one call to the model service.
+    Results are returned in input order; rejected images carry an `error`.
+    """
+    if not model_client.batch_url:
+        logging.error("MODEL_SERVICE_URL environment variable is not set.")
+        raise HTTPException(status_code=500, detail="Model service is not configured correctly.")
+    if len(images) > ML_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {ML_BATCH_MAX_IMAGES} images per request.")
+
+    results: List[Dict] = [{"index": i, "filename": image.filename} for i, image in enumerate(images)]
+    forwarded = []
+    for i, image in enumerate(images):
+        if not (image.content_type or "").startswith("image/"):
+            results[i]["error"] = "Invalid file type. Please upload an image."
+            continue
+        await image.seek(0)
+        content, content_type = image.file, image.content_type
+        if ML_DOWNSCALE_MAX_SIDE:
+            smaller = await asyncio.to_thread(downscale_image, image.file)
+            if smaller is not None:
+                content, content_type = smaller, "image/jpeg"
+        forwarded.append((i, (image.filename, content, content_type)))
+
+    if forwarded:
+        try:
+            predictions = await model_client.classify_batch([payload for _, payload in forwarded])
+        except (ModelServiceUnavailable, httpx.HTTPError) as e:
+            raise _model_service_error(e)
+
+        for (i, _), prediction in zip(forwarded, predictions):
+            prediction.pop("index", None)
+            results[i].update(prediction)
 
+    return {"results": results}
@@ -1,27 +1,43 @@
 # backend/routers/worker.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 import schemas, crud, models
-from database import get_db
+from assignment import pickup_assigner
+from conditional import versioned_page
+from database import get_db, get_read_db
 from dependencies import role_checker
+from export import ExportFormat, stream_export
+from pagination import PageParams, page_params
 
 router = APIRouter()
 worker_access = role_checker(["worker"])
+# State-changing endpoints re-read the user row and honour token revocation.
+worker_fresh_access = role_checker(["worker"], fresh=True)
 
 @router.get("/pickups", response_model=List[schemas.Pickup])
 async def get_worker_pickups(
-    db: AsyncSession = Depends(get_db),
-    current_user: schemas.User = Depends(worker_access)
+    request: Request,
+    page: PageParams = Depends(page_params(crud.PICKUP_PAGE_TYPES)),
+    export_format: Optional[ExportFormat] = Query(None, alias="format"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.TokenUser = Depends(worker_access)
 ):
-    return await crud.get_pickups_by_worker(db, worker_id=current_user.id)
+    """Pages carry an ETag; If-None-Match gets 304 while nothing has changed."""
+    if export_format:
+        return stream_export(crud.pickups_export_query(current_user.id), export_format, "pickups")
+    return await versioned_page(
+        request, db, resource=crud.PICKUPS, user_id=current_user.id, schema=schemas.Pickup,
+        page=page, key=crud.PICKUP_PAGE_KEY,
+        load=lambda: crud.get_pickups_by_worker(db, worker_id=current_user.id, limit=page.limit + 1, after=page.after),
+    )
 
 @router.post("/pickups/confirm/{pickup_id}")
 async def confirm_pickup(
     pickup_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: schemas.User = Depends(worker_access)
+    current_user: schemas.User = Depends(worker_fresh_access)
 ):
     pickup = await crud.get_pickup_by_id(db, pickup_id)
     if not pickup:
@@ -31,4 +47,5 @@ async def confirm_pickup(
     if pickup.status == models.PickupStatus.collected:
         return pickup
     updated = await crud.update_pickup_status(db, pickup_id=pickup_id, new_status=models.PickupStatus.collected)
+    pickup_assigner.release(updated.household_id)
     return updated
\ No newline at end of file
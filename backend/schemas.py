@@ -1,8 +1,9 @@
 # backend/schemas.py
 
 from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
+import enum
 import models
 
 # --- User Schemas ---
@@ -28,6 +29,16 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
+    role: Optional[models.UserRole] = None
+    version: Optional[int] = None
+    expires_at: Optional[int] = None  # `exp` claim, seconds since the epoch
+
+class TokenUser(BaseModel):
+    """The caller as described by the claims of a verified access token."""
+    id: int
+    email: str  # validated at registration; not re-validated per request
+    role: models.UserRole
 
 # --- Device Schemas ---
 class Device(BaseModel):
@@ -47,6 +58,21 @@ class WasteLogCreate(WasteLogBase):
     device_id: str
     timestamp: datetime
 
+class WasteLogBatchCreate(BaseModel):
+    readings: List[WasteLogCreate]
+
+class WasteLogBatchItemResult(BaseModel):
+    index: int
+    device_id: str
+    status: str
+    detail: Optional[str] = None
+    points: Optional[int] = None
+
+class WasteLogBatchResult(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[WasteLogBatchItemResult]
+
 class WasteLog(WasteLogBase):
     id: int
     user_id: int
@@ -75,7 +101,49 @@ class Reward(BaseModel):
         from_attributes = True
 
 # --- Analytics Schemas ---
+class WasteTypeTotal(BaseModel):
+    waste_type: str
+    log_count: int
+    total_weight: float
+    total_points: int
+    class Config:
+        from_attributes = True
+
 class AdminAnalytics(BaseModel):
     total_waste_collected: float
     segregation_accuracy: float
-    active_households: int
\ No newline at end of file
+    active_households: int
+    waste_by_type: List[WasteTypeTotal] = []
+
+# --- Time-bucketed Analytics Schemas ---
+class TimeBucket(str, enum.Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+class WasteSeriesPoint(BaseModel):
+    period: Optional[date] = None
+    waste_type: Optional[str] = None
+    log_count: int
+    total_weight: float
+    total_points: int
+
+class WasteSeries(BaseModel):
+    start: date
+    end: date
+    bucket: Optional[TimeBucket] = None
+    source: str
+    points: List[WasteSeriesPoint]
+
+class WorkerPickupStats(BaseModel):
+    worker_id: int
+    name: Optional[str] = None
+    pickups: int
+    collected: int
+    pending: int
+    households: int
+
+class WorkerPickupReport(BaseModel):
+    start: date
+    end: date
+    workers: List[WorkerPickupStats]
@@ -0,0 +1,86 @@
+# backend/test_pagination.py
+
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from pagination import PageParams, decode_cursor, encode_cursor, page_params
+
+TIMESTAMP_ID = (datetime, int)
+ID = (int,)
+
+def raw_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def test_round_trip():
+    key = (datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc), 42)
+    assert decode_cursor(encode_cursor(key), TIMESTAMP_ID) == key
+    assert decode_cursor(encode_cursor((7,)), ID) == (7,)
+
+@pytest.mark.parametrize("values, key_types", [
+    ([1], TIMESTAMP_ID),                                   # too short
+    ([{"dt": "2026-01-01T00:00:00"}, 1, 5], TIMESTAMP_ID),  # too long
+    ([], ID),
+    ([1, 2], ID),
+])
+def test_wrong_length(values, key_types):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(raw_cursor(values), key_types)
+    assert exc.value.status_code == 400
+
+@pytest.mark.parametrize("values, key_types", [
+    (["abc", 1], TIMESTAMP_ID),
+    ([1, 1], TIMESTAMP_ID),
+    ([{"dt": "2026-01-01T00:00:00"}, "1"], TIMESTAMP_ID),
+    ([{"dt": "2026-01-01T00:00:00"}, 1.5], TIMESTAMP_ID),
+    ([{"dt": "not a date"}, 1], TIMESTAMP_ID),
+    ([{"dt": 5}, 1], TIMESTAMP_ID),
+    ([True], ID),
+    ([None], ID),
+    ([2**40], ID),
+    ({"id": 1}, ID),
+    ("1", ID),
+])
+def test_wrong_types(values, key_types):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(raw_cursor(values), key_types)
+    assert exc.value.status_code == 400
+
+@pytest.mark.parametrize("values, key_types", [
+    ([[1, 2], 3], TIMESTAMP_ID),
+    ([{"dt": "2026-01-01T00:00:00", "x": 1}, 1], TIMESTAMP_ID),
+    ([{"dt": ["2026-01-01T00:00:00"]}, 1], TIMESTAMP_ID),
+    ([{"dt": "2026-01-01T00:00:00"}, [1]], TIMESTAMP_ID),
+    ([[1]], ID),
+    ([{"id": 1}], ID),
+])
+def test_nested_values(values, key_types):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(raw_cursor(values), key_types)
+    assert exc.value.status_code == 400
+
+DEEPLY_NESTED = base64.urlsafe_b64encode(b"[" * 100_000).decode()
+
+@pytest.mark.parametrize("cursor", ["%%%", "bm90IGpzb24", DEEPLY_NESTED])
+def test_undecodable(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, ID)
+    assert exc.value.status_code == 400
+
+def test_page_params_dependency():
+    app = FastAPI()
+
+    @app.get("/items")
+    def items(page: PageParams = Depends(page_params(TIMESTAMP_ID))):
+        return {"limit": page.limit, "after": page.after and [str(v) for v in page.after]}
+
+    client = TestClient(app)
+    assert client.get("/items").json() == {"limit": 100, "after": None}
+    cursor = encode_cursor((datetime(2026, 1, 1), 3))
+    assert client.get("/items", params={"cursor": cursor}).json()["after"] == ["2026-01-01 00:00:00", "3"]
+    for values in ([1], [{"dt": "2026-01-01T00:00:00"}, 1, 5], [[1, 2], 3], ["abc", 1]):
+        assert client.get("/items", params={"cursor": raw_cursor(values)}).status_code == 400
@@ -0,0 +1,103 @@
+# backend/uploads.py
+
+import os
+import logging
+from io import BytesIO
+from typing import AsyncIterator, BinaryIO, Dict, Optional
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Largest image accepted by the classification endpoints (whole request body).
+ML_MAX_UPLOAD_BYTES = int(os.getenv("ML_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# Whole request body of /api/ml/classify-waste/batch.
+ML_MAX_BATCH_UPLOAD_BYTES = int(os.getenv("ML_MAX_BATCH_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+# When set, images whose longest side exceeds it are re-encoded to that size
+# (as JPEG) before they are forwarded; the model only looks at 224x224.
+# Requires Pillow. 0 forwards uploads unchanged.
+ML_DOWNSCALE_MAX_SIDE = int(os.getenv("ML_DOWNSCALE_MAX_SIDE", "0"))
+ML_DOWNSCALE_QUALITY = int(os.getenv("ML_DOWNSCALE_QUALITY", "90"))
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds the {limit // (1024 * 1024)} MB limit.")
+
+class UploadLimitMiddleware:
+    """
+    Pure ASGI middleware capping the request body of the given path
+    prefixes. A declared Content-Length over the limit is answered with 413
+    before any of the body is read; chunked bodies are counted as they
+    arrive and fail with 413 at the first byte over the limit.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        # Longest prefix first, so specific paths override their parents.
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _limit(self, path: str) -> Optional[int]:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return limit
+        return None
+
+    async def __call__(self, scope, receive, send):
+        limit = self._limit(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            response = JSONResponse({"detail": _too_large(limit).detail}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def iter_file(source: BinaryIO, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Yields an open binary file in chunks, so it can be sent as a streamed request body."""
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def downscale_image(source: BinaryIO, max_side: int = ML_DOWNSCALE_MAX_SIDE,
+                    quality: int = ML_DOWNSCALE_QUALITY) -> Optional[bytes]:
+    """
+    JPEG bytes of `source` with its longest side reduced to `max_side`, or
+    None when the image is already small enough or cannot be decoded (it is
+    then forwarded as uploaded and the model service reports the error).
+    Blocking; run it in a thread.
+    """
+    from PIL import Image  # Only needed when downscaling is enabled
+
+    try:
+        img = Image.open(source)
+        if max(img.size) <= max_side:
+            return None
+        # JPEGs are decoded at 1/2, 1/4 or 1/8 scale when that still covers max_side.
+        img.draft("RGB", (max_side, max_side))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_side, max_side), Image.BICUBIC, reducing_gap=3.0)
+        out = BytesIO()
+        img.save(out, "JPEG", quality=quality)
+        return out.getvalue()
+    except Exception as e:
+        logger.warning("Could not downscale upload, forwarding it unchanged: %s", e)
+        return None
+    finally:
+        source.seek(0)
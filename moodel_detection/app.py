@@ -1,15 +1,58 @@
 import os
-import tensorflow as tf
-from flask import Flask, request, jsonify
-from PIL import Image
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from flask import Flask, Response, g, request, jsonify
 import numpy as np
-from io import BytesIO
+
+from batching import MicroBatcher
+from inference import (load_engine, configured_model_path, preload_model_content,
+                       INFERENCE_BACKEND)
+from prediction_cache import (PredictionCache, PREDICTION_CACHE_ENABLED,
+                              MODEL_VERSION, file_version)
+from preprocessing import INPUT_SHAPE, preprocess_image, preprocess_batch, softmax
+import stats as metrics
 
 app = Flask(__name__)
 
+# --- Upload limits ---
+# Larger request bodies are refused with 413 before they are read. Uploaded
+# files are spooled (to disk past SPOOL_MAX_MEMORY) and decoded from there,
+# never copied into one bytes object.
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', str(100 * 1024 * 1024)))
+SPOOL_MAX_MEMORY = 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
 # --- Load Model ---
-MODEL_PATH = 'waste_classifier_model.h5'
-model = tf.keras.models.load_model(MODEL_PATH)
+# INFERENCE_BACKEND selects the engine (keras or tflite); see inference.py.
+# Under gunicorn (see gunicorn.conf.py) MODEL_LAZY_LOAD is set: the master
+# only preloads shared model bytes and each worker loads and warms up its
+# engine after the fork. Otherwise the model is loaded at import as before.
+MODEL_LAZY_LOAD = os.environ.get('MODEL_LAZY_LOAD', 'false').lower() in ('1', 'true', 'yes')
+engine = None
+engine_ready = threading.Event()
+engine_error = None
+
+def init_engine():
+    """Loads the engine and runs one warm-up inference; /ready reports ready afterwards."""
+    global engine, engine_error
+    try:
+        loaded = load_engine()
+        loaded.predict(np.zeros((1, *INPUT_SHAPE), dtype=np.float32))
+        engine = loaded
+        engine_ready.set()
+        logging.info("Inference engine '%s' loaded and warmed up (pid %s)", loaded.name, os.getpid())
+    except Exception as e:
+        engine_error = str(e)
+        logging.exception("Could not load the inference engine")
+        raise
+
+def start_engine_in_background():
+    """Called in each gunicorn worker after fork; the worker serves /health and /ready meanwhile."""
+    threading.Thread(target=init_engine, name='engine-loader', daemon=True).start()
+
 CLASS_NAMES = ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash']
 DUSTBIN_MAP = {
     'cardboard': '🔵 Blue Dustbin (Dry Waste / Recyclable)',
@@ -20,40 +63,234 @@ DUSTBIN_MAP = {
     'trash': '⚫ Black Dustbin (General / Non-Recyclable Waste)'
 }
 
-def preprocess_image(image_bytes):
-    """Prepares the image for the model."""
-    img = Image.open(BytesIO(image_bytes)).convert('RGB')
-    img = img.resize((224, 224))
-    img_array = tf.keras.preprocessing.image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    preprocessed_img = tf.keras.applications.mobilenet_v2.preprocess_input(img_array)
-    return preprocessed_img
+# --- Micro-batching ---
+# Concurrent requests (gunicorn gthread workers) are grouped into one forward
+# pass of up to BATCH_MAX_SIZE images, waiting at most BATCH_MAX_WAIT_MS.
+BATCHING_ENABLED = os.environ.get('BATCHING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', '16'))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', '10'))
+
+def run_model(batch):
+    """One forward pass over a (N, 224, 224, 3) batch; returns (N, classes) logits."""
+    started = time.perf_counter()
+    try:
+        return engine.predict(batch)
+    finally:
+        metrics.inference_time.observe(time.perf_counter() - started)
+
+batcher = MicroBatcher(run_model, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS) if BATCHING_ENABLED else None
+
+# --- Prediction cache ---
+# Identical image bytes (device retries, re-sent photos) skip decode and inference.
+prediction_cache = PredictionCache(
+    MODEL_VERSION or f"{INFERENCE_BACKEND}:{file_version(configured_model_path())}"
+) if PREDICTION_CACHE_ENABLED else None
+
+# --- Multi-image requests ---
+# /predict/batch decodes its images in parallel (PIL releases the GIL) into
+# one preallocated buffer and classifies them with a single forward pass.
+MAX_IMAGES_PER_REQUEST = int(os.environ.get('MAX_IMAGES_PER_REQUEST', '64'))
+PREPROCESS_WORKERS = int(os.environ.get('PREPROCESS_WORKERS', str(min(8, os.cpu_count() or 1))))
+preprocess_pool = ThreadPoolExecutor(max_workers=PREPROCESS_WORKERS, thread_name_prefix='preprocess')
+
+def format_prediction(logits):
+    """Turns one row of model output into the API response body."""
+    score = softmax(logits)
+    predicted_class = CLASS_NAMES[np.argmax(score)]
+    confidence = float(np.max(score))
+    return {
+        'predicted_class': predicted_class,
+        'confidence': f"{confidence:.2%}",
+        'recommended_dustbin': DUSTBIN_MAP.get(predicted_class)
+    }
+
+# --- Request metrics ---
+# Latency per route template and status, exported with the decode,
+# preprocess, queue and inference timers on /metrics.
+if metrics.METRICS_ENABLED:
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_latency(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            metrics.request_time.labels(route, request.method, str(response.status_code)).observe(
+                time.perf_counter() - started)
+        return response
+
+def _not_ready():
+    return jsonify({'error': engine_error or 'Model is still loading'}), 503
+
+@app.errorhandler(413)
+def _too_large(e):
+    return jsonify({'error': f'Request body exceeds {MAX_REQUEST_BYTES // (1024 * 1024)} MB'}), 413
+
+def classify_file(image):
+    """Prediction for one image file (rewound afterwards), via the cache and the micro-batcher."""
+    cache_key = prediction_cache.key(image) if prediction_cache else None
+    if cache_key:
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    processed_image = preprocess_image(image)
+
+    if batcher is not None:
+        logits = batcher.predict(processed_image[0])
+    else:
+        logits = run_model(processed_image)[0]
+
+    prediction = format_prediction(logits)
+    if cache_key:
+        prediction_cache.set(cache_key, prediction)
+    return prediction
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """Handles prediction requests."""
+    if not engine_ready.is_set():
+        return _not_ready()
     if 'image' not in request.files:
         return jsonify({'error': 'No image file provided'}), 400
 
     try:
-        file = request.files['image']
-        image_bytes = file.read()
-        processed_image = preprocess_image(image_bytes)
-
-        prediction = model.predict(processed_image)
-        score = tf.nn.softmax(prediction[0])
-        predicted_class = CLASS_NAMES[np.argmax(score)]
-        confidence = float(np.max(score))
-
-        return jsonify({
-            'predicted_class': predicted_class,
-            'confidence': f"{confidence:.2%}",
-            'recommended_dustbin': DUSTBIN_MAP.get(predicted_class)
-        })
+        return jsonify(classify_file(request.files['image'].stream))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/predict/raw', methods=['POST'])
+def predict_raw():
+    """Like /predict, but the request body is the image itself (Content-Type: image/*)."""
+    if not engine_ready.is_set():
+        return _not_ready()
+    if not request.mimetype.startswith('image/'):
+        return jsonify({'error': 'Expected an image/* request body'}), 400
+
+    # The body stream is not seekable; spool it once, in chunks.
+    with SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spooled:
+        for chunk in iter(lambda: request.stream.read(1 << 16), b''):
+            spooled.write(chunk)
+        if not spooled.tell():
+            return jsonify({'error': 'No image data provided'}), 400
+        spooled.seek(0)
+        try:
+            return jsonify(classify_file(spooled))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Classifies every file sent under the `images` field in one forward pass.
+    Results come back in input order; images that fail carry an `error`.
+    """
+    if not engine_ready.is_set():
+        return _not_ready()
+    files = request.files.getlist('images')
+    if not files:
+        return jsonify({'error': 'No image files provided'}), 400
+    if len(files) > MAX_IMAGES_PER_REQUEST:
+        return jsonify({'error': f'At most {MAX_IMAGES_PER_REQUEST} images per request'}), 413
+
+    try:
+        payloads = [file.stream for file in files]
+        results = [{'index': i, 'filename': file.filename} for i, file in enumerate(files)]
+
+        # Answer repeated images from the cache; only the rest are decoded.
+        keys = [prediction_cache.key(data) for data in payloads] if prediction_cache else [None] * len(payloads)
+        pending = []
+        for i, key in enumerate(keys):
+            cached = prediction_cache.get(key) if key else None
+            if cached is not None:
+                results[i].update(cached)
+            else:
+                pending.append(i)
+
+        # Decoded in parallel straight into one batch buffer
+        batch, errors = preprocess_batch([payloads[i] for i in pending], preprocess_pool)
+        valid = [i for i, error in zip(pending, errors) if error is None]
+        for i, error in zip(pending, errors):
+            if error:
+                results[i]['error'] = error
+
+        if valid:
+            logits = run_model(batch)
+            for row, i in zip(logits, valid):
+                prediction = format_prediction(row)
+                if keys[i]:
+                    prediction_cache.set(keys[i], prediction)
+                results[i].update(prediction)
+
+        return jsonify({'results': results})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/health', methods=['GET'])
+def health():
+    """Liveness: the worker process is up."""
+    return jsonify({'status': 'ok'})
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: the model is loaded and has completed a warm-up inference."""
+    if engine_ready.is_set():
+        return jsonify({'status': 'ready', 'inference_backend': engine.name, 'pid': os.getpid()})
+    return jsonify({'status': 'error' if engine_error else 'warming_up', 'error': engine_error}), 503
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Batching histograms and prediction cache hit ratio for this worker."""
+    return jsonify({
+        'inference_backend': INFERENCE_BACKEND,
+        'ready': engine_ready.is_set(),
+        'batching_enabled': batcher is not None,
+        'batcher': batcher.stats() if batcher is not None else None,
+        'prediction_cache': prediction_cache.stats() if prediction_cache is not None else None,
+    })
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition for this worker."""
+    if not metrics.METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    families = [
+        ('model_http_request_duration_seconds', 'histogram', 'Request latency by route, method and status.',
+         metrics.request_time.render('model_http_request_duration_seconds')),
+        ('model_decode_seconds', 'histogram', 'Image decode and resize time per image.',
+         metrics.decode_time.render('model_decode_seconds')),
+        ('model_preprocess_seconds', 'histogram', 'Pixel conversion and scaling time per image.',
+         metrics.preprocess_time.render('model_preprocess_seconds')),
+        ('model_inference_seconds', 'histogram', 'Forward pass time per batch.',
+         metrics.inference_time.render('model_inference_seconds')),
+        ('model_ready', 'gauge', '1 once the engine is loaded and warmed up.',
+         [f'model_ready {int(engine_ready.is_set())}']),
+    ]
+    if batcher is not None:
+        families += [
+            ('model_batch_queue_seconds', 'histogram', 'Time an image waits for its micro-batch.',
+             batcher.queue_time.render('model_batch_queue_seconds')),
+            ('model_batch_size', 'histogram', 'Images per micro-batch forward pass.',
+             batcher.batch_sizes.render('model_batch_size')),
+            ('model_batch_queue_depth', 'gauge', 'Images waiting for the micro-batcher.',
+             [f"model_batch_queue_depth {batcher.stats()['queue_depth']}"]),
+        ]
+    if prediction_cache is not None:
+        cache_stats = prediction_cache.stats()
+        families.append(('model_prediction_cache_hits_total', 'counter', 'Prediction cache hits.',
+                         [f"model_prediction_cache_hits_total {cache_stats['memory_hits'] + cache_stats['disk_hits']}"]))
+        families.append(('model_prediction_cache_misses_total', 'counter', 'Prediction cache misses.',
+                         [f"model_prediction_cache_misses_total {cache_stats['misses']}"]))
+    return Response(metrics.exposition(families), mimetype='text/plain; version=0.0.4')
+
+if MODEL_LAZY_LOAD:
+    preload_model_content()
+else:
+    init_engine()
+
 if __name__ == '__main__':
     # Railway provides the PORT environment variable
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, threaded=True)
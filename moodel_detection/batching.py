@@ -0,0 +1,105 @@
+# moodel_detection/batching.py
+"""
+Dynamic micro-batching for model inference.
+
+Request threads submit one preprocessed image each and block on a Future.
+A single scheduler thread collects images until either `max_batch_size`
+are waiting or the oldest has waited `max_wait_ms`, runs one batched
+forward pass and fans the result rows back out.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from stats import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_batch_size: int = 16, max_wait_ms: float = 10.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_time = Histogram()
+        self.inference_time = Histogram()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._buffer = None  # reused (max_batch_size, ...) input buffer
+
+    def _ensure_started(self) -> None:
+        # Started lazily (and again after a fork) so the scheduler thread
+        # lives in the process that serves requests.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, image: np.ndarray) -> Future:
+        """Queues one preprocessed image (no batch axis) for inference."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((image, future, time.perf_counter()))
+        return future
+
+    def predict(self, image: np.ndarray, timeout: float = None) -> np.ndarray:
+        return self.submit(image).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _stack(self, images):
+        """Copies the images into the reusable batch buffer (no per-batch allocation)."""
+        first = images[0]
+        if self._buffer is None or self._buffer.shape[1:] != first.shape or self._buffer.dtype != first.dtype:
+            self._buffer = np.empty((self.max_batch_size, *first.shape), dtype=first.dtype)
+        return np.stack(images, out=self._buffer[:len(images)])
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.queue_time.observe(started - enqueued)
+            self.batch_sizes.observe(len(batch))
+            try:
+                outputs = self.predict_fn(self._stack([image for image, _, _ in batch]))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                self.inference_time.observe(time.perf_counter() - started)
+            for row, (_, future, _) in zip(outputs, batch):
+                future.set_result(row)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_time_seconds": self.queue_time.snapshot(),
+            "inference_time_seconds": self.inference_time.snapshot(),
+        }
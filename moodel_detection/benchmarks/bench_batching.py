@@ -0,0 +1,90 @@
+# moodel_detection/benchmarks/bench_batching.py
+"""
+Compares images/sec and p50/p99 latency with micro-batching on and off.
+
+N client threads each submit preprocessed images back to back, the way
+gunicorn's threaded workers call the model. The model is called the way
+inference.KerasEngine does (`model(batch, training=False)`, no lock). With
+batching off every thread runs its own batch-of-1 forward pass
+concurrently, as app.py does with BATCHING_ENABLED=false; with batching on
+they go through batching.MicroBatcher.
+
+Usage:
+    python benchmarks/bench_batching.py --clients 16 --images 800
+    python benchmarks/bench_batching.py --max-batch-size 32 --max-wait-ms 5
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+import common
+from batching import MicroBatcher
+
+def run(mode: str, model, clients: int, images: int, max_batch_size: int, max_wait_ms: float) -> dict:
+    image = np.random.default_rng(1).uniform(-1, 1, (224, 224, 3)).astype(np.float32)
+
+    def forward(batch):
+        return np.asarray(model(batch, training=False))
+
+    def unbatched(x):
+        return forward(x[np.newaxis])[0]
+
+    batcher = MicroBatcher(forward, max_batch_size, max_wait_ms)
+    predict = batcher.predict if mode == "batched" else unbatched
+    predict(image)  # warm-up
+
+    latencies, lock = [], threading.Lock()
+    per_client = images // clients
+
+    def client():
+        local = []
+        for _ in range(per_client):
+            started = time.perf_counter()
+            predict(image)
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "mode": mode,
+        "clients": clients,
+        "images": per_client * clients,
+        "images_per_sec": round(per_client * clients / elapsed, 1),
+        "latency": common.summarize(latencies),
+    }
+    if mode == "batched":
+        stats = batcher.stats()
+        result["batch_size"] = stats["batch_size"]
+        result["queue_time_seconds"] = stats["queue_time_seconds"]
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--images", type=int, default=800)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--model", default=None, help="Path to a Keras model (default: waste_classifier_model.h5 or the stub)")
+    args = parser.parse_args()
+
+    model, kind = common.load_model(args.model)
+    results = [
+        run(mode, model, args.clients, args.images, args.max_batch_size, args.max_wait_ms)
+        for mode in ("unbatched", "batched")
+    ]
+    print(json.dumps({"model": kind, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# moodel_detection/benchmarks/bench_engines.py
+"""
+Compares inference engines on load time, peak resident memory and latency.
+
+Each engine is measured in a fresh subprocess so import and model memory
+are not shared between runs. Needs TensorFlow (or tflite-runtime) and the
+model files; run convert_model.py first for the tflite engine.
+
+Usage:
+    python benchmarks/bench_engines.py --engines keras,tflite --batch-sizes 1,8,32
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import common
+
+def measure(engine_name: str, batch_sizes, iterations: int) -> dict:
+    from inference import load_engine
+
+    started = time.perf_counter()
+    engine = load_engine(engine_name)
+    load_seconds = time.perf_counter() - started
+
+    latencies = {}
+    for batch_size in batch_sizes:
+        batch = np.random.default_rng(0).uniform(-1, 1, (batch_size, 224, 224, 3)).astype(np.float32)
+        engine.predict(batch)  # warm-up / tensor allocation
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            engine.predict(batch)
+            samples.append(time.perf_counter() - started)
+        latencies[str(batch_size)] = common.summarize(samples)
+
+    return {
+        "engine": engine_name,
+        "load_seconds": round(load_seconds, 3),
+        "peak_rss_mb": round(common.peak_rss_kb() / 1024, 1),
+        "latency_by_batch_size": latencies,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default="keras,tflite")
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    if args.child:
+        print(json.dumps(measure(args.child, batch_sizes, args.iterations)))
+        return
+
+    results = []
+    for engine_name in args.engines.split(","):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", engine_name,
+             "--batch-sizes", args.batch_sizes, "--iterations", str(args.iterations)],
+            cwd=common.SERVICE_DIR, capture_output=True, text=True,
+        )
+        if output.returncode != 0:
+            results.append({"engine": engine_name, "error": output.stderr.strip().splitlines()[-1:]})
+        else:
+            results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
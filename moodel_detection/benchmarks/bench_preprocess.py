@@ -0,0 +1,107 @@
+# moodel_detection/benchmarks/bench_preprocess.py
+"""
+Time and peak memory per image for the preprocessing pipeline at typical
+camera resolutions.
+
+  legacy  - full-size decode, convert('RGB'), default resize, float32 array,
+            expand_dims and a separate preprocess_input copy (the old code)
+  current - preprocessing.decode_into: JPEG draft decoding, then the resized
+            pixels are written into a preallocated buffer and scaled in place
+
+Peak memory is the growth of the RSS high-water mark (VmHWM) inside a
+fresh subprocess per case, so Pillow's native buffers are counted too.
+
+Usage:
+    python benchmarks/bench_preprocess.py --resolutions 640x480,1920x1080,4032x3024 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+import common
+from preprocessing import INPUT_SHAPE, decode_into, preprocess_input
+
+def legacy_preprocess(image_bytes):
+    img = Image.open(BytesIO(image_bytes)).convert('RGB')
+    img = img.resize((224, 224))
+    img_array = np.asarray(img, dtype=np.float32)
+    img_array = np.expand_dims(img_array, axis=0)
+    return preprocess_input(img_array)
+
+def current_preprocess(image_bytes, buffer):
+    decode_into(image_bytes, buffer[0])
+    return buffer
+
+def synthetic_jpeg(width: int, height: int) -> bytes:
+    """A photo-like JPEG: smooth gradients plus sensor-style noise."""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape).astype(np.float32)
+    buf = BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buf, 'JPEG', quality=90)
+    return buf.getvalue()
+
+def child(mode: str, path: str, repeat: int) -> dict:
+    with open(path, 'rb') as f:
+        image_bytes = f.read()
+    buffer = np.empty((1, *INPUT_SHAPE), dtype=np.float32)
+    baseline = common.peak_rss_kb()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if mode == 'legacy':
+            legacy_preprocess(image_bytes)
+        else:
+            current_preprocess(image_bytes, buffer)
+        timings.append(time.perf_counter() - started)
+    peak = common.peak_rss_kb()
+    return {
+        'mode': mode,
+        'time': common.summarize(timings),
+        'peak_rss_growth_mb': round((peak - baseline) / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', default='640x480,1920x1080,4032x3024')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--child', nargs=2, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child[0], args.child[1], args.repeat)))
+        return
+
+    results = []
+    for resolution in args.resolutions.split(','):
+        width, height = (int(v) for v in resolution.split('x'))
+        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as f:
+            f.write(synthetic_jpeg(width, height))
+            path = f.name
+        try:
+            row = {'resolution': resolution, 'jpeg_kb': round(os.path.getsize(path) / 1024, 1)}
+            for mode in ('legacy', 'current'):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', mode, path, '--repeat', str(args.repeat)],
+                    cwd=common.SERVICE_DIR, capture_output=True, text=True, check=True,
+                )
+                row[mode] = json.loads(output.stdout)
+            row['speedup_p50'] = round(row['legacy']['time']['p50_ms'] / max(row['current']['time']['p50_ms'], 1e-6), 2)
+            results.append(row)
+        finally:
+            os.remove(path)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# moodel_detection/benchmarks/common.py
+"""
+Shared helpers for the model service benchmarks.
+
+Run the scripts from the moodel_detection directory, e.g.
+    python benchmarks/bench_batching.py
+
+Without TensorFlow or the model file the scripts use StubModel, a NumPy
+network whose cost grows with batch size like a real CNN forward pass does
+(fixed per-call overhead plus BLAS work per image).
+"""
+
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVICE_DIR not in sys.path:
+    sys.path.insert(0, SERVICE_DIR)
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile; `pct` is in the 0-100 range."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+def summarize(latencies_s) -> dict:
+    ms = [value * 1000 for value in latencies_s]
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+def peak_rss_kb() -> int:
+    """RSS high-water mark of this process; unlike ru_maxrss it is not inherited across exec."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class StubModel:
+    """Stand-in for the Keras classifier with a realistic batch cost profile."""
+
+    def __init__(self, classes: int = 6, overhead_ms: float = 4.0, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.overhead = overhead_ms / 1000.0
+        self.w1 = rng.standard_normal((224 * 224 * 3 // 16, 512), dtype=np.float32)
+        self.w2 = rng.standard_normal((512, classes), dtype=np.float32)
+
+    def __call__(self, batch, training=False):
+        time.sleep(self.overhead)  # framework call overhead
+        features = batch.reshape(batch.shape[0], -1)[:, ::16]
+        return np.maximum(features @ self.w1, 0) @ self.w2
+
+def load_model(model_path: str = None):
+    """The real Keras model when available, otherwise StubModel."""
+    path = model_path or os.path.join(SERVICE_DIR, "waste_classifier_model.h5")
+    if os.path.exists(path):
+        try:
+            import tensorflow as tf
+            return tf.keras.models.load_model(path), "keras"
+        except ImportError:
+            pass
+    return StubModel(), "stub"
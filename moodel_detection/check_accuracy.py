@@ -0,0 +1,82 @@
+# moodel_detection/check_accuracy.py
+"""
+Checks a converted/quantized model against the Keras original on a
+labelled sample set laid out as <samples>/<class_name>/<image>.
+
+Reports top-1 accuracy per engine, top-1 agreement with Keras, the largest
+probability difference and mean latency per image. Exits non-zero when an
+engine's accuracy falls more than --max-drop below the Keras model's.
+
+Usage:
+    python check_accuracy.py --samples samples/ --tflite-model waste_classifier_model.tflite
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from convert_model import iter_images
+from inference import load_engine
+from preprocessing import preprocess_image, softmax
+
+CLASS_NAMES = ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash']
+
+def load_samples(directory: str):
+    images, labels = [], []
+    for label, class_name in enumerate(CLASS_NAMES):
+        class_dir = os.path.join(directory, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        for path in iter_images(class_dir):
+            with open(path, 'rb') as f:
+                images.append(preprocess_image(f.read()))
+            labels.append(label)
+    if not images:
+        raise SystemExit(f"No labelled images found under {directory}/<class_name>/")
+    return images, np.array(labels)
+
+def evaluate(engine, images):
+    probabilities, started = [], time.perf_counter()
+    for image in images:
+        probabilities.append(softmax(engine.predict(image)[0]))
+    elapsed = time.perf_counter() - started
+    return np.stack(probabilities), elapsed / len(images)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', required=True)
+    parser.add_argument('--keras-model', default='waste_classifier_model.h5')
+    parser.add_argument('--tflite-model', default='waste_classifier_model.tflite')
+    parser.add_argument('--max-drop', type=float, default=0.01, help='Allowed accuracy drop vs Keras (0.01 = 1 point)')
+    args = parser.parse_args()
+
+    images, labels = load_samples(args.samples)
+    engines = {
+        'keras': load_engine('keras', args.keras_model),
+        'tflite': load_engine('tflite', args.tflite_model),
+    }
+    outputs = {name: evaluate(engine, images) for name, engine in engines.items()}
+
+    reference = outputs['keras'][0]
+    report = {'samples': int(len(labels))}
+    for name, (probabilities, latency) in outputs.items():
+        accuracy = float(np.mean(np.argmax(probabilities, axis=1) == labels))
+        report[name] = {
+            'accuracy': round(accuracy, 4),
+            'agreement_with_keras': round(float(np.mean(np.argmax(probabilities, axis=1) == np.argmax(reference, axis=1))), 4),
+            'max_probability_diff': round(float(np.max(np.abs(probabilities - reference))), 4),
+            'mean_latency_ms': round(latency * 1000, 3),
+        }
+    drop = report['keras']['accuracy'] - report['tflite']['accuracy']
+    report['tflite']['accuracy_drop'] = round(drop, 4)
+    failed = drop > args.max_drop
+
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
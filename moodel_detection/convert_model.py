@@ -0,0 +1,76 @@
+# moodel_detection/convert_model.py
+"""
+Exports the Keras classifier to TensorFlow Lite for INFERENCE_BACKEND=tflite.
+
+Usage:
+    python convert_model.py                                   # float32
+    python convert_model.py --quantize float16                # ~half the size
+    python convert_model.py --quantize int8 --calibration-dir samples/
+    python check_accuracy.py --samples samples/ --tflite-model waste_classifier_model.tflite
+
+int8 uses full-integer quantization of weights and activations, calibrated on
+images from --calibration-dir (any folder of images, searched recursively).
+Inputs and outputs stay float32, so the exported model is a drop-in
+replacement for the Keras one.
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from preprocessing import preprocess_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+def iter_images(directory: str):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+def representative_dataset(directory: str, limit: int):
+    def generator():
+        for i, path in enumerate(iter_images(directory)):
+            if i >= limit:
+                break
+            with open(path, 'rb') as f:
+                yield [preprocess_image(f.read()).astype(np.float32)]
+    return generator
+
+def convert(model_path: str, output_path: str, quantize: str, calibration_dir: str = None, calibration_count: int = 200):
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if quantize == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == 'int8':
+        if not calibration_dir:
+            raise SystemExit('--calibration-dir is required for int8 quantization')
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(calibration_dir, calibration_count)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    tflite_model = converter.convert()
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    return len(tflite_model)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', default='waste_classifier_model.h5')
+    parser.add_argument('--output', default='waste_classifier_model.tflite')
+    parser.add_argument('--quantize', choices=['none', 'float16', 'int8'], default='none')
+    parser.add_argument('--calibration-dir', default=None)
+    parser.add_argument('--calibration-count', type=int, default=200)
+    args = parser.parse_args()
+
+    size = convert(args.input, args.output, args.quantize, args.calibration_dir, args.calibration_count)
+    original = os.path.getsize(args.input)
+    print(f"Wrote {args.output} ({size / 1e6:.1f} MB, {args.quantize}); source model {original / 1e6:.1f} MB")
+
+if __name__ == '__main__':
+    main()
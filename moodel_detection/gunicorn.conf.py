@@ -0,0 +1,37 @@
+# moodel_detection/gunicorn.conf.py
+"""
+Production serving config: `gunicorn -c gunicorn.conf.py app:app`.
+
+The app is imported once in the master (preload_app) so code and, for the
+tflite engine, the model flatbuffer are shared copy-on-write by all forked
+workers. Each worker then loads its engine and runs a warm-up inference in
+the background; GET /ready answers 503 until that is done.
+"""
+
+import os
+
+cpu_count = os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+# Threaded workers let concurrent requests share one micro-batch.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '16'))
+preload_app = os.environ.get('PRELOAD_APP', 'true').lower() in ('1', 'true', 'yes')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+# Split the cores between workers so they don't oversubscribe the CPU.
+# Must be in the environment before the app (and TensorFlow) is imported.
+_threads_per_worker = str(max(1, cpu_count // max(1, workers)))
+os.environ.setdefault('INFERENCE_THREADS', _threads_per_worker)
+os.environ.setdefault('OMP_NUM_THREADS', os.environ['INFERENCE_THREADS'])
+os.environ.setdefault('TF_NUM_INTRAOP_THREADS', os.environ['INFERENCE_THREADS'])
+os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+os.environ['MODEL_LAZY_LOAD'] = 'true'
+
+def post_fork(server, worker):
+    import app
+
+    app.start_engine_in_background()
@@ -0,0 +1,123 @@
+# moodel_detection/inference.py
+"""
+Pluggable inference engines for the waste classifier.
+
+Every engine exposes `predict(batch) -> np.ndarray` taking a float32
+(N, 224, 224, 3) batch preprocessed for MobileNetV2 and returning the
+(N, classes) model output, so the service code is engine-agnostic.
+
+The engine is picked with INFERENCE_BACKEND:
+  keras  - the original .h5 model through TensorFlow/Keras
+  tflite - a .tflite export (see convert_model.py); uses tflite-runtime
+           when installed, otherwise tf.lite from the full TensorFlow
+
+Under gunicorn with preload_app the master calls preload_model_content()
+so every forked worker builds its interpreter from the same in-memory
+flatbuffer: the weights are shared copy-on-write instead of loaded per
+worker. Engines themselves are always created after the fork because the
+TensorFlow and TFLite runtimes are not fork-safe once initialized.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'keras')
+MODEL_PATH = os.environ.get('MODEL_PATH', 'waste_classifier_model.h5')
+TFLITE_MODEL_PATH = os.environ.get('TFLITE_MODEL_PATH', 'waste_classifier_model.tflite')
+# 0 lets the runtime decide.
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', '0'))
+
+class KerasEngine:
+    name = 'keras'
+
+    def __init__(self, model_path: str = MODEL_PATH, num_threads: int = INFERENCE_THREADS):
+        import tensorflow as tf
+
+        if num_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        self.model_path = model_path
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        # Calling the model directly skips predict()'s per-call dataset setup.
+        return np.asarray(self.model(batch, training=False))
+
+class TFLiteEngine:
+    name = 'tflite'
+
+    def __init__(self, model_path: str = TFLITE_MODEL_PATH, num_threads: int = INFERENCE_THREADS,
+                 model_content: bytes = None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.model_path = model_path
+        model_content = model_content if model_content is not None else _preloaded.get(model_path)
+        if model_content is not None:
+            self.interpreter = Interpreter(model_content=model_content, num_threads=num_threads or None)
+        else:
+            self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads or None)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # The interpreter holds mutable tensor buffers; one invoke at a time.
+        self._lock = threading.Lock()
+
+    def _resize(self, batch_size: int) -> None:
+        self.interpreter.resize_tensor_input(self._input['index'], [batch_size, *self._input['shape'][1:]])
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self._resize(batch.shape[0])
+
+            scale, zero_point = self._input['quantization']
+            if self._input['dtype'] != np.float32 and scale:
+                batch = np.round(batch / scale + zero_point).astype(self._input['dtype'])
+            self.interpreter.set_tensor(self._input['index'], batch.astype(self._input['dtype'], copy=False))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+
+            scale, zero_point = self._output['quantization']
+            if self._output['dtype'] != np.float32 and scale:
+                output = (output.astype(np.float32) - zero_point) * scale
+            return np.array(output, dtype=np.float32)
+
+_preloaded = {}
+
+def configured_model_path(backend: str = None) -> str:
+    backend = backend or INFERENCE_BACKEND
+    return TFLITE_MODEL_PATH if backend == TFLiteEngine.name else MODEL_PATH
+
+def preload_model_content(backend: str = None) -> None:
+    """Reads the TFLite flatbuffer into memory before workers are forked."""
+    backend = backend or INFERENCE_BACKEND
+    if backend == TFLiteEngine.name and TFLITE_MODEL_PATH not in _preloaded:
+        with open(TFLITE_MODEL_PATH, 'rb') as f:
+            _preloaded[TFLITE_MODEL_PATH] = f.read()
+
+ENGINES = {
+    KerasEngine.name: KerasEngine,
+    TFLiteEngine.name: TFLiteEngine,
+}
+
+def load_engine(backend: str = None, model_path: str = None, num_threads: int = None):
+    backend = backend or INFERENCE_BACKEND
+    if backend not in ENGINES:
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}', expected one of {sorted(ENGINES)}")
+    kwargs = {}
+    if model_path:
+        kwargs['model_path'] = model_path
+    if num_threads is not None:
+        kwargs['num_threads'] = num_threads
+    return ENGINES[backend](**kwargs)
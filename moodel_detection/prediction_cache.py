@@ -0,0 +1,150 @@
+# moodel_detection/prediction_cache.py
+"""
+Prediction cache keyed by a content hash of the uploaded image bytes.
+
+Retries and re-sent photos are answered without decoding or inference.
+The key also covers the model version, so deploying a new model makes old
+entries unreachable. Memory is bounded with LRU eviction; an optional disk
+tier (one small JSON file per entry) survives restarts and is shared by
+all workers that point at the same directory.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+PREDICTION_CACHE_ENABLED = os.environ.get('PREDICTION_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '4096'))
+PREDICTION_CACHE_DIR = os.environ.get('PREDICTION_CACHE_DIR')  # unset disables the disk tier
+PREDICTION_CACHE_DISK_MAX_ENTRIES = int(os.environ.get('PREDICTION_CACHE_DISK_MAX_ENTRIES', '100000'))
+# Explicit model version; defaults to a digest of the model file.
+MODEL_VERSION = os.environ.get('MODEL_VERSION')
+
+def file_version(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+class PredictionCache:
+    def __init__(self, model_version: str, max_entries: int = PREDICTION_CACHE_SIZE,
+                 disk_dir: str = PREDICTION_CACHE_DIR, disk_max_entries: int = PREDICTION_CACHE_DISK_MAX_ENTRIES):
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self._memory: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key(self, image) -> str:
+        """Key of the image bytes, or of an open binary file (hashed in chunks, then rewound)."""
+        digest = hashlib.sha256(self.model_version.encode())
+        digest.update(b'\0')
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            digest.update(image)
+        else:
+            for chunk in iter(lambda: image.read(1 << 16), b''):
+                digest.update(chunk)
+            image.seek(0)
+        return digest.hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + '.json')
+
+    def get(self, key: str):
+        with self._lock:
+            prediction = self._memory.get(key)
+            if prediction is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return prediction
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                    prediction = json.load(f)
+            except (OSError, ValueError):
+                prediction = None
+            if prediction is not None:
+                self._remember(key, prediction)
+                with self._lock:
+                    self.disk_hits += 1
+                return prediction
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key: str, prediction: dict) -> None:
+        with self._lock:
+            self._memory[key] = prediction
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def set(self, key: str, prediction: dict) -> None:
+        self._remember(key, prediction)
+        if self.disk_dir:
+            self._write_disk(key, prediction)
+
+    def _write_disk(self, key: str, prediction: dict) -> None:
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(prediction, f, ensure_ascii=False)
+            os.replace(tmp_path, path)  # atomic, so readers never see a partial file
+        except OSError:
+            return
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % 1000 == 0
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Drops the oldest files once the disk tier grows past its bound."""
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        excess = len(entries) - self.disk_max_entries
+        if excess > 0:
+            for _, path in sorted(entries)[:excess]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'model_version': self.model_version,
+                'size': len(self._memory),
+                'max_entries': self.max_entries,
+                'disk_enabled': bool(self.disk_dir),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,103 @@
+# moodel_detection/stats.py
+"""Tiny thread-safe metrics used by the model service."""
+
+import os
+import bisect
+import threading
+
+# Request, decode and preprocess timers; off removes their (microsecond) cost.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# Seconds; suits queue waits and forward passes alike.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, enabled: bool = True):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        if not self.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else 0.0,
+            "buckets": cumulative,
+        }
+
+    def render(self, name: str, labels: str = "") -> list:
+        """Prometheus text lines; `labels` is a preformatted 'key="value",...' string."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        prefix = labels + "," if labels else ""
+        lines, running = [], 0
+        for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+            running += bucket_count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {running}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {total:.6f}")
+        lines.append(f"{name}_count{suffix} {count}")
+        return lines
+
+class HistogramFamily:
+    """One Histogram per combination of label values."""
+
+    def __init__(self, labelnames, buckets=LATENCY_BUCKETS, enabled: bool = True):
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self.enabled = enabled
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets, self.enabled))
+        return child
+
+    def render(self, name: str) -> list:
+        with self._lock:
+            children = sorted(self._children.items())
+        lines = []
+        for values, child in children:
+            labels = ",".join(f'{key}="{value}"' for key, value in zip(self.labelnames, values))
+            lines.extend(child.render(name, labels))
+        return lines
+
+def exposition(metrics) -> str:
+    """Renders (name, type, help, lines) tuples in the Prometheus text format."""
+    out = []
+    for name, kind, documentation, lines in metrics:
+        out.append(f"# HELP {name} {documentation}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(lines)
+    return "\n".join(out) + "\n"
+
+# --- Service metrics ---
+request_time = HistogramFamily(("route", "method", "status"), enabled=METRICS_ENABLED)
+decode_time = Histogram(enabled=METRICS_ENABLED)
+preprocess_time = Histogram(enabled=METRICS_ENABLED)
+inference_time = Histogram(enabled=METRICS_ENABLED)